@@ -0,0 +1,93 @@
+"""
+Split/dividend adjustment applied on read.
+
+The store keeps unadjusted OHLCV plus a small per-ticker table of corporate
+actions (ex-date, split ratio, cash dividend, and the price factor the
+action applies to every earlier bar). An adjusted series is the raw series
+times the product of the factors of all later actions:
+
+    factor = 1 / split * (1 - dividend / previous close)
+
+which is the convention behind Yahoo's adjusted close. A new action only
+appends one row; stored bars never change, so the incremental store stays
+valid across ex-dates.
+"""
+import numpy as np
+
+ACTION_COLUMNS = ['Split', 'Dividend', 'Factor']
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+
+
+def _suffix_product(dates, event_dates, values):
+    """For every date, the product of `values` whose event date is AFTER it."""
+    order = np.argsort(event_dates, kind='stable')
+    event_dates, values = np.asarray(event_dates)[order], np.asarray(values, dtype=np.float64)[order]
+    suffix = np.append(np.cumprod(values[::-1])[::-1], 1.0)
+    return suffix[np.searchsorted(event_dates, dates, side='right')]
+
+
+def unsplit(dates, split_dates, ratios):
+    """
+    Multiplier that undoes split adjustment: Yahoo's quotes are split-adjusted
+    as of the fetch, so a bar is divided by every later split it knows about.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    if not len(split_dates):
+        return np.ones(dates.shape)
+    return _suffix_product(dates, np.asarray(split_dates, dtype='datetime64[D]'), ratios)
+
+
+def action_factors(ex_dates, splits, dividends, dates, close):
+    """
+    Price factor of each action, from the raw closes (`dates`, `close`) of
+    the bar before its ex-date. An action with no earlier bar adjusts nothing
+    in this history, so its dividend part is 1.
+    """
+    ex_dates = np.asarray(ex_dates, dtype='datetime64[D]')
+    pos = np.searchsorted(np.asarray(dates, dtype='datetime64[D]'), ex_dates, side='left') - 1
+    prev = np.where(pos >= 0, np.asarray(close, dtype=np.float64)[np.maximum(pos, 0)], np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        div = np.where(np.isfinite(prev) & (prev > 0), 1 - np.asarray(dividends) / prev, 1.0)
+    return div / np.asarray(splits, dtype=np.float64)
+
+
+def factors(dates, ex_dates, factor, splits):
+    """
+    (price multiplier, volume multiplier) for every bar date. Volume only
+    moves with splits.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    if not len(ex_dates):
+        return np.ones(dates.shape), np.ones(dates.shape)
+    ex_dates = np.asarray(ex_dates, dtype='datetime64[D]')
+    return _suffix_product(dates, ex_dates, factor), _suffix_product(dates, ex_dates, splits)
+
+
+def adjust_arrays(dates, columns, arrays, actions):
+    """
+    Adjusted copies of `arrays` (named by `columns`) given an actions frame
+    (or None / empty for no adjustment).
+    """
+    if actions is None or actions.empty:
+        return list(arrays)
+    price, volume = factors(dates, actions.index.values, actions['Factor'].to_numpy(),
+                            actions['Split'].to_numpy())
+    out = []
+    for name, a in zip(columns, arrays):
+        if name in PRICE_COLUMNS:
+            a = a * price
+        elif name == 'Volume':
+            a = a * volume
+        out.append(a)
+    return out
+
+
+def adjust_frame(df, actions):
+    """Adjusted copy of a raw store frame."""
+    if actions is None or actions.empty or df.empty:
+        return df
+    cols = [c for c in df.columns if c in PRICE_COLUMNS or c == 'Volume']
+    out = df.copy()
+    for c, a in zip(cols, adjust_arrays(df.index.values, cols, [df[c].to_numpy() for c in cols], actions)):
+        out[c] = a
+    return out
@@ -0,0 +1,172 @@
+"""
+One-pass multi-timeframe OHLC aggregation.
+
+Daily bars are mapped to integer period codes once per trading calendar, then
+every timeframe is reduced with ufunc.reduceat over contiguous runs of equal
+codes. Coarser timeframes are built from finer ones (quarters from months,
+years from quarters) so each bar is only touched once per level.
+
+Arrays may be 1-D (one ticker) or 2-D (tickers x bars on a shared calendar);
+the last axis is always time.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+# The names and the scalar calendar live in timeframes.py (no NumPy) and are re-exported here
+from timeframes import FREQS, PERIOD_LETTERS, TIMEFRAME_ALIASES, period_code, previous_end
+
+PeriodBars = namedtuple('PeriodBars', ['freq', 'label', 'open', 'high', 'low', 'close', 'bar_period', 'start'])
+PeriodBars.__doc__ = """
+OHLC bars for one timeframe.
+
+label       period end date (datetime64[D]), matching the pandas resample label
+bar_period  for every input daily bar, the row of the period it belongs to
+start       date of the first bar actually seen in each period
+"""
+
+
+def day_numbers(dates):
+    """Days since 1970-01-01 as int64 for datetime-like input."""
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def period_codes(days, freq):
+    """
+    Integer period code for every day number; equal codes share a period.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    if freq == 'B':
+        return days
+    if freq == 'W-MON':
+        # 1970-01-06 (day 5) is a Tuesday: weeks run Tuesday..Monday like W-MON
+        return (days - 5) // 7
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    if freq == 'ME':
+        return months
+    if freq == 'QE':
+        return months // 3
+    if freq == 'YE':
+        return months // 12
+    raise ValueError(f"Unsupported frequency: {freq}")
+
+
+def period_label(codes, freq):
+    """Period end date for each code (inverse of period_codes)."""
+    codes = np.asarray(codes, dtype=np.int64)
+    if freq == 'B':
+        return codes.astype('datetime64[D]')
+    if freq == 'W-MON':
+        return (codes * 7 + 11).astype('datetime64[D]')
+    months_per = {'ME': 1, 'QE': 3, 'YE': 12}[freq]
+    next_start = ((codes + 1) * months_per).astype('datetime64[M]').astype('datetime64[D]')
+    return next_start - np.timedelta64(1, 'D')
+
+
+def _run_starts(codes):
+    """Index of the first element of every run of equal codes."""
+    return np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+
+
+def _reduce(codes, o, h, l, c):
+    starts = _run_starts(codes)
+    ends = np.concatenate((starts[1:], [codes.shape[-1]])) - 1
+    # fmax/fmin skip NaN gaps of tickers that did not trade on a shared calendar day
+    return (codes[starts], o[..., starts],
+            np.fmax.reduceat(h, starts, axis=-1),
+            np.fmin.reduceat(l, starts, axis=-1),
+            c[..., ends],
+            np.cumsum(np.diff(codes, prepend=codes[:1]) != 0),
+            starts)
+
+
+def aggregate(dates, open_, high, low, close, freq):
+    """
+    Reduce daily bars to `freq` bars in one pass. Dates must be sorted.
+    """
+    days = day_numbers(dates)
+    if freq == 'B':
+        label = days.astype('datetime64[D]')
+        return PeriodBars(freq, label, open_, high, low, close, np.arange(days.size), label)
+    codes = period_codes(days, freq)
+    keys, o, h, l, c, bar_period, starts = _reduce(codes, open_, high, low, close)
+    return PeriodBars(freq, period_label(keys, freq), o, h, l, c, bar_period,
+                      days[starts].astype('datetime64[D]'))
+
+
+def daily_bars(stamps, open_, high, low, close):
+    """
+    Reduce time-ordered intraday (or daily) bars to one OHLC bar per calendar day.
+
+    Returns (days as datetime64[D], open, high, low, close) as new arrays.
+    """
+    keys, o, h, l, c, _, _ = _reduce(day_numbers(stamps), open_, high, low, close)
+    return keys.astype('datetime64[D]'), o, h, l, c
+
+
+def _coarsen(bars, freq):
+    """Build quarter/year bars from month/quarter bars."""
+    # A finer period's end date always falls inside its coarser parent period
+    codes = period_codes(day_numbers(bars.label), freq)
+    k, o, h, l, c, parent, starts = _reduce(codes, bars.open, bars.high, bars.low, bars.close)
+    return PeriodBars(freq, period_label(k, freq), o, h, l, c, parent[bars.bar_period], bars.start[starts])
+
+
+def aggregate_all(dates, open_, high, low, close):
+    """
+    Daily, weekly, monthly, quarterly and annual bars in one sweep.
+
+    Returns a dict keyed by FREQS.
+    """
+    daily = aggregate(dates, open_, high, low, close, 'B')
+    weekly = aggregate(dates, open_, high, low, close, 'W-MON')
+    monthly = aggregate(dates, open_, high, low, close, 'ME')
+    quarterly = _coarsen(monthly, 'QE')
+    annual = _coarsen(quarterly, 'YE')
+    return {'B': daily, 'W-MON': weekly, 'ME': monthly, 'QE': quarterly, 'YE': annual}
+
+
+def align_to_bars(bars, values):
+    """
+    Map per-period values onto the daily bars of the FOLLOWING period.
+
+    `values` is an array whose last axis is periods (or a dict of them). The
+    first period has no predecessor and gets NaN. This replaces the
+    shift(1) + join + ffill dance on the daily index, which put each
+    period's levels on its own end-date label and carried them through the
+    period after: every bar but the last of a period used levels two
+    periods old (and period ends that were not trading days were dropped).
+    """
+    if isinstance(values, dict):
+        return {k: align_to_bars(bars, v) for k, v in values.items()}
+    values = np.asarray(values, dtype=np.float64)
+    prev = bars.bar_period - 1
+    out = values[..., np.maximum(prev, 0)]
+    out[..., prev < 0] = np.nan
+    return out
+
+
+# --- pandas bridges -------------------------------------------------------
+
+def _frame_arrays(df):
+    return (df.index.values, df['Open'].to_numpy(dtype=np.float64), df['High'].to_numpy(dtype=np.float64),
+            df['Low'].to_numpy(dtype=np.float64), df['Close'].to_numpy(dtype=np.float64))
+
+
+def aggregate_frame(df, freqs=FREQS):
+    """All timeframes for a daily OHLC frame, as a dict of PeriodBars."""
+    bars = aggregate_all(*_frame_arrays(df))
+    return {f: bars[f] for f in freqs}
+
+
+def period_bars(df, freq):
+    """A single timeframe for a daily OHLC frame."""
+    return aggregate(*_frame_arrays(df), freq)
+
+
+def to_frame(bars):
+    """PeriodBars as a DataFrame indexed by period end, like resample(freq).apply(logic)."""
+    import pandas as pd
+
+    return pd.DataFrame({'Open': bars.open, 'High': bars.high, 'Low': bars.low, 'Close': bars.close},
+                        index=pd.DatetimeIndex(bars.label, name='Date'))
@@ -0,0 +1,405 @@
+"""
+User-defined alerts on pivot levels, evaluated per price update.
+
+A rule names a ticker, a timeframe's level and a condition:
+
+    TSLA,ME,S1,near,1          within 1% of monthly S1
+    QQQ,QE,R2,above,0,close    closes above quarterly R2
+    SPY,W-MON,P,below,0.5      trades 0.5% below the weekly pivot
+
+Each rule becomes one or two threshold prices (a band for "near"), and every
+ticker keeps its thresholds in one sorted list. An update bisects the old
+and the new price into that list; only the thresholds in between were
+crossed, so the cost per tick depends on the rules actually crossed, not on
+how many rules exist. Rules are edge-triggered: they fire when price enters
+the condition, not on every tick while it holds.
+
+"close" rules are checked when the tick clock passes the 16:00 New York
+session close, against the last price each ticker traded before it; the
+first close compares with the prior close seeded from the store.
+
+Thresholds are rebuilt from fresh levels when the tick clock enters a new
+period of a rule's timeframe, and on refresh() (e.g. after the nightly
+level_db run). Hooked into live_feed.run:
+
+    python alerts.py rules.csv --replay ticks.csv
+    python alerts.py --bench 100000 --watchlist watchlist.txt
+"""
+import bisect
+import csv
+import datetime
+import time
+from collections import defaultdict, namedtuple
+
+import numpy as np
+
+from aggregate import period_code
+
+CONDITIONS = ('near', 'above', 'below')
+TRIGGERS = ('tick', 'close')
+SESSION_CLOSE = datetime.time(16, 0)
+SESSION_TZ = "America/New_York"
+
+Rule = namedtuple('Rule', ['id', 'ticker', 'timeframe', 'level', 'condition', 'pct', 'trigger', 'once'],
+                  defaults=(0.0, 'tick', True))
+Alert = namedtuple('Alert', ['rule', 'level_price', 'price', 'ts'])
+
+# What an edge does when price crosses it
+_UP, _DOWN, _ENTER_FROM_BELOW, _ENTER_FROM_ABOVE = range(4)
+
+
+def load_rules(path):
+    """Rules from a CSV of ticker,timeframe,level,condition[,pct[,trigger]] (header optional)."""
+    rules = []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#") or row[0].strip().lower() == "ticker":
+                continue
+            row = [v.strip() for v in row]
+            pct = float(row[4]) if len(row) > 4 and row[4] else 0.0
+            trigger = row[5] if len(row) > 5 and row[5] else 'tick'
+            rules.append(make_rule(len(rules), row[0], row[1], row[2], row[3], pct, trigger))
+    return rules
+
+
+def make_rule(id, ticker, timeframe, level, condition, pct=0.0, trigger='tick', once=True):
+    if condition not in CONDITIONS:
+        raise ValueError(f"Unknown condition {condition!r} (expected one of {CONDITIONS})")
+    if trigger not in TRIGGERS:
+        raise ValueError(f"Unknown trigger {trigger!r} (expected one of {TRIGGERS})")
+    if condition == 'near' and not float(pct) > 0:
+        # A zero-width band has no inside for price to stop in, so it could never fire
+        raise ValueError(f"'near' needs a positive pct, got {pct!r} (use above/below for a plain cross)")
+    return Rule(id, ticker.upper(), timeframe, level, condition, float(pct), trigger, once)
+
+
+def next_session_close(ts):
+    """Unix time of the first weekday SESSION_CLOSE (New York time) after `ts`."""
+    from zoneinfo import ZoneInfo
+
+    tz = ZoneInfo(SESSION_TZ)
+    day = datetime.datetime.fromtimestamp(ts, tz).date()
+    while True:
+        close = datetime.datetime.combine(day, SESSION_CLOSE, tz).timestamp()
+        if close > ts and day.weekday() < 5:
+            return close
+        day += datetime.timedelta(days=1)
+
+
+def store_closes(tickers, today=None):
+    """{ticker: last stored close before `today`}, the prior close for "close" rules."""
+    from data_store import read_arrays
+
+    today = np.datetime64(today or datetime.date.today(), 'D')
+    out = {}
+    for t in tickers:
+        arrays = read_arrays(t, ('Close',), adjusted=False)  # ticks are raw prices
+        if arrays is None:
+            continue
+        i = int(np.searchsorted(arrays[0], today)) - 1
+        if i >= 0:
+            out[t] = float(arrays[1][i])
+    return out
+
+
+def thresholds(rule, level_price):
+    """[(price, edge action)] for one rule, given its level's current price."""
+    off = level_price * rule.pct / 100
+    if rule.condition == 'above':
+        return [(level_price + off, _UP)]
+    if rule.condition == 'below':
+        return [(level_price - off, _DOWN)]
+    return [(level_price - off, _ENTER_FROM_BELOW), (level_price + off, _ENTER_FROM_ABOVE)]
+
+
+class _Index:
+    """Sorted thresholds for one ticker and trigger."""
+
+    def __init__(self, entries):
+        entries.sort(key=lambda e: e[0])
+        self.edges = [e[0] for e in entries]
+        self.actions = [e[1:] for e in entries]  # (action, rule, band's other edge, level price)
+
+    def crossed(self, old, new):
+        """Alerts' (rule, level price) for a move from `old` to `new`, in the order price passed them."""
+        edges = self.edges
+        a, b = bisect.bisect_right(edges, old), bisect.bisect_right(edges, new)
+        if a == b:
+            return ()
+        out = []
+        if b > a:
+            for action, rule, other, level in self.actions[a:b]:
+                # Entering a band from below only counts if price stopped inside it
+                if action == _UP or (action == _ENTER_FROM_BELOW and new < other):
+                    out.append((rule, level))
+        else:
+            for action, rule, other, level in reversed(self.actions[b:a]):
+                if action == _DOWN or (action == _ENTER_FROM_ABOVE and new >= other):
+                    out.append((rule, level))
+        return out
+
+
+class AlertEngine:
+    """
+    Evaluates `rules` against streamed prices.
+
+    `level_source(tickers, freq, today)` returns {ticker: {level: price}}
+    for the period containing `today` (default live_feed.load_levels, which
+    skips a level table row or cache snapshot that predates the boundary). `on_alert(alert)` is
+    called for every alert; update() also returns them. `closes` seeds the
+    prior session's close per ticker (e.g. store_closes()).
+    """
+
+    def __init__(self, rules, level_source=None, on_alert=None, today=None, closes=None):
+        if level_source is None:
+            from live_feed import load_levels as level_source
+        self.level_source = level_source
+        self.on_alert = on_alert
+        self.rules = list(rules)
+        self.fired = set()      # ids of one-shot rules that already fired
+        self.prices = {}
+        self.closes = dict(closes or {})
+        self.levels = {}        # freq -> {ticker: {level: price}}
+        self.periods = {}       # freq -> period code the levels belong to
+        self.alerts = 0
+        self._next_day = self._next_close = self._boundary = None
+        self._by_freq = defaultdict(set)
+        for r in self.rules:
+            self._by_freq[r.timeframe].add(r.ticker)
+        self.refresh(today)
+
+    # --- building ---------------------------------------------------------
+
+    def refresh(self, today=None, freqs=None):
+        """Reload levels (all timeframes, or just `freqs`) and rebuild the thresholds."""
+        today = today or datetime.date.today()
+        for freq in freqs or self._by_freq:
+            self.levels[freq] = self.level_source(sorted(self._by_freq[freq]), freq, today)
+            self.periods[freq] = period_code(today, freq)
+        self._build()
+
+    def _build(self):
+        entries = defaultdict(list)
+        for r in self.rules:
+            if r.id in self.fired:
+                continue
+            level = self.levels.get(r.timeframe, {}).get(r.ticker, {}).get(r.level)
+            if level is None or level != level:
+                continue
+            edges = thresholds(r, level)
+            for i, (price, action) in enumerate(edges):
+                # A band edge carries the opposite edge to check that price stopped inside
+                other = edges[1 - i][0] if len(edges) == 2 else None
+                entries[r.ticker, r.trigger].append((price, action, r, other, level))
+        self._index = {key: _Index(e) for key, e in entries.items()}
+        self._tick = {t: ix for (t, trig), ix in self._index.items() if trig == 'tick'}
+        self._close = {t: ix for (t, trig), ix in self._index.items() if trig == 'close'}
+
+    def add_rule(self, rule):
+        self.rules.append(rule)
+        if rule.ticker not in self._by_freq[rule.timeframe]:
+            self._by_freq[rule.timeframe].add(rule.ticker)
+            self.refresh(freqs=[rule.timeframe])
+        else:
+            self._build()
+
+    def _clock(self, ts):
+        # The tick clock passed a session close or midnight (on the first tick, just arm both)
+        closed = ()
+        if self._next_close is not None and ts >= self._next_close:
+            closed = self.session_close(dict(self.prices), self._next_close)
+        if self._next_day is None or ts >= self._next_day:
+            self._roll(ts)
+        self._next_close = next_session_close(ts)
+        self._boundary = min(self._next_day, self._next_close)
+        return closed
+
+    def _roll(self, ts):
+        # Called once per calendar day of the tick clock: reload timeframes that started a new period
+        day = datetime.date.fromtimestamp(ts)
+        self._next_day = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time()).timestamp()
+        stale = [f for f in self._by_freq if period_code(day, f) != self.periods.get(f)]
+        if stale:
+            self.refresh(day, stale)
+
+    # --- evaluation -------------------------------------------------------
+
+    def update(self, ticker, price, ts=None, old=None):
+        """Record a tick; returns the Alerts it fired (and a session close it passed)."""
+        closed = ()
+        if ts is not None and (self._boundary is None or ts >= self._boundary):
+            closed = self._clock(ts)
+        if old is None:
+            old = self.prices.get(ticker)
+        self.prices[ticker] = price
+        index = self._tick.get(ticker)
+        if index is None or old is None:
+            return closed
+        hits = self._fire(index.crossed(old, price), price, ts)
+        return [*closed, *hits] if closed else hits
+
+    def on_tick(self, tick, old_price):
+        """live_feed.run(on_tick=...) hook."""
+        self.update(tick.ticker, tick.price, tick.ts, old_price)
+
+    def session_close(self, closes, ts=None):
+        """
+        Evaluate "close" rules against {ticker: closing price}; returns the
+        Alerts. update() calls this at each session close.
+        """
+        out = []
+        for ticker, price in closes.items():
+            old = self.closes.get(ticker)
+            self.closes[ticker] = price
+            index = self._close.get(ticker)
+            if index is not None and old is not None:
+                out.extend(self._fire(index.crossed(old, price), price, ts))
+        return out
+
+    def _fire(self, hits, price, ts):
+        if not hits:
+            return ()
+        out = []
+        for rule, level in hits:
+            if rule.id in self.fired:
+                continue
+            if rule.once:
+                self.fired.add(rule.id)
+            alert = Alert(rule, level, price, ts)
+            out.append(alert)
+            if self.on_alert is not None:
+                self.on_alert(alert)
+        self.alerts += len(out)
+        return out
+
+
+# --- benchmark ------------------------------------------------------------
+
+def random_rules(levels_by_freq, count, seed=0):
+    """`count` random repeating rules over the tickers and timeframes in levels_by_freq."""
+    from pivot_engine import LEVELS
+
+    rng = np.random.default_rng(seed)
+    freqs = list(levels_by_freq)
+    rules = []
+    for i in range(count):
+        freq = freqs[rng.integers(len(freqs))]
+        tickers = list(levels_by_freq[freq])
+        rules.append(Rule(i, tickers[rng.integers(len(tickers))], freq, LEVELS[rng.integers(len(LEVELS))],
+                          CONDITIONS[rng.integers(3)], round(float(rng.uniform(0.05, 2)), 2), 'tick', False))
+    return rules
+
+
+def _scan(rules, levels_by_freq):
+    # Baseline: every rule checked against every update, vectorized over the rules
+    lo, hi = np.empty(len(rules)), np.empty(len(rules))
+    for i, r in enumerate(rules):
+        edges = [p for p, _ in thresholds(r, levels_by_freq[r.timeframe][r.ticker][r.level])]
+        lo[i], hi[i] = edges[0], edges[-1]
+    names = np.array([r.ticker for r in rules])
+    cond = np.array([CONDITIONS.index(r.condition) for r in rules])
+
+    def check(ticker, old, new):
+        up = (old < lo) & (new >= lo)
+        hit = np.where(cond == 1, up, np.where(cond == 2, (old >= hi) & (new < hi),
+                                               (up & (new < hi)) | ((old >= hi) & (new < hi) & (new >= lo))))
+        return np.flatnonzero(hit & (names == ticker))
+    return check
+
+
+def bench(levels, rules=100_000, ticks=200_000, freqs=('W-MON', 'ME', 'QE', 'YE'), seed=0):
+    """
+    Ticks/second through AlertEngine vs. a full linear scan, with `rules` rules
+    over the tickers in `levels` ({ticker: {level: price}}, reused for every timeframe).
+    """
+    levels_by_freq = {f: levels for f in freqs}
+    rule_list = random_rules(levels_by_freq, rules, seed)
+    t = time.perf_counter()
+    engine = AlertEngine(rule_list, level_source=lambda tickers, freq, today: levels_by_freq[freq])
+    build = time.perf_counter() - t
+
+    # Mean-reverting random walk per ticker around its pivot (as live_feed.make_replay)
+    rng = np.random.default_rng(seed + 1)
+    tickers = list(levels)
+    which = rng.integers(0, len(tickers), ticks)
+    pivots = [levels[t]['P'] for t in tickers]
+    moves = (rng.normal(0, 1, ticks) * np.abs([levels[tickers[i]]['R1'] - levels[tickers[i]]['S1']
+                                                for i in which]) / 40).tolist()
+    walk = [0.0] * len(tickers)
+    names, prices = [], []
+    for i, m in zip(which.tolist(), moves):
+        walk[i] = walk[i] * 0.999 + m
+        names.append(tickers[i])
+        prices.append(pivots[i] + walk[i])
+
+    update = engine.update
+    t = time.perf_counter()
+    for name, price in zip(names, prices):
+        update(name, price)
+    indexed = time.perf_counter() - t
+
+    check = _scan(rule_list, levels_by_freq)
+    sample = min(ticks, 2000)
+    last = {}
+    t = time.perf_counter()
+    for name, price in zip(names[:sample], prices[:sample]):
+        old = last.get(name)
+        last[name] = price
+        if old is not None:
+            check(name, old, price)
+    scan = time.perf_counter() - t
+    return {"rules": rules, "tickers": len(tickers), "build_s": build, "ticks": ticks,
+            "alerts": engine.alerts, "indexed_ticks_per_s": ticks / indexed,
+            "scan_ticks_per_s": sample / scan}
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    import live_feed
+    from screener import load_universe
+
+    parser = argparse.ArgumentParser(description="Evaluate pivot-level alert rules against a live feed.")
+    parser.add_argument("rules", nargs="?", help="CSV of ticker,timeframe,level,condition[,pct[,trigger]]")
+    parser.add_argument("--replay", help="replay file of TICKER,PRICE[,TS] lines")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="read ticks from a TCP feed")
+    parser.add_argument("--rate", type=float, default=None, help="ticks per second (default: unthrottled)")
+    parser.add_argument("--bench", type=int, metavar="RULES", help="benchmark with this many random rules")
+    parser.add_argument("--ticks", type=int, default=200_000)
+    parser.add_argument("--watchlist", help="tickers for --bench")
+    args = parser.parse_args()
+
+    if args.bench:
+        if not args.watchlist:
+            parser.error("--bench needs --watchlist")
+        levels = live_feed.load_levels(load_universe(args.watchlist))
+        r = bench(levels, args.bench, args.ticks)
+        print(f"{r['rules']} rules over {r['tickers']} tickers, index built in {r['build_s']:.2f}s")
+        print(f"indexed: {r['indexed_ticks_per_s']:,.0f} ticks/s ({r['alerts']} alerts in {r['ticks']} ticks)")
+        print(f"linear scan: {r['scan_ticks_per_s']:,.0f} ticks/s")
+        raise SystemExit
+
+    if not args.rules:
+        parser.error("give a rules file or --bench")
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        feed = live_feed.socket_feed(host, int(port))
+    elif args.replay:
+        feed = live_feed.replay_file(args.replay, args.rate)
+    else:
+        parser.error("give --replay or --connect")
+
+    def on_alert(a):
+        r = a.rule
+        print(f"{r.ticker:<6} {r.condition} {r.timeframe} {r.level} ({a.level_price:.2f}"
+              f"{f' ±{r.pct:g}%' if r.pct else ''}) at {a.price:.2f}")
+
+    rules = load_rules(args.rules)
+    engine = AlertEngine(rules, on_alert=on_alert, closes=store_closes({r.ticker for r in rules}))
+    book = live_feed.LiveBook()
+    asyncio.run(live_feed.run(feed, book, on_tick=engine.on_tick))
+    if args.replay:
+        # A replay file is one recorded session: its last prices are the close
+        engine.session_close(dict(book.prices))
+    print(f"{book.updates} ticks, {engine.alerts} alerts")
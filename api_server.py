@@ -0,0 +1,467 @@
+"""
+Small async HTTP/JSON API for pivot levels, for dashboards and bots.
+
+    GET  /levels?symbol=QQQ&timeframe=ME[&distance=0]
+    GET  /levels/batch?symbols=QQQ,SPY&timeframe=ME,QE[&distance=0]
+    POST /levels/batch  {"symbols": [...], "timeframes": [...], "distance": false}
+    GET  /history?symbol=QQQ&timeframe=QE[&start=2020-01-01]
+
+Levels come from the same sources as pivots_app.py (level table, shared
+cache, then the local store) and have the same shape: P, R1-R3, S1-S3 with
+the % distance from the last close; period_start/period_end name the period
+whose High/Low/Close produced them. The server only reads the local store and
+never fetches from Yahoo (keep the store fresh with the daily workflow), and
+symbols must look like tickers, so requests can't create or reach other files. Responses are built once per key and
+kept in memory until the period boundary (re-checked every CACHE_SECONDS),
+so a hit is a dict lookup. Every response carries an ETag and Cache-Control
+keyed to the period: with distance=0 the body only changes when a new
+period starts, so clients and proxies can cache it until then; distances
+move with the close and are sent no-cache, so clients revalidate them.
+If-None-Match revalidations answer 304 without a body.
+
+    python api_server.py --port 8080
+    python api_server.py --bench 20000 --symbols QQQ,SPY      # in-process load test
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import level_db
+import shared_cache
+from aggregate import (FREQS, TIMEFRAME_ALIASES, day_numbers, period_bars, period_code, period_codes, period_label,
+                       previous_end)
+from data_store import load_history, years_ago
+from pivot_engine import LEVEL_NAMES, LEVELS, compute_levels, last_completed, level_table
+
+CACHE_SECONDS = 60       # pick up a nightly level_db/store refresh within this long
+MAX_BATCH = 500
+MAX_BODY = 64 * 1024     # POST bodies larger than this get 413
+SYMBOL = re.compile(r"^[A-Z0-9.^=-]{1,15}$")
+HISTORY_YEARS = 20
+
+STATUS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+          413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_symbol(text):
+    symbol = (text or "").strip().upper()
+    if not symbol:
+        raise ApiError(400, "missing symbol")
+    if not SYMBOL.match(symbol):
+        raise ApiError(400, f"invalid symbol {text!r}")
+    return symbol
+
+
+def parse_freq(name):
+    if not isinstance(name or "", str):
+        raise ApiError(400, f"invalid timeframe {name!r}")
+    name = (name or "ME").strip()
+    freq = TIMEFRAME_ALIASES.get(name.lower(), name.upper())
+    if freq not in FREQS:
+        raise ApiError(400, f"unknown timeframe {name!r} (use {', '.join(FREQS)} or daily..annual)")
+    return freq
+
+
+def parse_flag(value):
+    """A query-string or JSON boolean: false, 0, "0" and "false" are off, anything else on."""
+    return value not in (False, 0, "0", "false")
+
+
+def content_length(value):
+    """Request body size from a Content-Length header value (None: no body)."""
+    if value is None:
+        return 0
+    if not re.fullmatch(r"[0-9]+", value.strip()):
+        raise ApiError(400, f"invalid Content-Length {value!r}")
+    length = int(value)
+    if length > MAX_BODY:
+        raise ApiError(413, f"body over {MAX_BODY} bytes")
+    return length
+
+
+def period_window(freq, today=None):
+    """(start date, end date, seconds until the next period starts) for the current `freq` period."""
+    today = today or datetime.date.today()
+    code = period_code(today, freq)
+    start = (period_label(code - 1, freq) + np.timedelta64(1, 'D')).astype(object)
+    end = period_label(code, freq).astype(object)
+    boundary = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time())
+    return start, end, max(int((boundary - datetime.datetime.now()).total_seconds()), 1)
+
+
+# --- computation (blocking; runs in the default executor) -------------------
+
+def compute_levels_payload(symbol, freq):
+    """The /levels body for one symbol and timeframe, or None when there is no data."""
+    df = load_history(symbol, start=years_ago(2), offline=True)
+    if df.empty:
+        return None
+    today = datetime.date.today()
+    row = level_db.latest(symbol, freq, today=today)
+    if row is not None:
+        source = (datetime.date.fromisoformat(row["period_end"]), row["high"], row["low"], row["close"])
+    else:
+        hlc = shared_cache.previous_hlc(symbol, freq, today=today)
+        source = (previous_end(freq, today), *hlc) if hlc else last_completed(df, freq, today)
+    if source is None:
+        return None
+    # The period the levels were computed from (not necessarily the one before today's
+    # when the store is behind)
+    end, high, low, close = source
+    start, _, _ = period_window(freq, end)
+    price = float(df['Close'].iloc[-1])
+    return {
+        "symbol": symbol, "timeframe": freq,
+        "period_start": str(start), "period_end": str(end),
+        "price": float(price),
+        "source": {"high": float(high), "low": float(low), "close": float(close)},
+        "levels": [{"level": k, "name": LEVEL_NAMES[k], "price": v, "distance_pct": d}
+                   for k, v, d in level_table(high, low, close, price)],
+    }
+
+
+def compute_history(symbol, freq, start=None):
+    """Every completed period's H/L/C and levels: the level table, else computed from the store."""
+    df = level_db.history(symbol, freq, start)
+    if not df.empty:
+        df = df.reset_index()
+        cols = ["period_start", "period_end", "high", "low", "close", *LEVELS]
+        return [{k: (str(r[k].date()) if k.startswith("period") else float(r[k])) for k in cols}
+                for _, r in df.iterrows()]
+
+    prices = load_history(symbol, start=years_ago(HISTORY_YEARS), offline=True)
+    if prices.empty:
+        return None
+    bars = period_bars(prices, freq)
+    levels = compute_levels(bars.high, bars.low, bars.close)
+    ends = bars.label.astype('datetime64[D]')
+    starts = period_label(period_codes(day_numbers(ends), freq) - 1, freq) + np.timedelta64(1, 'D')
+    rows = []
+    # The last period is still in progress
+    for i in range(len(ends) - 1):
+        if start is not None and str(starts[i]) < str(start):
+            continue
+        rows.append({"period_start": str(starts[i]), "period_end": str(ends[i]), "high": float(bars.high[i]),
+                     "low": float(bars.low[i]), "close": float(bars.close[i]),
+                     **{k: float(levels[k][i]) for k in LEVELS}})
+    return rows
+
+
+# --- response cache ---------------------------------------------------------
+
+class Entry:
+    """
+    One cached response body with its validators. `revalidate` bodies (those
+    with % distance) are sent no-cache: clients keep them but check the ETag
+    on every use.
+    """
+
+    __slots__ = ("body", "etag", "max_age", "expires", "boundary", "revalidate")
+
+    def __init__(self, payload, max_age, boundary, revalidate=False):
+        self.body = json.dumps(payload, separators=(",", ":"), allow_nan=False).encode()
+        self.etag = '"' + hashlib.blake2b(self.body, digest_size=12).hexdigest() + '"'
+        self.max_age = max_age
+        self.boundary = boundary
+        self.revalidate = revalidate
+        self.expires = time.monotonic() + min(CACHE_SECONDS, max_age)
+
+    def max_age_now(self):
+        # Counts down to the period boundary instead of restarting on every hit
+        return min(self.max_age, max(int(self.boundary - time.time()), 0))
+
+    def headers(self):
+        return {"ETag": self.etag, "Cache-Control": _cache_control(self.max_age_now(), self.revalidate)}
+
+
+def _cache_control(max_age, revalidate):
+    return "no-cache" if revalidate else f"public, max-age={max_age}"
+
+
+def _clean(value):
+    # JSON has no NaN; a level from a NaN bar becomes null
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clean(v) for v in value]
+    return value
+
+
+class LevelService:
+    """Builds and caches responses; concurrent misses for a key share one computation."""
+
+    def __init__(self):
+        self._cache = {}
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def _get(self, key, build):
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self.hits += 1
+            return cached[1]
+        task = self._pending.get(key)
+        if task is None:
+            self.misses += 1
+            loop = asyncio.get_running_loop()
+            task = self._pending[key] = asyncio.ensure_future(loop.run_in_executor(None, build))
+            try:
+                entry = await task
+            finally:
+                self._pending.pop(key, None)
+            # Misses (unknown symbols) are remembered too, so they don't hit the store every request
+            expires = entry.expires if entry is not None else time.monotonic() + CACHE_SECONDS
+            self._cache[key] = (expires, entry)
+            return entry
+        return await asyncio.shield(task)
+
+    async def levels(self, symbol, freq, distance=True):
+        def build():
+            payload = compute_levels_payload(symbol, freq)
+            if payload is None:
+                return None
+            _, _, until = period_window(freq)
+            if not distance:
+                payload.pop("price")
+                for lv in payload["levels"]:
+                    lv.pop("distance_pct")
+            return Entry(_clean(payload), until, time.time() + until, revalidate=distance)
+        return await self._get(("levels", symbol, freq, distance), build)
+
+    async def history(self, symbol, freq, start):
+        def build():
+            rows = compute_history(symbol, freq, start)
+            if rows is None:
+                return None
+            _, _, until = period_window(freq)
+            return Entry(_clean({"symbol": symbol, "timeframe": freq, "periods": rows}), until,
+                         time.time() + until)
+        return await self._get(("history", symbol, freq, start), build)
+
+
+# --- HTTP -------------------------------------------------------------------
+
+def _param(query, name, default=None):
+    values = query.get(name)
+    return values[0] if values else default
+
+
+def _symbol(query):
+    return parse_symbol(_param(query, "symbol"))
+
+
+async def route(service, method, target, body):
+    """(status, body bytes, headers) for one request."""
+    url = urlsplit(target)
+    query = parse_qs(url.query)
+    path = url.path.rstrip("/") or "/"
+
+    if path == "/levels":
+        if method not in ("GET", "HEAD"):
+            raise ApiError(405, "use GET")
+        symbol, freq = _symbol(query), parse_freq(_param(query, "timeframe"))
+        entry = await service.levels(symbol, freq, parse_flag(_param(query, "distance", "1")))
+        if entry is None:
+            raise ApiError(404, f"no data for {symbol} {freq}")
+        return 200, entry.body, entry.headers()
+
+    if path == "/levels/batch":
+        if method == "POST":
+            try:
+                req = json.loads(body or b"{}")
+            except ValueError:
+                raise ApiError(400, "body must be JSON")
+            if not isinstance(req, dict):
+                raise ApiError(400, "body must be a JSON object")
+            symbols, freqs = req.get("symbols") or [], req.get("timeframes") or [req.get("timeframe", "ME")]
+            distance = parse_flag(req.get("distance", True))
+        elif method in ("GET", "HEAD"):
+            symbols = (_param(query, "symbols") or "").split(",")
+            freqs = (_param(query, "timeframe") or "ME").split(",")
+            distance = parse_flag(_param(query, "distance", "1"))
+        else:
+            raise ApiError(405, "use GET or POST")
+        if not isinstance(symbols, list) or not isinstance(freqs, list):
+            raise ApiError(400, "symbols and timeframes must be lists")
+        symbols = [parse_symbol(s) for s in symbols if isinstance(s, str) and s.strip()]
+        freqs = [parse_freq(f) for f in freqs]
+        if not symbols:
+            raise ApiError(400, "missing symbols")
+        if len(symbols) * len(freqs) > MAX_BATCH:
+            raise ApiError(400, f"at most {MAX_BATCH} symbol x timeframe pairs per batch")
+        keys = [(s, f) for s in symbols for f in freqs]
+        entries = await asyncio.gather(*(service.levels(s, f, distance) for s, f in keys))
+        found = [e for e in entries if e is not None]
+        missing = [{"symbol": s, "timeframe": f} for (s, f), e in zip(keys, entries) if e is None]
+        # Splice the cached bodies instead of re-encoding them
+        out = b'{"results":[' + b",".join(e.body for e in found) + b'],"missing":' + \
+            json.dumps(missing).encode() + b"}"
+        etag = '"' + hashlib.blake2b("".join(e.etag for e in found).encode(), digest_size=12).hexdigest() + '"'
+        max_age = min((e.max_age_now() for e in found), default=0)
+        return 200, out, {"ETag": etag, "Cache-Control": _cache_control(max_age, distance)}
+
+    if path == "/history":
+        if method not in ("GET", "HEAD"):
+            raise ApiError(405, "use GET")
+        symbol, freq = _symbol(query), parse_freq(_param(query, "timeframe"))
+        start = _param(query, "start")
+        if start is not None:
+            try:
+                start = str(datetime.date.fromisoformat(start))
+            except ValueError:
+                raise ApiError(400, "start must be YYYY-MM-DD")
+        entry = await service.history(symbol, freq, start)
+        if entry is None:
+            raise ApiError(404, f"no data for {symbol}")
+        return 200, entry.body, entry.headers()
+
+    if path == "/health":
+        return 200, json.dumps({"ok": True, "hits": service.hits, "misses": service.misses}).encode(), \
+            {"Cache-Control": "no-store"}
+
+    raise ApiError(404, f"no route {url.path}")
+
+
+async def handle(service, reader, writer):
+    """One keep-alive connection: parse requests, answer each in turn."""
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                method, target, version = line.decode("latin-1").split()
+            except ValueError:
+                break
+            headers = {}
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = h.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            framed = False  # the body was read, so the connection can carry another request
+            try:
+                length = content_length(headers.get("content-length"))
+                body = await reader.readexactly(length) if length else b""
+                framed = True
+                status, payload, extra = await route(service, method, target, body)
+            except ApiError as e:
+                status, payload, extra = e.status, json.dumps({"error": str(e)}).encode(), {"Cache-Control": "no-store"}
+            except Exception as e:  # keep serving other requests
+                status, payload, extra = 500, json.dumps({"error": repr(e)}).encode(), {"Cache-Control": "no-store"}
+
+            etag = extra.get("ETag")
+            if status == 200 and etag and etag in headers.get("if-none-match", ""):
+                status, payload = 304, b""
+            keep_alive = framed and headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+            head = [f"HTTP/1.1 {status} {STATUS[status]}", "Content-Type: application/json",
+                    f"Content-Length: {len(payload) if status != 304 else 0}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                    *(f"{k}: {v}" for k, v in extra.items())]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode())
+            if method != "HEAD" and status != 304:
+                writer.write(payload)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8080, service=None):
+    service = service or LevelService()
+    server = await asyncio.start_server(lambda r, w: handle(service, r, w), host, port, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+
+# --- load test --------------------------------------------------------------
+
+async def _client(host, port, targets, count, etags, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(count):
+            target = targets[i % len(targets)]
+            extra = f"If-None-Match: {etags[target]}\r\n" if etags is not None and target in etags else ""
+            t = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n{extra}\r\n".encode())
+            await writer.drain()
+            status = await reader.readline()
+            length, etag = 0, None
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b""):
+                    break
+                name, _, value = h.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+                elif name.lower() == "etag":
+                    etag = value.strip()
+            if length:
+                await reader.readexactly(length)
+            latencies.append(time.perf_counter() - t)
+            if etags is not None and etag and b" 200 " in status:
+                etags[target] = etag
+    finally:
+        writer.close()
+
+
+async def bench(targets, requests=20000, connections=50, port=8765, revalidate=False):
+    """Requests/second against an in-process server (client and server share this process)."""
+    service = LevelService()
+    server = await asyncio.start_server(lambda r, w: handle(service, r, w), "127.0.0.1", port, backlog=1024)
+    latencies = []
+    # Warm the cache, then measure steady state
+    await _client("127.0.0.1", port, targets, len(targets), None, [])
+    etags = {} if revalidate else None
+    t = time.perf_counter()
+    per = requests // connections
+    await asyncio.gather(*(_client("127.0.0.1", port, targets, per, etags, latencies)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - t
+    server.close()
+    lat = np.array(latencies) * 1e3
+    return {"requests": len(latencies), "seconds": elapsed, "rps": len(latencies) / elapsed,
+            "p50_ms": float(np.percentile(lat, 50)), "p99_ms": float(np.percentile(lat, 99))}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for pivot levels.")
+    parser.add_argument("--host", default=os.environ.get("PIVOT_API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PIVOT_API_PORT", "8080")))
+    parser.add_argument("--bench", type=int, metavar="REQUESTS", help="run an in-process load test instead")
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--symbols", default="QQQ,SPY,TSLA", help="symbols for --bench")
+    parser.add_argument("--revalidate", action="store_true", help="--bench with If-None-Match (304s)")
+    args = parser.parse_args()
+
+    if args.bench:
+        targets = [f"/levels?symbol={s}&timeframe={f}" for s in args.symbols.split(",") for f in ("ME", "QE", "YE")]
+        r = asyncio.run(bench(targets, args.bench, args.connections, revalidate=args.revalidate))
+        print(f"{r['requests']} requests over {args.connections} connections in {r['seconds']:.2f}s: "
+              f"{r['rps']:,.0f} req/s, p50 {r['p50_ms']:.2f} ms, p99 {r['p99_ms']:.2f} ms")
+    else:
+        print(f"Serving pivot levels on http://{args.host}:{args.port}")
+        asyncio.run(serve(args.host, args.port))
@@ -1,7 +1,20 @@
-import streamlit as st
-import yfinance as yf
-import plotly.graph_objects as go
+import datetime
+
 import pandas as pd
+import streamlit as st
+
+from aggregate import aggregate_frame
+from backtest import frame_stats
+from data_store import load_history
+from downsample import compress_levels, downsample_frame
+from figures import pivot_figure
+from instrument import note_miss, sidebar_panel, span, start_run
+from pivot_engine import aligned_levels, rolling_levels, window_levels
+from range_index import RangeMaxIndex
+import shared_cache
+from single_flight import FLIGHT, coalesce
+
+start_run("app.py")
 
 # Page Configuration
 st.set_page_config(page_title="Stock Pivot Analyzer", layout="wide")
@@ -19,83 +32,171 @@ period_options = {
     "Weekly (w)": "W-MON",
     "Monthly (m)": "ME",
     "Quarterly (q)": "QE",
-    "Annually (a)": "YE"
+    "Annually (a)": "YE",
+    "Custom window": None
 }
 period_label = st.sidebar.selectbox("Pivot Period", options=list(period_options.keys()))
 freq = period_options[period_label]
 
-chart_type = st.sidebar.radio("Chart Type", ["Candlestick", "Line"])
+# Custom windows: rolling N-session pivots, or fixed pivots from a date range
+if freq is None:
+    window_mode = st.sidebar.radio("Window", ["Rolling sessions", "Date range"])
+    if window_mode == "Rolling sessions":
+        sessions = st.sidebar.number_input("Sessions", min_value=2, max_value=250, value=20)
+    else:
+        window_range = st.sidebar.date_input(
+            "Pivot window", value=(datetime.date(year - 1, 10, 1), datetime.date(year - 1, 12, 31)))
+
+# Unadjusted levels match the prices that actually traded before a split or dividend
+adjusted = st.sidebar.checkbox("Split/dividend adjusted", value=True)
+
+with st.sidebar.expander("Data request stats"):
+    st.json(FLIGHT.stats())
 
 # --- Data Processing ---
-@st.cache_data # This prevents re-downloading data every time you toggle a setting
-def get_data(ticker, year):
+@st.cache_data # This prevents re-reading data every time you toggle a setting
+@coalesce("app.get_data", ttl=60) # Sessions asking at the same moment share one load
+def get_data(ticker, year, adjusted=True):
+    note_miss()
     start_date = f"{year-1}-01-01"
     end_date = f"{year}-12-31"
-    df = yf.download(ticker, start=start_date, end=end_date, auto_adjust=True)
+    # Served from the local store; only bars newer than the last stored date hit Yahoo
+    df = load_history(ticker, start=start_date, end=end_date, adjusted=adjusted)
     return df
 
+def load_data(ticker, year, adjusted=True):
+    # Sliced from the shared memory-mapped cache when the ticker is published there,
+    # so replicas don't each hold the full history, with the store's bars since the
+    # snapshot appended. The cache only holds adjusted prices, so it is used only when
+    # `adjusted` is true; raw prices (and unpublished tickers) take the per-process
+    # cached load
+    df = shared_cache.current_history(ticker, start=f"{year-1}-01-01", end=f"{year}-12-31") if adjusted else None
+    return get_data(ticker, year, adjusted) if df is None else df
+
+@st.cache_data
+def get_period_bars(ticker, year, adjusted, asof):
+    note_miss()
+    # Every timeframe in one sweep, so switching the period selectbox costs nothing
+    return aggregate_frame(load_data(ticker, year, adjusted))
+
+# Range-max/min index over the loaded bars: any window's levels in O(1), a rolling
+# series in O(N). The O(N log N) build happens once per loaded frame and every
+# custom window reuses it; it is only read, so sessions share the one object.
+@st.cache_resource(max_entries=16)
+def get_range_index(ticker, year, adjusted, asof):
+    note_miss()
+    return RangeMaxIndex.from_frame(load_data(ticker, year, adjusted))
+
+# Everything derived from the bars is memoized on its real inputs, so a widget
+# that only changes the view never recomputes levels. `window` identifies a
+# custom window: ("sessions", n) or ("range", start, end); None for calendar periods.
+# `asof` is the date of the last loaded bar: load_data picks up the store's new
+# bars on every rerun, and keying on it recomputes the levels when one arrives.
+@st.cache_data
+def get_plot_data(ticker, year, adjusted, asof, freq, window):
+    note_miss()
+    df = load_data(ticker, year, adjusted)
+    if freq is not None:
+        # Pivot Formulas, applied to the daily bars of the following period
+        return aligned_levels(df, freq, bars=get_period_bars(ticker, year, adjusted, asof)[freq])
+
+    index = get_range_index(ticker, year, adjusted, asof)
+    if len(index) != len(df):  # a bar arrived between the two loads
+        index = RangeMaxIndex.from_frame(df)
+    if window[0] == "sessions":
+        return rolling_levels(df, window[1], index=index)
+    start, end = window[1:]
+    levels = window_levels(df, start, end, index=index)  # ValueError: no bars in the window
+    # Fixed levels, drawn from the first bar after the window
+    after = df.index > pd.Timestamp(end)
+    plot_data = pd.DataFrame({k: levels[k] for k in ('P', 'R1', 'S1')}, index=df.index)
+    plot_data[~after] = float("nan")
+    return plot_data
+
+@st.cache_data
+def get_chart_data(ticker, year, adjusted, asof, freq, window, view):
+    note_miss()
+    # The visible window is re-aggregated to the point budget whenever it changes
+    current_year_df = load_data(ticker, year, adjusted).loc[str(year)]
+    plot_levels = get_plot_data(ticker, year, adjusted, asof, freq, window).loc[str(year)]
+    chart_df = downsample_frame(current_year_df.loc[str(view[0]):str(view[1])])
+    steps = compress_levels(plot_levels.loc[str(view[0]):str(view[1])], ('P', 'R1', 'S1'))
+    return chart_df, steps
+
+@st.cache_data(max_entries=64)
+def get_figure(ticker, year, adjusted, asof, freq, window, view, chart_type):
+    note_miss()
+    chart_df, steps = get_chart_data(ticker, year, adjusted, asof, freq, window, view)
+    return pivot_figure(chart_df, steps, chart_type,
+                        height=700, template="plotly_dark", hovermode="x unified",
+                        xaxis_rangeslider_visible=(chart_type == "Candlestick"))
+
+@st.cache_data
+def get_hit_rates(ticker, year, adjusted, asof, freq, window):
+    note_miss()
+    return frame_stats(load_data(ticker, year, adjusted), get_plot_data(ticker, year, adjusted, asof, freq, window))
+
+# Chart-only widgets live in a fragment: changing them reruns just this block
+@st.fragment
+def chart_section(ticker, year, adjusted, asof, freq, window, first, last):
+    col1, col2 = st.columns([1, 3])
+    chart_type = col1.radio("Chart Type", ["Candlestick", "Line"], horizontal=True)
+    if first < last:
+        view = col2.slider("Visible Range", min_value=first, max_value=last, value=(first, last))
+    else:
+        view = (first, last)
+
+    # --- Plotly Chart ---
+    with span("build_figure", cached=True):
+        fig = get_figure(ticker, year, adjusted, asof, freq, window, view, chart_type)
+    with span("st.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
 if ticker:
-    df = get_data(ticker, year)
+    with span("get_data", cached=True) as s:
+        df = load_data(ticker, year, adjusted)
+        s.rows = len(df)
 
     if not df.empty:
-        # Clean MultiIndex if present
-        if isinstance(df.columns, pd.MultiIndex):
-            df = df.xs(ticker, axis=1, level=1)
-
-        # Resample for Pivot Calculations
-        logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
-        resampled = df.resample(freq).apply(logic)
-
-        # Pivot Formulas
-        resampled['P'] = (resampled['High'] + resampled['Low'] + resampled['Close']) / 3
-        resampled['R1'] = (resampled['P'] * 2) - resampled['Low']
-        resampled['S1'] = (resampled['P'] * 2) - resampled['High']
-        
-        # Shift and align to daily index
-        pivot_levels = resampled[['P', 'R1', 'S1']].shift(1)
-        plot_data = pd.DataFrame(index=df.index).join(pivot_levels).ffill()
-        
-        # Filter for the viewable year
-        current_year_df = df.loc[str(year)]
-        plot_levels = plot_data.loc[str(year)]
-
-        # --- Plotly Chart ---
-        fig = go.Figure()
-
-        if chart_type == "Candlestick":
-            fig.add_trace(go.Candlestick(
-                x=current_year_df.index,
-                open=current_year_df['Open'], high=current_year_df['High'],
-                low=current_year_df['Low'], close=current_year_df['Close'],
-                name='Price'
-            ))
+        asof = df.index[-1].date()
+        if freq is None:
+            if window_mode == "Rolling sessions":
+                window = ("sessions", int(sessions))
+            else:
+                window = ("range", *(tuple(window_range) * 2)[:2])
         else:
-            fig.add_trace(go.Scatter(x=current_year_df.index, y=current_year_df['Close'], 
-                                     name='Close Price', line=dict(color='#1f77b4')))
-
-        # Add Pivot Lines
-        levels_config = [
-            {'col': 'R1', 'name': 'R1 Resistance', 'color': '#FF4B4B'},
-            {'col': 'P',  'name': 'Pivot Point',  'color': '#FFA500'},
-            {'col': 'S1', 'name': 'S1 Support',    'color': '#00CC96'}
-        ]
-
-        for lvl in levels_config:
-            fig.add_trace(go.Scatter(
-                x=plot_levels.index, y=plot_levels[lvl['col']],
-                name=lvl['name'],
-                line=dict(color=lvl['color'], width=2, shape='hv'),
-                opacity=0.8
-            ))
-
-        fig.update_layout(height=700, template="plotly_dark", hovermode="x unified",
-                          xaxis_rangeslider_visible=(chart_type == "Candlestick"))
-
-        st.plotly_chart(fig, use_container_width=True)
+            window = None
+
+        with span("plot_data", cached=True):
+            try:
+                plot_data = get_plot_data(ticker, year, adjusted, asof, freq, window)
+            except ValueError:
+                st.error(f"No {ticker} bars between {window[1]} and {window[2]} in the loaded {year-1}-{year} data.")
+                st.stop()
+
+        # Filter for the viewable year (a slice, so a year without bars comes back empty)
+        current_year_df = df.loc[str(year):str(year)]
+        plot_levels = plot_data.loc[str(year):str(year)]
+        if current_year_df.empty:
+            st.error(f"No {ticker} bars in {year}; only {year-1} data was found.")
+            st.stop()
+
+        chart_section(ticker, year, adjusted, asof, freq, window,
+                      current_year_df.index[0].date(), current_year_df.index[-1].date())
         
         # Display the math for reference
         st.subheader("Current Period Pivot Values")
         st.table(plot_levels.tail(1))
 
+        # How price actually behaved around these levels over the loaded history
+        with st.expander("Level hit rates"):
+            with span("backtest", cached=True):
+                stats = get_hit_rates(ticker, year, adjusted, asof, freq, window)
+            st.dataframe(stats.round(3), use_container_width=True, hide_index=True)
+            st.caption("Rates are fractions of periods: touched = price reached the level, "
+                       "broke = a bar closed beyond it, bounced = touched without a close beyond.")
+
     else:
         st.error("No data found. Please check the ticker symbol.")
+
+sidebar_panel(st)
@@ -0,0 +1,213 @@
+"""
+Vectorized pivot backtest: how often did price touch, break or bounce off each level?
+
+For every period, each level in force (computed from the previous period)
+is classified against the bars of that period:
+
+    touched   price reached the level (high >= a level above the period open,
+              low <= a level below it)
+    broke     a bar closed beyond the level
+    bounced   touched but never closed beyond it
+
+plus the number of bars until the first touch and the maximum excursion
+beyond the level (% of the level). Everything is a reduceat over period
+runs, so a (tickers x bars) block is processed with no per-bar Python loop:
+
+    python backtest.py sp500.txt --timeframes ME,QE --workers 8
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import data_store
+from aggregate import _run_starts, align_to_bars
+from pivot_engine import LEVELS, compute_levels
+
+CHUNK_SIZE = 128
+STAT_COLUMNS = ['periods', 'touch_rate', 'break_rate', 'bounce_rate', 'median_bars_to_touch',
+                'mean_excursion_pct']
+
+Outcome = namedtuple('Outcome', ['valid', 'resistance', 'touched', 'broke', 'first_touch', 'excursion'])
+Outcome.__doc__ = """
+Per-period results for one level; every field has shape (..., periods).
+
+valid        the level existed for the period (not the first period of history)
+resistance   the level sat above the period open
+first_touch  bars from the period start to the first touch (-1 if untouched)
+excursion    max move beyond the level after touching, % of the level (NaN if untouched)
+"""
+
+
+def period_outcomes(bar_period, open_, high, low, close, levels):
+    """
+    Outcome of every period for each level.
+
+    `bar_period` is the non-decreasing period id of each bar (shared by all
+    rows); price arrays are (..., bars); `levels` maps names to per-bar
+    arrays of the level in force on that bar (the shifted, forward-filled
+    series the charts draw). Returns {name: Outcome}.
+    """
+    n = bar_period.shape[-1]
+    starts = _run_starts(bar_period)
+    lengths = np.diff(np.append(starts, n))
+    # On a shared calendar a row has NaN days it did not trade: they neither
+    # count as bars to the first touch nor supply the period open
+    traded = ~np.isnan(close)
+    count = np.cumsum(traded, axis=-1)
+    offset = count - np.repeat(count[..., starts] - traded[..., starts], lengths, axis=-1) - 1
+    first_bar = np.minimum.reduceat(np.where(traded, np.arange(n), n), starts, axis=-1)
+    opens = np.where(first_bar < n, np.take_along_axis(open_, np.minimum(first_bar, n - 1), axis=-1), np.nan)
+    period_open = np.repeat(opens, lengths, axis=-1)
+
+    out = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for name, lv in levels.items():
+            lv = np.asarray(lv, dtype=np.float64)
+            resist = lv > period_open
+            reach = np.where(resist, high >= lv, low <= lv)
+            beyond = np.where(resist, close > lv, close < lv)
+            excursion = np.where(reach, np.where(resist, high - lv, lv - low) / lv * 100, np.nan)
+
+            touched = np.logical_or.reduceat(reach, starts, axis=-1)
+            first = np.minimum.reduceat(np.where(reach, offset, n), starts, axis=-1)
+            out[name] = Outcome(
+                valid=~np.isnan(lv[..., starts]),
+                resistance=resist[..., starts],
+                touched=touched,
+                broke=np.logical_or.reduceat(beyond, starts, axis=-1),
+                first_touch=np.where(touched, first, -1),
+                excursion=np.fmax.reduceat(excursion, starts, axis=-1),
+            )
+    return out
+
+
+def summarize(outcomes):
+    """
+    {name: dict of stat arrays (shape ...)} — rates are fractions of valid periods.
+    """
+    stats = {}
+    for name, o in outcomes.items():
+        touched, broke = o.touched & o.valid, o.broke & o.valid
+        periods = o.valid.sum(axis=-1)
+        first = np.where(touched, o.first_touch, np.nan)
+        exc = np.where(touched, o.excursion, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats[name] = {
+                'periods': periods,
+                'touch_rate': touched.sum(axis=-1) / periods,
+                'break_rate': broke.sum(axis=-1) / periods,
+                'bounce_rate': (touched & ~broke).sum(axis=-1) / periods,
+                # all-NaN rows (never touched) are expected
+                'median_bars_to_touch': _nan_reduce(np.nanmedian, first),
+                'mean_excursion_pct': _nan_reduce(np.nanmean, exc),
+            }
+    return stats
+
+
+def _nan_reduce(fn, a):
+    import warnings
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return fn(a, axis=-1)
+
+
+def frame_stats(df, plot_data):
+    """
+    Hit-rate table for one chart: daily OHLC `df` plus the level frame the
+    apps draw (e.g. aligned_levels or rolling_levels output). Periods are the
+    runs where the levels stay constant.
+    """
+    values = plot_data.to_numpy(dtype=np.float64)
+    changed = np.any(values[1:] != values[:-1], axis=1) if len(values) else np.empty(0, bool)
+    bar_period = np.cumsum(np.concatenate(([False], changed)))
+    arrays = [df[c].to_numpy(dtype=np.float64) for c in ('Open', 'High', 'Low', 'Close')]
+    outcomes = period_outcomes(bar_period, *arrays, {k: plot_data[k].to_numpy() for k in plot_data.columns})
+    stats = summarize(outcomes)
+    return pd.DataFrame([{'Level': k, **{c: float(v) for c, v in s.items()}} for k, s in stats.items()])
+
+
+def block_stats(block, freq, levels=LEVELS):
+    """Per (ticker, level) stats for every ticker in a price_block.PriceBlock."""
+    bars = block.aggregate(freq)
+    lv = compute_levels(bars.high, bars.low, bars.close)
+    per_bar = align_to_bars(bars, {k: lv[k] for k in levels})
+    arrays = [block.column(c) for c in ('Open', 'High', 'Low', 'Close')]
+    stats = summarize(period_outcomes(bars.bar_period, *arrays, per_bar))
+
+    rows = []
+    for k in levels:
+        s = stats[k]
+        for i, t in enumerate(block.tickers):
+            rows.append({'ticker': t, 'timeframe': freq, 'level': k, **{c: s[c][i] for c in STAT_COLUMNS}})
+    return rows
+
+
+def _chunk_job(args):
+    from price_block import PriceBlock
+
+    symbols, freqs, levels, data_dir = args
+    data_store.DATA_DIR = data_dir
+    block = PriceBlock.from_store(symbols, dtype=np.float64)
+    if not len(block):
+        return []
+    return [row for f in freqs for row in block_stats(block, f, levels)]
+
+
+def run_universe(symbols, freqs=('ME',), levels=LEVELS, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Stats for every ticker x timeframe x level, one PriceBlock per chunk of
+    tickers in a process pool. Returns a DataFrame.
+    """
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+    jobs = [(chunk, tuple(freqs), tuple(levels), data_store.DATA_DIR) for chunk in chunks]
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for part in pool.map(_chunk_job, jobs):
+            rows.extend(part)
+    return pd.DataFrame(rows, columns=['ticker', 'timeframe', 'level'] + STAT_COLUMNS)
+
+
+def universe_summary(results):
+    """Period-weighted rates per timeframe x level across the whole universe."""
+    r = results[results['periods'] > 0].copy()
+    for c in ('touch_rate', 'break_rate', 'bounce_rate'):
+        r[c] = r[c] * r['periods']
+    g = r.groupby(['timeframe', 'level'], sort=False)
+    out = g[['periods', 'touch_rate', 'break_rate', 'bounce_rate']].sum()
+    for c in ('touch_rate', 'break_rate', 'bounce_rate'):
+        out[c] = out[c] / out['periods']
+    out['median_bars_to_touch'] = g['median_bars_to_touch'].median()
+    out['mean_excursion_pct'] = g['mean_excursion_pct'].mean()
+    return out.reset_index()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from screener import load_universe
+
+    parser = argparse.ArgumentParser(description="Touch/break/bounce statistics for pivot levels.")
+    parser.add_argument("universe", help="text file with one symbol per line, or CSV with a Symbol column")
+    parser.add_argument("--timeframes", default="W-MON,ME,QE,YE")
+    parser.add_argument("--levels", default=",".join(LEVELS))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", help="write per-ticker results to this CSV/Parquet file")
+    args = parser.parse_args()
+
+    symbols = load_universe(args.universe)
+    t = time.perf_counter()
+    results = run_universe(symbols, args.timeframes.split(","), args.levels.split(","), args.workers)
+    elapsed = time.perf_counter() - t
+    if args.out:
+        if args.out.endswith(".parquet"):
+            results.to_parquet(args.out, index=False)
+        else:
+            results.to_csv(args.out, index=False)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(universe_summary(results).round(3).to_string(index=False))
+    print(f"\n{results['ticker'].nunique()} tickers in {elapsed:.1f}s")
@@ -0,0 +1,132 @@
+"""
+Non-interactive batch renderer for a watchlist of pivot charts.
+
+Renders every (ticker, timeframe) chart in parallel worker processes. The
+plotly.js bundle is written once to the output directory and every chart
+page references it, so each page only carries its own (downsampled) data.
+An index.html links all the charts.
+
+    python batch_render.py QQQ SPY TSLA --timeframes w,m,q,a --out site
+    python batch_render.py --watchlist watchlist.txt --out site
+"""
+import datetime
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import data_store
+from aggregate import PERIOD_LETTERS
+from downsample import compress_levels, downsample_frame
+from figures import pivot_figure
+from pivot_engine import aligned_levels
+
+PERIOD_NAMES = {'d': "Daily", 'w': "Weekly", 'm': "Monthly", 'q': "Quarterly", 'a': "Annual"}
+
+
+def render_chart(ticker, year, letter, out_dir, write_json=False):
+    """
+    Write one chart page (and optionally its figure JSON). Returns the page file name.
+    """
+    freq = PERIOD_LETTERS[letter]
+    df = data_store.load_history(ticker, start=f"{year-1}-01-01", end=f"{year}-12-31")
+    current_year_df = df.loc[str(year)] if not df.empty else df
+    if current_year_df.empty:
+        raise ValueError(f"no {year} data for {ticker}")
+
+    plot_levels = aligned_levels(df, freq).loc[str(year)]
+    fig = pivot_figure(
+        downsample_frame(current_year_df), compress_levels(plot_levels, ('P', 'R1', 'S1')),
+        title=f"{ticker} - {year} Price Action with {PERIOD_NAMES[letter]} Pivots",
+        yaxis_title="Price (USD)",
+        xaxis_title="Date",
+        xaxis_rangeslider_visible=False,
+        template="plotly_dark",
+        height=800,
+        hovermode="x unified"
+    )
+
+    name = f"{ticker}_{letter}"
+    # 'directory' emits <script src="plotly.min.js"> instead of inlining the bundle
+    fig.write_html(os.path.join(out_dir, f"{name}.html"), include_plotlyjs="directory", full_html=True)
+    if write_json:
+        fig.write_json(os.path.join(out_dir, f"{name}.json"))
+    return f"{name}.html"
+
+
+def _render_job(args):
+    ticker, year, letter, out_dir, write_json, data_dir, offline = args
+    data_store.DATA_DIR, data_store.OFFLINE = data_dir, offline
+    try:
+        return ticker, letter, render_chart(ticker, year, letter, out_dir, write_json), None
+    except Exception as e:
+        return ticker, letter, None, str(e)
+
+
+def write_index(out_dir, year, results):
+    """index.html with one row per ticker and a link per timeframe."""
+    rows = {}
+    for ticker, letter, page, error in results:
+        cell = (f'<a href="{html.escape(page)}">{PERIOD_NAMES[letter]}</a>' if page
+                else f'<span title="{html.escape(error)}">{PERIOD_NAMES[letter]} (failed)</span>')
+        rows.setdefault(ticker, []).append(cell)
+
+    body = "\n".join(f"<tr><th>{html.escape(t)}</th><td>{' &middot; '.join(cells)}</td></tr>"
+                     for t, cells in rows.items())
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    with open(os.path.join(out_dir, "index.html"), "w") as f:
+        f.write(f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{year} Pivot Charts</title>
+<style>body{{font-family:sans-serif;background:#111;color:#eee}}a{{color:#FFA500}}
+th{{text-align:left;padding-right:1em}}td,th{{padding:4px}}</style></head>
+<body><h1>{year} Pivot Charts</h1><p>Generated {stamp}</p>
+<table>
+{body}
+</table></body></html>
+""")
+
+
+def render_batch(tickers, letters, year, out_dir, workers=None, write_json=False):
+    """Render every ticker x timeframe chart and the index page. Returns the job results."""
+    import plotly.offline
+
+    os.makedirs(out_dir, exist_ok=True)
+    # One shared copy of plotly.js for every page
+    with open(os.path.join(out_dir, "plotly.min.js"), "w", encoding="utf-8") as f:
+        f.write(plotly.offline.get_plotlyjs())
+
+    jobs = [(t.upper(), year, letter, out_dir, write_json, data_store.DATA_DIR, data_store.OFFLINE)
+            for t in tickers for letter in letters]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_render_job, jobs))
+
+    write_index(out_dir, year, results)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from screener import load_universe
+
+    parser = argparse.ArgumentParser(description="Render pivot charts for a watchlist.")
+    parser.add_argument("tickers", nargs="*")
+    parser.add_argument("--watchlist", help="file with one symbol per line")
+    parser.add_argument("--timeframes", default="w,m,q,a", help="comma-separated letters from d,w,m,q,a")
+    parser.add_argument("--year", type=int, default=datetime.date.today().year)
+    parser.add_argument("--out", default="site")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="also write each figure as JSON")
+    args = parser.parse_args()
+
+    tickers = list(args.tickers) + (load_universe(args.watchlist) if args.watchlist else [])
+    if not tickers:
+        parser.error("give tickers or --watchlist")
+    letters = [p.strip().lower() for p in args.timeframes.split(",")]
+    if any(letter not in PERIOD_LETTERS for letter in letters):
+        parser.error(f"timeframes must be letters from {','.join(PERIOD_LETTERS)}")
+
+    results = render_batch(tickers, letters, args.year, args.out, args.workers, args.json)
+    failed = [r for r in results if r[3]]
+    print(f"Rendered {len(results) - len(failed)} charts into {args.out}/ ({len(failed)} failed)")
+    for ticker, letter, _, error in failed:
+        print(f"  {ticker} {letter}: {error}")
@@ -0,0 +1,245 @@
+"""
+Offline benchmark suite for the pivot hot paths.
+
+Every stage is timed separately on deterministic synthetic data across a
+grid of universe sizes, and each run is saved as a JSON-lines file so runs can
+be compared:
+
+    python benchmark.py                         # default grid
+    python benchmark.py --sizes 1x2,500x10 --stages aggregate,levels
+    python benchmark.py --full                  # up to 5,000 tickers x 30 years
+    python benchmark.py --compare bench_results/previous.jsonl
+
+Per-ticker pandas stages run on at most PER_TICKER_SAMPLE tickers and report
+the extrapolated universe time (marked "sampled").
+"""
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregate import aggregate_all, align_to_bars, period_bars
+from downsample import compress_levels, downsample_frame
+from pivot_engine import aligned_levels, compute_levels, level_table, pct_distance
+from synthetic import synthetic_ohlcv
+
+DEFAULT_SIZES = [(1, 2), (10, 5), (100, 10), (500, 20)]
+FULL_SIZES = DEFAULT_SIZES + [(1000, 30), (5000, 30)]
+PER_TICKER_SAMPLE = 20
+REPEATS = 3
+RESULTS_DIR = "bench_results"
+LOGIC = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
+
+
+def _best(fn, repeats=REPEATS):
+    """Best wall time of `repeats` runs (GC disabled while timing)."""
+    best = float("inf")
+    for _ in range(repeats):
+        gc.collect()
+        gc.disable()
+        try:
+            t = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t)
+        finally:
+            gc.enable()
+    return best
+
+
+def _frame(data, i):
+    stamps, o, h, l, c, v = data
+    return pd.DataFrame({'Open': o[i], 'High': h[i], 'Low': l[i], 'Close': c[i], 'Volume': v[i]},
+                        index=pd.DatetimeIndex(stamps, name="Date")).dropna()
+
+
+# --- stages ---------------------------------------------------------------
+# Each stage takes the synthetic universe and returns {name: (seconds, sampled)}.
+
+def stage_aggregate(data, freq):
+    stamps, o, h, l, c, _ = data
+    n = o.shape[0]
+    k = min(n, PER_TICKER_SAMPLE)
+    frames = [_frame(data, i) for i in range(k)]
+    scale = n / k
+    return {
+        # the pre-aggregator path: df.resample(freq).apply(logic) per ticker
+        "aggregate.pandas_resample": (_best(lambda: [f.resample(freq).apply(LOGIC) for f in frames]) * scale,
+                                      k < n),
+        # what pivot-periods.plot_candlestick_pivots does now, per ticker
+        "aggregate.period_bars": (_best(lambda: [period_bars(f, freq) for f in frames]) * scale, k < n),
+        # every timeframe for the whole universe in one sweep
+        "aggregate.aggregate_all": (_best(lambda: aggregate_all(stamps, o, h, l, c)), False),
+    }
+
+
+def stage_levels(data, freq):
+    stamps, o, h, l, c, _ = data
+    bars = aggregate_all(stamps, o, h, l, c)[freq]
+    return {"levels.compute_levels": (_best(lambda: compute_levels(bars.high, bars.low, bars.close)), False)}
+
+
+def stage_align(data, freq):
+    stamps, o, h, l, c, _ = data
+    n = o.shape[0]
+    k = min(n, PER_TICKER_SAMPLE)
+    frames = [_frame(data, i) for i in range(k)]
+
+    def legacy():
+        for f in frames:
+            resampled = f.resample(freq).apply(LOGIC)
+            lv = compute_levels(resampled['High'], resampled['Low'], resampled['Close'])
+            pivot_levels = pd.DataFrame({k: lv[k] for k in ('P', 'R1', 'S1')}, index=resampled.index).shift(1)
+            pd.DataFrame(index=f.index).join(pivot_levels).ffill()
+
+    bars = aggregate_all(stamps, o, h, l, c)[freq]
+    lv = compute_levels(bars.high, bars.low, bars.close)
+    return {
+        "align.join_ffill": (_best(legacy) * n / k, k < n),
+        "align.aligned_levels": (_best(lambda: [aligned_levels(f, freq) for f in frames]) * n / k, k < n),
+        "align.align_to_bars": (_best(lambda: align_to_bars(bars, lv['P'])), False),
+    }
+
+
+def stage_figure(data, freq):
+    from figures import pivot_figure
+
+    f = _frame(data, 0)
+    plot_levels = aligned_levels(f, freq)
+
+    def build():
+        pivot_figure(downsample_frame(f), compress_levels(plot_levels, ('P', 'R1', 'S1')), "Candlestick",
+                     height=700, template="plotly_dark", hovermode="x unified")
+
+    def build_to_json():
+        pivot_figure(downsample_frame(f), compress_levels(plot_levels, ('P', 'R1', 'S1')), "Candlestick",
+                     height=700, template="plotly_dark", hovermode="x unified").to_json()
+
+    # One chart per request, so this is per ticker and not scaled
+    return {"figure.build": (_best(build), False), "figure.to_json": (_best(build_to_json), False)}
+
+
+def stage_distance(data, freq):
+    stamps, o, h, l, c, _ = data
+    n = o.shape[0]
+    bars = aggregate_all(stamps, o, h, l, c)[freq]
+    # Gap bars are NaN; the tables only need some finite price to format
+    price, H, L, C = (np.nan_to_num(a, nan=100.0) for a in
+                      (c[:, -1], bars.high[:, -2], bars.low[:, -2], bars.close[:, -2]))
+    k = min(n, PER_TICKER_SAMPLE)
+
+    def per_ticker_table():
+        # pivots_app builds one small DataFrame per symbol
+        for i in range(k):
+            rows = [{"Level": key, "Price": round(val, 2), "% Distance": f"{round(d)}%"}
+                    for key, val, d in level_table(H[i], L[i], C[i], price[i])]
+            pd.DataFrame(rows)
+
+    return {
+        "distance.per_ticker_table": (_best(per_ticker_table) * n / k, k < n),
+        "distance.universe_vectorized": (_best(lambda: pct_distance(compute_levels(H, L, C), price)), False),
+    }
+
+
+STAGES = {
+    "aggregate": stage_aggregate,
+    "levels": stage_levels,
+    "align": stage_align,
+    "figure": stage_figure,
+    "distance": stage_distance,
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, stages, freq="ME", bar_freq="1d", gap_prob=0.01, seed=0):
+    """Run every stage for every (tickers, years) size. Returns a list of result records."""
+    run_id = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    common = {"run": run_id, "commit": _git_commit(), "python": platform.python_version(),
+              "numpy": np.__version__, "pandas": pd.__version__, "freq": freq, "bar_freq": bar_freq}
+    records = []
+    for tickers, years in sizes:
+        data = synthetic_ohlcv(tickers, years, freq=bar_freq, gap_prob=gap_prob, seed=seed)
+        bars = data[0].size
+        for stage in stages:
+            for name, (seconds, sampled) in STAGES[stage](data, freq).items():
+                rec = dict(common, stage=name, tickers=tickers, years=years, bars=bars,
+                           seconds=seconds, sampled=sampled)
+                records.append(rec)
+                print(f"{name:<32} {tickers:>5} x {years:>2}y  {seconds * 1e3:>12.3f} ms"
+                      f"{'  (sampled)' if sampled else ''}")
+        del data
+    return records
+
+
+def save(records, path=None):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = path or os.path.join(RESULTS_DIR, f"{records[0]['run']}.jsonl")
+    with open(path, "w") as f:
+        for rec in records:
+            f.write(json.dumps(rec) + "\n")
+    return path
+
+
+def load(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(baseline, current, threshold=1.2):
+    """
+    Print current/baseline time ratios per (stage, size); returns the regressions.
+    """
+    key = lambda r: (r["stage"], r["tickers"], r["years"], r.get("freq"), r.get("bar_freq"))
+    base = {key(r): r for r in baseline}
+    regressions = []
+    for r in current:
+        b = base.get(key(r))
+        if b is None or not b["seconds"]:
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        flag = "REGRESSION" if ratio > threshold else ""
+        print(f"{r['stage']:<32} {r['tickers']:>5} x {r['years']:>2}y  {ratio:>6.2f}x  {flag}")
+        if flag:
+            regressions.append((r, b, ratio))
+    return regressions
+
+
+def _parse_sizes(text):
+    return [tuple(int(x) for x in s.lower().split("x")) for s in text.split(",")]
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmark the pivot hot paths on synthetic data.")
+    parser.add_argument("--sizes", help="comma-separated TICKERSxYEARS, e.g. 1x2,500x20")
+    parser.add_argument("--full", action="store_true", help="include 1,000 and 5,000 tickers x 30 years")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--freq", default="ME", help="pivot timeframe (B, W-MON, ME, QE, YE)")
+    parser.add_argument("--bar-freq", default="1d", choices=["1d", "5m", "1m"])
+    parser.add_argument("--gap-prob", type=float, default=0.01)
+    parser.add_argument("--out", help="results file (default bench_results/<run>.jsonl)")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="ratio that counts as a regression")
+    args = parser.parse_args()
+
+    sizes = _parse_sizes(args.sizes) if args.sizes else (FULL_SIZES if args.full else DEFAULT_SIZES)
+    records = run(sizes, args.stages.split(","), args.freq, args.bar_freq, args.gap_prob)
+    print(f"Saved {save(records, args.out)}")
+
+    if args.compare:
+        if compare(load(args.compare), records, args.threshold):
+            sys.exit(1)
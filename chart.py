@@ -1,30 +1,31 @@
-import yfinance as yf
 import plotly.graph_objects as go
-import pandas as pd
 
-def plot_interactive_pivots(ticker, year):
+from data_store import load_history
+from instrument import span, start_run
+from pivot_engine import compute_levels
+
+def plot_interactive_pivots(ticker, year, out="pivot_chart.html"):
+    start_run("chart.plot_interactive_pivots")
     # 1. Download data (Previous year + Current year)
     start_date = f"{year-1}-01-01"
     end_date = f"{year}-12-31"
     print(f"Fetching data for {ticker}...")
     
-    # auto_adjust=True ensures we use split/dividend adjusted prices
-    df = yf.download(ticker, start=start_date, end=end_date, auto_adjust=True)
+    # The store keeps raw bars plus a split/dividend table and adjusts on read;
+    # only new bars are fetched
+    with span("load_history") as s:
+        df = load_history(ticker, start=start_date, end=end_date)
+        s.rows = len(df)
     
     if df.empty:
         print("No data found for that ticker and year.")
         return
 
     # 2. Extract Previous Year to calculate levels
-    # Using .xs to handle potential MultiIndex columns from yfinance
     try:
-        if isinstance(df.columns, pd.MultiIndex):
-            prev_year_data = df.xs(ticker.upper(), axis=1, level=1).loc[str(year-1)]
-            current_year_data = df.xs(ticker.upper(), axis=1, level=1).loc[str(year)]
-        else:
-            prev_year_data = df.loc[str(year-1)]
-            current_year_data = df.loc[str(year)]
-            
+        prev_year_data = df.loc[str(year-1)]
+        current_year_data = df.loc[str(year)]
+
         high_p = float(prev_year_data['High'].max())
         low_p = float(prev_year_data['Low'].min())
         close_p = float(prev_year_data['Close'].iloc[-1])
@@ -33,10 +34,8 @@ def plot_interactive_pivots(ticker, year):
         return
 
     # 3. Pivot Formulas
-    pivot = (high_p + low_p + close_p) / 3
-    r1 = (pivot * 2) - low_p
-    s1 = (pivot * 2) - high_p
-    r2 = pivot + (high_p - low_p)
+    lv = compute_levels(high_p, low_p, close_p)
+    pivot, r1, s1, r2 = float(lv['P']), float(lv['R1']), float(lv['S1']), float(lv['R2'])
 
     # 4. Create the Interactive Plotly Figure
     fig = go.Figure()
@@ -79,9 +78,10 @@ def plot_interactive_pivots(ticker, year):
     )
 
     # Save as HTML (Best for Codespaces)
-    fig.write_html("pivot_chart.html")
+    with span("write_html"):
+        fig.write_html(out)
     print("\nSUCCESS!")
-    print("1. Find 'pivot_chart.html' in the file list on the left.")
+    print(f"1. Find '{out}' in the file list on the left.")
     print("2. Right-click it and select 'Open Preview'.")
 
 # --- Run the Script ---
@@ -0,0 +1,282 @@
+"""
+One non-interactive entry point for the command-line tools.
+
+    python cli.py levels QQQ SPY --timeframe ME,QE
+    echo "QQQ SPY TSLA" | python cli.py levels --timeframe monthly --format csv
+    python cli.py chart TSLA --year 2024 --timeframe QE
+    python cli.py screen watchlist.txt --timeframe Monthly --top 10
+    python cli.py export --watchlist watchlist.txt --timeframe ME,QE --out levels.parquet
+
+Symbols come from the arguments, a --watchlist file, or stdin. Only the
+standard library and timeframes.py are imported up front, so --help and
+argument errors never load NumPy: `levels` finds its levels in the
+materialized table (level_db.py) with sqlite3, and NumPy, pandas, Plotly and
+matplotlib load only when a subcommand needs them (the store's last close, a
+table miss, a chart, a screen).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from timeframes import FREQS, PERIOD_LETTERS, TIMEFRAME_ALIASES
+
+META = ('ticker', 'timeframe', 'period_start', 'period_end', 'high', 'low', 'close', 'last_date', 'last_close')
+
+
+def parse_timeframes(text):
+    out = []
+    for name in text.split(","):
+        freq = TIMEFRAME_ALIASES.get(name.strip().lower(), name.strip().upper())
+        if freq not in FREQS:
+            raise SystemExit(f"Unknown timeframe {name!r} (use {', '.join(FREQS)} or daily..annual)")
+        out.append(freq)
+    return out
+
+
+def read_symbols(args):
+    """Symbols from the command line, then --watchlist, then stdin when none were given (or '-')."""
+    symbols = [s for s in getattr(args, "symbols", []) if s != "-"]
+    if getattr(args, "watchlist", None):
+        with open(args.watchlist) as f:
+            symbols += [line.split(",")[0].strip() for line in f if line.strip()]
+    if not symbols or "-" in getattr(args, "symbols", []):
+        if not sys.stdin.isatty():
+            symbols += sys.stdin.read().replace(",", " ").split()
+    return [s.upper() for s in symbols if s and s.lower() != "symbol"]
+
+
+# --- levels ---------------------------------------------------------------
+
+def _computed(ticker, freq, adjusted=True):
+    # Table miss: shared cache levels, else the local store (pulls in pandas); the price is the store's
+    import datetime
+
+    import shared_cache
+    from data_store import load_history, years_ago
+    from pivot_engine import compute_levels, previous_period
+
+    df = load_history(ticker, start=years_ago(2), adjusted=adjusted)
+    if df.empty:
+        return None
+    hlc = (shared_cache.previous_hlc(ticker, freq) if adjusted else None) or \
+        previous_period(df, freq, datetime.date.today())
+    if hlc is None:
+        return None
+    (high, low, close), price = hlc, float(df['Close'].iloc[-1])
+    row = {'ticker': ticker, 'timeframe': freq, 'period_start': None, 'period_end': None,
+           'high': float(high), 'low': float(low), 'close': float(close),
+           'last_date': str(df.index[-1].date()), 'last_close': price}
+    row.update({k: float(v) for k, v in compute_levels(high, low, close).items()})
+    return row
+
+
+def _store_close(ticker):
+    # The table's last_close is as of the nightly run; the store has the latest session
+    from data_store import read_arrays
+
+    arrays = read_arrays(ticker, ('Close',))
+    if arrays is None or not len(arrays[0]):
+        return None
+    return str(arrays[0][-1]), float(arrays[1][-1])
+
+
+def level_rows(symbols, freqs, db_path=None, live=False, adjusted=True):
+    """
+    One dict per symbol x timeframe: period, source H/L/C, every level and the
+    current price (--live snapshot, else the store's last close). The level
+    table holds adjusted levels, so unadjusted ones are always computed from
+    the store.
+    """
+    import level_db
+
+    live_price = None
+    if live:
+        from live_feed import live_price
+    rows = []
+    for ticker in symbols:
+        last = None
+        for freq in freqs:
+            row = adjusted and level_db.latest(ticker, freq, db_path)
+            if row:
+                last = last or _store_close(ticker)
+                if last:
+                    row['last_date'], row['last_close'] = last
+            else:
+                row = _computed(ticker, freq, adjusted)
+            if row is None:
+                print(f"{ticker}: no data for {freq}", file=sys.stderr)
+                continue
+            price = (live_price(ticker) if live_price else None) or row['last_close']
+            row['price'] = price
+            rows.append(row)
+    return rows
+
+
+def _level_names(row):
+    return [k for k in row if k not in META and k != 'price']
+
+
+def print_table(rows):
+    for row in rows:
+        price = row['price']
+        header = f"{row['ticker']} {row['timeframe']} PIVOTS | Current Price: ${price:.2f}"
+        print(f"\n{header}\n{'=' * len(header)}")
+        print(f"{'Level':<6} | {'Price':<10} | {'% Distance':<10} | Status")
+        print("-" * 48)
+        for k in sorted(_level_names(row), key=lambda k: -row[k]):
+            v = row[k]
+            status = "ABOVE (Resistance)" if v > price else "BELOW (Support)"
+            print(f"{k:<6} | ${v:>9.2f} | {(v / price - 1) * 100:>+9.2f}% | {status}")
+
+
+def write_rows(rows, fmt, out=None):
+    """Write level rows as csv, json or parquet to `out` (default stdout)."""
+    if fmt == "parquet":
+        import pandas as pd
+
+        if not out:
+            raise SystemExit("--format parquet needs --out")
+        pd.DataFrame(rows).to_parquet(out, index=False)
+        return
+    f = open(out, "w", newline="") if out else sys.stdout
+    try:
+        if fmt == "json":
+            json.dump(rows, f, indent=1)
+            f.write("\n")
+        else:
+            fields = list(rows[0]) if rows else []
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    finally:
+        if out:
+            f.close()
+
+
+def cmd_levels(args):
+    rows = level_rows(read_symbols(args), parse_timeframes(args.timeframe), args.db, args.live,
+                      not args.unadjusted)
+    if args.format == "table":
+        print_table(rows)
+    else:
+        write_rows(rows, args.format, args.out)
+    return 0 if rows else 1
+
+
+# --- chart / screen / export ----------------------------------------------
+
+def cmd_chart(args):
+    import importlib
+
+    freq = parse_timeframes(args.timeframe)[0]
+    for ticker in read_symbols(args):
+        ext = "png" if args.style == "png" else "html"
+        out = (args.out or "{ticker}_{year}_{freq}." + ext).format(ticker=ticker, year=args.year, freq=freq)
+        if args.style == "candles":
+            letter = {v: k for k, v in PERIOD_LETTERS.items()}[freq]
+            importlib.import_module("pivot-periods").plot_candlestick_pivots(
+                ticker, args.year, letter, args.intraday, out=out)
+        elif args.style == "line":
+            importlib.import_module("chart").plot_interactive_pivots(ticker, args.year, out=out)
+        else:
+            importlib.import_module("pivotchart").plot_stock_pivots(ticker, args.year, out=out)
+    return 0
+
+
+def cmd_screen(args):
+    import pandas as pd
+
+    from screener import TIMEFRAMES, load_universe, scan
+
+    symbols = load_universe(args.universe) if args.universe else read_symbols(args)
+    names = {v: k for k, v in TIMEFRAMES.items()}
+    result = scan(symbols, names[parse_timeframes(args.timeframe)[0]], tuple(args.levels.split(",")),
+                  top=args.top, workers=args.workers)
+    if args.format == "table":
+        with pd.option_context('display.max_rows', None, 'display.width', 200):
+            print(result.round(2).to_string(index=False))
+    else:
+        write_rows(result.to_dict("records"), args.format, args.out)
+    return 0
+
+
+def cmd_export(args):
+    symbols, freqs = read_symbols(args), parse_timeframes(args.timeframe)
+    if args.history:
+        import pandas as pd
+
+        import level_db
+
+        frames = [level_db.history(t, f, args.start, args.db).reset_index() for t in symbols for f in freqs]
+        rows = pd.concat(frames).astype({'period_start': str, 'period_end': str}).to_dict("records") \
+            if frames else []
+    else:
+        rows = level_rows(symbols, freqs, args.db, args.live, not args.unadjusted)
+    fmt = args.format or os.path.splitext(args.out or "")[1].lstrip(".") or "csv"
+    write_rows(rows, fmt, args.out)
+    if args.out:
+        print(f"Wrote {len(rows)} rows to {args.out}", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Pivot point tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def symbols_args(p):
+        p.add_argument("symbols", nargs="*", help="tickers ('-' or none: read from stdin)")
+        p.add_argument("--watchlist", help="file with one symbol per line")
+
+    p = sub.add_parser("levels", help="current pivot levels and distances")
+    symbols_args(p)
+    p.add_argument("--timeframe", default="ME", help="comma-separated: W-MON,ME,QE,YE or weekly..annual")
+    p.add_argument("--format", default="table", choices=["table", "csv", "json"])
+    p.add_argument("--out", help="write csv/json here instead of stdout")
+    p.add_argument("--db", default=None, help="level table (default PIVOT_LEVELS_DB)")
+    p.add_argument("--live", action="store_true", help="use live_feed.py snapshot prices when fresh")
+    p.add_argument("--unadjusted", action="store_true", help="levels from raw (not split/dividend adjusted) prices")
+    p.set_defaults(func=cmd_levels)
+
+    p = sub.add_parser("chart", help="write pivot charts")
+    symbols_args(p)
+    p.add_argument("--year", type=int, required=True)
+    p.add_argument("--timeframe", default="YE", help="pivot timeframe (candles style)")
+    p.add_argument("--style", default="candles", choices=["candles", "line", "png"],
+                   help="candles: Plotly candlesticks, line: Plotly annual, png: matplotlib annual")
+    p.add_argument("--intraday", help="intraday bars file for candles")
+    p.add_argument("--out", help="output path; {ticker}, {year}, {freq} are filled in")
+    p.set_defaults(func=cmd_chart)
+
+    p = sub.add_parser("screen", help="rank symbols by distance to a level")
+    p.add_argument("universe", nargs="?", help="universe file (default: symbols on stdin)")
+    p.add_argument("--timeframe", default="ME")
+    p.add_argument("--levels", default="R1,S1,P")
+    p.add_argument("--top", type=int, default=25)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--format", default="table", choices=["table", "csv", "json"])
+    p.add_argument("--out")
+    p.set_defaults(func=cmd_screen, symbols=[])
+
+    p = sub.add_parser("export", help="dump levels for many symbols to csv/json/parquet")
+    symbols_args(p)
+    p.add_argument("--timeframe", default="W-MON,ME,QE,YE")
+    p.add_argument("--out", help="output file (default stdout); the extension picks the format")
+    p.add_argument("--format", choices=["csv", "json", "parquet"])
+    p.add_argument("--history", action="store_true", help="every stored period instead of the current one")
+    p.add_argument("--start", help="first period_start for --history")
+    p.add_argument("--db", default=None)
+    p.add_argument("--live", action="store_true")
+    p.add_argument("--unadjusted", action="store_true")
+    p.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
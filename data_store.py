@@ -0,0 +1,329 @@
+"""
+Local on-disk OHLCV store shared by every script.
+
+Each ticker lives in its own Parquet file under PIVOT_DATA_DIR (default ./data).
+Reads are served from disk and only the bars after the last stored date are
+fetched from Yahoo. Set PIVOT_OFFLINE=1 to run purely from a pre-seeded store.
+
+Bars are stored unadjusted, next to a small <TICKER>.actions.parquet table of
+splits and dividends; readers get split/dividend adjusted prices by default
+(adjusted=False for the raw ones), computed on read by adjust.py.
+"""
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from adjust import ACTION_COLUMNS, action_factors, adjust_arrays, adjust_frame, unsplit
+from instrument import note_miss, span
+
+DATA_DIR = os.environ.get("PIVOT_DATA_DIR", "data")
+OFFLINE = os.environ.get("PIVOT_OFFLINE", "") not in ("", "0")
+# Don't hit Yahoo again for a ticker refreshed less than this many seconds ago
+REFRESH_SECONDS = int(os.environ.get("PIVOT_REFRESH_SECONDS", "3600"))
+DEFAULT_YEARS = 2
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def _path(ticker, suffix=".parquet"):
+    return os.path.join(DATA_DIR, f"{ticker.upper()}{suffix}")
+
+
+def _empty_frame():
+    return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+
+
+def _write_atomic(path, write):
+    """Write to a temp file then swap it in, so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def read_store(ticker):
+    """
+    Return every stored bar for a ticker (empty frame if nothing is stored yet).
+    """
+    path = _path(ticker)
+    if not os.path.exists(path):
+        return _empty_frame()
+    return pd.read_parquet(path)
+
+
+def read_arrays(ticker, columns=('Open', 'High', 'Low', 'Close'), adjusted=True, start=None):
+    """
+    Stored bars as NumPy arrays (dates as datetime64[D], then `columns`), skipping pandas.
+
+    Much cheaper than read_store when scanning thousands of tickers. With
+    `start`, only bars on or after it are read (the adjustment factors still
+    come from the whole actions table).
+    """
+    import pyarrow.parquet as pq
+
+    path = _path(ticker)
+    if not os.path.exists(path):
+        return None
+    filters = None if start is None else [("Date", ">=", pd.Timestamp(start))]
+    table = pq.read_table(path, columns=["Date", *columns], filters=filters)
+    dates = table.column("Date").to_numpy().astype("datetime64[D]")
+    arrays = [table.column(c).to_numpy() for c in columns]
+    if adjusted and columns and os.path.exists(_path(ticker, ".actions.parquet")):
+        arrays = adjust_arrays(dates, columns, arrays, read_actions(ticker))
+    return (dates, *arrays)
+
+
+def write_store(ticker, df):
+    _write_atomic(_path(ticker), lambda tmp: df.to_parquet(tmp))
+
+
+def _empty_actions():
+    return pd.DataFrame(columns=ACTION_COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+
+
+def read_actions(ticker):
+    """
+    Corporate actions for a ticker, indexed by ex-date: Split ratio (1 for
+    none), raw cash Dividend and the price Factor (empty frame if none).
+    """
+    path = _path(ticker, ".actions.parquet")
+    if not os.path.exists(path):
+        return _empty_actions()
+    return pd.read_parquet(path)
+
+
+def write_actions(ticker, actions):
+    _write_atomic(_path(ticker, ".actions.parquet"), lambda tmp: actions.to_parquet(tmp))
+
+
+def actions_frame(dates, splits, dividends):
+    """Action rows (factors not yet computed) for the dates with a split or a dividend."""
+    splits = np.asarray(splits, dtype=np.float64)
+    splits = np.where(splits > 0, splits, 1.0)  # yfinance reports 0 for "no split"
+    dividends = np.nan_to_num(np.asarray(dividends, dtype=np.float64))
+    keep = (splits != 1) | (dividends != 0)
+    index = pd.DatetimeIndex(np.asarray(dates)[keep], name="Date").normalize()
+    return pd.DataFrame({'Split': splits[keep], 'Dividend': dividends[keep], 'Factor': np.nan}, index=index)
+
+
+def merge_actions(stored, fresh, bars):
+    """
+    Union of stored and new actions (the fresh copy of an ex-date wins) with
+    factors computed from the raw closes in `bars`.
+    """
+    frames = [f for f in (stored, fresh) if f is not None and not f.empty]
+    if not frames:
+        return _empty_actions()
+    df = pd.concat(frames)
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    df['Factor'] = action_factors(df.index.values, df['Split'].to_numpy(), df['Dividend'].to_numpy(),
+                                  bars.index.values, bars['Close'].to_numpy())
+    return df
+
+
+def read_meta(ticker):
+    path = _path(ticker, ".meta.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_meta(ticker, meta):
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+    _write_atomic(_path(ticker, ".meta.json"), write)
+
+
+def _clean(df, ticker):
+    """Flatten yfinance output to a tz-naive daily frame with the store columns."""
+    if df is None or df.empty:
+        return _empty_frame()
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.xs(ticker, axis=1, level=1)
+    df = df[[c for c in COLUMNS if c in df.columns]].astype("float64")
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    df.index = df.index.normalize()
+    df.index.name = "Date"
+    return df
+
+
+def download(ticker, start, end=None):
+    """
+    Fetch unadjusted bars and the actions in [start, end) from Yahoo.
+
+    Returns (bars, actions). Yahoo's OHLC is split-adjusted as of today, so
+    the splits in the window are divided back out; `end` should be None (the
+    present) so every split after the window's bars is seen.
+    """
+    import yfinance as yf
+
+    note_miss()
+    with span("yahoo.download") as s:
+        df = yf.download(ticker, start=start, end=end, auto_adjust=False, actions=True, progress=False)
+        s.rows = len(df)
+    bars = _clean(df, ticker.upper())
+    if bars.empty:
+        return bars, _empty_actions()
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.xs(ticker.upper(), axis=1, level=1)
+    dates = bars.index.values
+    splits = df['Stock Splits'].reindex(bars.index).fillna(0).to_numpy() if 'Stock Splits' in df else np.zeros(len(bars))
+    dividends = df['Dividends'].reindex(bars.index).fillna(0).to_numpy() if 'Dividends' in df else np.zeros(len(bars))
+    actions = actions_frame(dates, splits, dividends)
+    mult = unsplit(dates, actions.index.values, actions['Split'].to_numpy())
+    for c in ('Open', 'High', 'Low', 'Close'):
+        bars[c] = bars[c] * mult
+    if 'Volume' in bars:
+        bars['Volume'] = bars['Volume'] / mult
+    actions['Dividend'] = actions['Dividend'] * mult[np.searchsorted(dates, actions.index.values)]
+    return bars, actions
+
+
+def merge_bars(stored, fresh):
+    """Combine stored and newly fetched bars, preferring the fresh copy of a date."""
+    frames = [f for f in (stored, fresh) if not f.empty]
+    if not frames:
+        return _empty_frame()
+    df = pd.concat(frames)
+    df = df[~df.index.duplicated(keep="last")]
+    return df.sort_index()
+
+
+def top_up(ticker, start=None):
+    """
+    Bring the stored history for a ticker up to date and back to `start`.
+
+    Only the missing ranges are requested: bars before the earliest date we
+    have ever asked for, and bars from the last stored date onward (the last
+    bar is re-fetched because it may have been a partial session).
+    """
+    ticker = ticker.upper()
+    today = pd.Timestamp.today().normalize()
+    start = pd.Timestamp(start) if start is not None else today - pd.DateOffset(years=DEFAULT_YEARS)
+
+    stored = read_store(ticker)
+    meta = read_meta(ticker)
+    if _legacy(meta):
+        stored = _empty_frame()
+    if "covered_from" in meta and not stored.empty:
+        covered_from = pd.Timestamp(meta["covered_from"])
+    else:
+        # A store seeded by copying Parquet files has no sidecar; trust its range
+        covered_from = None if stored.empty else stored.index[0]
+    fresh_enough = time.time() - meta.get("updated", 0) < REFRESH_SECONDS
+
+    fetched = []
+    if stored.empty:
+        fetched.append(download(ticker, start))
+        covered_from = start
+    else:
+        if start < covered_from:
+            # Fetched through today (not just to covered_from) so later splits can be undone
+            fetched.append(download(ticker, start))
+            covered_from = start
+        if not fresh_enough and stored.index[-1] < today:
+            fetched.append(download(ticker, stored.index[-1]))
+
+    if not fetched:
+        return stored
+
+    df, actions = stored, read_actions(ticker) if not stored.empty else None
+    for fresh, fresh_actions in fetched:
+        df = merge_bars(df, fresh)
+        actions = merge_actions(actions, fresh_actions, df)
+    _save(ticker, df, actions, covered_from)
+    return df
+
+
+def _legacy(meta):
+    # Written before the store kept raw bars: those bars are already adjusted,
+    # so they are fetched again once instead of being mixed with raw ones
+    return bool(meta) and not meta.get("raw")
+
+
+def _save(ticker, df, actions, covered_from):
+    write_store(ticker, df)
+    if not actions.empty or os.path.exists(_path(ticker, ".actions.parquet")):
+        write_actions(ticker, actions)
+    write_meta(ticker, {"covered_from": str(covered_from.date()), "updated": time.time(), "raw": True})
+
+
+def warm_store(tickers, start=None, **fetch_kwargs):
+    """
+    Top up many tickers at once through the batched fetch layer.
+
+    Each ticker is requested from its last stored date (or from `start` when
+    it has nothing stored yet). Returns {ticker: stored bar count}.
+    """
+    from fetch import fetch_many, to_frame
+
+    start = pd.Timestamp(start) if start is not None else years_ago(DEFAULT_YEARS)
+    stored, starts, covered = {}, {}, {}
+    for t in dict.fromkeys(t.upper() for t in tickers):
+        meta = read_meta(t)
+        stored[t] = _empty_frame() if _legacy(meta) else read_store(t)
+        covered_from = pd.Timestamp(meta.get("covered_from", start))
+        if stored[t].empty or start < covered_from:
+            starts[t], covered[t] = start, start
+        else:
+            starts[t], covered[t] = stored[t].index[-1], covered_from
+
+    counts = {}
+    fetch_kwargs.setdefault("adjusted", False)
+    for t, arrays in fetch_many(list(starts), starts, **fetch_kwargs).items():
+        fresh = to_frame(arrays)
+        df = stored[t] if fresh is None else merge_bars(stored[t], fresh)
+        if fresh is not None:
+            fresh_actions = actions_frame(*arrays['actions']) if 'actions' in arrays else None
+            old_actions = read_actions(t) if not stored[t].empty else None
+            _save(t, df, merge_actions(old_actions, fresh_actions, df), covered[t])
+        counts[t] = len(df)
+    return counts
+
+
+def load_history(ticker, start=None, end=None, offline=None, adjusted=True):
+    """
+    Return daily OHLCV bars for `ticker` between `start` and `end` (inclusive),
+    split/dividend adjusted unless `adjusted` is False.
+
+    This is the single entry point every script uses instead of calling
+    yfinance directly.
+    """
+    if offline is None:
+        offline = OFFLINE
+    # "hit" when served entirely from disk, "miss" when Yahoo had to be called
+    with span("data_store.load_history", cached=True) as s:
+        if offline:
+            df = read_store(ticker)
+        else:
+            df = top_up(ticker, start)
+        if adjusted:
+            # Factors come from the whole history, so adjust before slicing
+            df = adjust_frame(df, read_actions(ticker))
+        df = df.loc[start:end]
+        s.rows = len(df)
+    return df
+
+
+def years_ago(years):
+    """Start date equivalent to yfinance's period=f"{years}y"."""
+    return pd.Timestamp.today().normalize() - pd.DateOffset(years=years)
+
+
+if __name__ == "__main__":
+    # Seed or refresh the store: python data_store.py QQQ SPY --years 10
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seed the local OHLCV store.")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--years", type=int, default=DEFAULT_YEARS)
+    args = parser.parse_args()
+
+    for t, count in warm_store(args.tickers, years_ago(args.years)).items():
+        print(f"{t}: {count} bars stored in {_path(t)}")
@@ -0,0 +1,68 @@
+"""
+Server-side downsampling for long-range pivot charts.
+
+Candles are merged into fixed-size buckets so the figure never carries more
+points than the chart can show, and the step-shaped pivot series are reduced
+to their change points (they are constant within a period, so a 'hv' line
+through the change points draws exactly the same steps).
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+# Roughly the plot area of a wide Streamlit layout, and pixels per candle
+CHART_WIDTH_PX = 1400
+PX_PER_POINT = 3
+
+
+def point_budget(width_px=CHART_WIDTH_PX, px_per_point=PX_PER_POINT):
+    return max(1, width_px // px_per_point)
+
+
+def downsample_ohlc(dates, open_, high, low, close, max_points):
+    """
+    Merge consecutive bars into at most `max_points` OHLC buckets.
+
+    Each bucket is labelled with its first date. Inputs are returned
+    untouched when they already fit.
+    """
+    n = len(dates)
+    if n <= max_points:
+        return dates, open_, high, low, close
+    size = math.ceil(n / max_points)
+    starts = np.arange(0, n, size)
+    ends = np.concatenate((starts[1:], [n])) - 1
+    return (dates[starts], open_[starts], np.fmax.reduceat(high, starts),
+            np.fmin.reduceat(low, starts), close[ends])
+
+
+def downsample_frame(df, max_points=None):
+    """downsample_ohlc for a daily OHLC frame; returns a frame of the same shape."""
+    max_points = max_points or point_budget()
+    if len(df) <= max_points:
+        return df
+    cols = ('Open', 'High', 'Low', 'Close')
+    dates, *values = downsample_ohlc(df.index.values, *(df[c].to_numpy(dtype=np.float64) for c in cols),
+                                     max_points)
+    return pd.DataFrame(dict(zip(cols, values)), index=pd.DatetimeIndex(dates, name=df.index.name))
+
+
+def compress_steps(x, y):
+    """
+    Keep only the points where a step series changes value (plus the last point).
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if y.size <= 2:
+        return x, y
+    prev, cur = y[:-1], y[1:]
+    same = (cur == prev) | (np.isnan(cur) & np.isnan(prev))
+    keep = np.concatenate(([True], ~same))
+    keep[-1] = True
+    return x[keep], y[keep]
+
+
+def compress_levels(plot_levels, columns):
+    """{column: (x, y)} change points for each level column of an aligned levels frame."""
+    x = plot_levels.index.values
+    return {col: compress_steps(x, plot_levels[col].to_numpy()) for col in columns}
@@ -0,0 +1,167 @@
+"""
+Batched multi-ticker download layer.
+
+Symbols are split into batches; each batch runs on its own worker thread with
+one keep-alive HTTP session, so a whole batch shares a single connection. At
+most `max_workers` batches are in flight at once, and throttled or failed
+requests are retried with exponential backoff.
+
+Results are per-ticker NumPy arrays built straight from the JSON payload.
+Point `base_url` at a local stand-in server to exercise it offline.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+YAHOO_CHART_URL = "https://query2.finance.yahoo.com/v8/finance/chart"
+BATCH_SIZE = 50
+MAX_WORKERS = 8
+RETRIES = 4
+BACKOFF = 0.5
+TIMEOUT = 10
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+class FetchError(Exception):
+    """A symbol could not be fetched after all retries."""
+
+
+def _session():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.headers["User-Agent"] = "Mozilla/5.0 (pivot-fetch)"
+    # One connection per batch, kept alive for every symbol in it
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _epoch(ts):
+    return int(pd.Timestamp(ts).timestamp())
+
+
+def _get(session, url, params, retries, backoff):
+    import requests
+
+    for attempt in range(retries + 1):
+        try:
+            r = session.get(url, params=params, timeout=TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == retries:
+                raise FetchError(str(e)) from e
+            time.sleep(backoff * 2 ** attempt)
+            continue
+        if r.status_code == 200:
+            return r.json()
+        if r.status_code == 404:
+            return None
+        if r.status_code not in RETRY_STATUS or attempt == retries:
+            raise FetchError(f"HTTP {r.status_code} for {url}")
+        delay = backoff * 2 ** attempt
+        retry_after = r.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay)
+
+
+def _events(result):
+    """(dates, split ratios, dividends) of the payload's corporate actions, one entry per ex-date."""
+    events = result.get("events") or {}
+    rows = {}
+    for s in (events.get("splits") or {}).values():
+        rows.setdefault(s["date"], [1.0, 0.0])[0] = s["numerator"] / s["denominator"]
+    for d in (events.get("dividends") or {}).values():
+        rows.setdefault(d["date"], [1.0, 0.0])[1] = d["amount"]
+    stamps = sorted(rows)
+    dates = np.array(stamps, dtype="datetime64[s]").astype("datetime64[D]")
+    return dates, np.array([rows[t][0] for t in stamps]), np.array([rows[t][1] for t in stamps])
+
+
+def parse_chart(payload, adjusted=True):
+    """
+    Turn a v8 chart payload into {'dates': datetime64[D], 'Open': ..., ...}.
+
+    Prices are split/dividend adjusted like yfinance's auto_adjust=True. With
+    adjusted=False they are the raw traded prices instead, and 'actions'
+    holds (ex-dates, split ratios, raw dividends) for data_store.
+    Returns None when the payload carries no bars.
+    """
+    result = (payload or {}).get("chart", {}).get("result") or []
+    if not result or not result[0].get("timestamp"):
+        return None
+    result = result[0]
+    quote = result["indicators"]["quote"][0]
+    arrays = {'dates': np.array(result["timestamp"], dtype="datetime64[s]").astype("datetime64[D]")}
+    for col in COLUMNS:
+        arrays[col] = np.array(quote.get(col.lower(), []), dtype=np.float64)
+
+    if not adjusted:
+        from adjust import unsplit
+
+        # Yahoo's quote is split-adjusted as of today: divide out the later splits
+        dates, splits, dividends = _events(result)
+        mult = unsplit(arrays['dates'], dates, splits)
+        for col in ('Open', 'High', 'Low', 'Close'):
+            arrays[col] *= mult
+        arrays['Volume'] /= mult
+        arrays['actions'] = (dates, splits, dividends * unsplit(dates, dates, splits))
+        return arrays
+
+    adj = result["indicators"].get("adjclose")
+    if adj:
+        ratio = np.array(adj[0]["adjclose"], dtype=np.float64) / arrays['Close']
+        for col in ('Open', 'High', 'Low', 'Close'):
+            arrays[col] *= ratio
+    return arrays
+
+
+def _fetch_batch(symbols, starts, end, base_url, retries, backoff, adjusted):
+    session = _session()
+    out = {}
+    try:
+        for symbol in symbols:
+            params = {"period1": _epoch(starts[symbol]), "interval": "1d",
+                      "events": "div,splits", "includeAdjustedClose": "true"}
+            params["period2"] = _epoch(end) if end is not None else int(time.time())
+            out[symbol] = parse_chart(_get(session, f"{base_url}/{symbol}", params, retries, backoff), adjusted)
+    finally:
+        session.close()
+    return out
+
+
+def fetch_many(symbols, start, end=None, base_url=YAHOO_CHART_URL, batch_size=BATCH_SIZE,
+               max_workers=MAX_WORKERS, retries=RETRIES, backoff=BACKOFF, adjusted=True):
+    """
+    Download daily bars for many symbols.
+
+    `start` is one date for every symbol or a {symbol: date} dict. Returns
+    {symbol: arrays or None}; None means the symbol has no data. With
+    adjusted=False the arrays are raw prices plus their corporate actions.
+    """
+    symbols = [s.upper() for s in symbols]
+    starts = start if isinstance(start, dict) else dict.fromkeys(symbols, start)
+    starts = {s.upper(): v for s, v in starts.items()}
+    batches = [symbols[i:i + batch_size] for i in range(0, len(symbols), batch_size)]
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_fetch_batch, b, starts, end, base_url, retries, backoff, adjusted)
+                   for b in batches]
+        for f in futures:
+            results.update(f.result())
+    return results
+
+
+def to_frame(arrays):
+    """Arrays from fetch_many as a store-shaped DataFrame."""
+    if arrays is None:
+        return None
+    df = pd.DataFrame({c: arrays[c] for c in COLUMNS}, index=pd.DatetimeIndex(arrays['dates'], name="Date"))
+    return df.dropna(subset=['Close'])
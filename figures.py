@@ -0,0 +1,45 @@
+"""
+Plotly figure builders shared by the apps, the CLI scripts and the batch renderer.
+"""
+import plotly.graph_objects as go
+
+# Pivot lines drawn on the price charts
+LEVELS_CONFIG = [
+    {'col': 'R1', 'name': 'R1 Resistance', 'color': '#FF4B4B'},
+    {'col': 'P',  'name': 'Pivot Point',  'color': '#FFA500'},
+    {'col': 'S1', 'name': 'S1 Support',    'color': '#00CC96'}
+]
+
+
+def pivot_figure(chart_df, steps, chart_type="Candlestick", **layout):
+    """
+    Price trace plus one step line per pivot level.
+
+    `chart_df` is a (downsampled) OHLC frame and `steps` maps level columns
+    to (x, y) change points from downsample.compress_levels. Extra keyword
+    arguments go to fig.update_layout.
+    """
+    fig = go.Figure()
+
+    if chart_type == "Candlestick":
+        fig.add_trace(go.Candlestick(
+            x=chart_df.index,
+            open=chart_df['Open'], high=chart_df['High'],
+            low=chart_df['Low'], close=chart_df['Close'],
+            name='Price'
+        ))
+    else:
+        fig.add_trace(go.Scatter(x=chart_df.index, y=chart_df['Close'],
+                                 name='Close Price', line=dict(color='#1f77b4')))
+
+    for lvl in LEVELS_CONFIG:
+        x, y = steps[lvl['col']]
+        fig.add_trace(go.Scatter(
+            x=x, y=y,
+            name=lvl['name'],
+            line=dict(color=lvl['color'], width=2, shape='hv'), # 'hv' = horizontal-then-vertical steps
+            opacity=0.8
+        ))
+
+    fig.update_layout(**layout)
+    return fig
@@ -0,0 +1,146 @@
+"""
+Stage-level timing instrumentation.
+
+Wrap each stage of an entry point in a named span to record its wall time,
+rows processed and (for cached functions) whether the cache was hit:
+
+    run = start_run("app.py")
+    with span("get_data", cached=True) as s:
+        df = get_data(ticker, year)        # the cached body calls note_miss()
+        s.rows = len(df)
+
+Spans are collected on the current run (one per Streamlit rerun or CLI
+call) for the optional sidebar panel, and appended as JSON lines to
+PIVOT_TRACE_FILE when it is set, so sessions can be aggregated later with
+`python instrument.py trace.jsonl`.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+TRACE_FILE = os.environ.get("PIVOT_TRACE_FILE")
+
+_run = contextvars.ContextVar("pivot_run", default=None)
+_stack = contextvars.ContextVar("pivot_span_stack", default=())
+_sink_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, rows=None, cached=False):
+        self.name = name
+        self.rows = rows
+        self.cache = "hit" if cached else None  # flipped to "miss" by note_miss()
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def to_dict(self):
+        return {"span": self.name, "ms": round(self.seconds * 1e3, 3), "rows": self.rows, "cache": self.cache}
+
+
+class Run:
+    def __init__(self, entry_point):
+        self.id = uuid.uuid4().hex[:12]
+        self.entry_point = entry_point
+        self.started = time.time()
+        self.spans = []
+
+
+def start_run(entry_point):
+    """Begin a new run (call once at the top of each script execution)."""
+    run = Run(entry_point)
+    _run.set(run)
+    _stack.set(())
+    return run
+
+
+def current_run():
+    return _run.get()
+
+
+@contextlib.contextmanager
+def span(name, rows=None, cached=False):
+    s = Span(name, rows, cached)
+    token = _stack.set(_stack.get() + (s,))
+    try:
+        yield s
+    finally:
+        s.seconds = time.perf_counter() - s.start
+        _stack.reset(token)
+        run = _run.get()
+        if run is not None:
+            run.spans.append(s)
+        if TRACE_FILE:
+            _emit(run, s)
+
+
+def note_miss():
+    """Mark the innermost cached span as a cache miss (call inside the cached body)."""
+    for s in reversed(_stack.get()):
+        if s.cache is not None:
+            s.cache = "miss"
+            return
+
+
+def timed(name, cached=False):
+    """Decorator form of span(); rows are taken from len(result) when available."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, cached=cached) as s:
+                result = fn(*args, **kwargs)
+                if s.rows is None and hasattr(result, "__len__"):
+                    s.rows = len(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def _emit(run, s):
+    record = {"ts": time.time(), "run": run.id if run else None,
+              "entry_point": run.entry_point if run else None, **s.to_dict()}
+    with _sink_lock, open(TRACE_FILE, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def sidebar_panel(st, run=None):
+    """Optional Streamlit sidebar breakdown of the current run's spans."""
+    run = run or current_run()
+    if run is None or not st.sidebar.checkbox("Show stage timings", value=False):
+        return
+    with st.sidebar.expander("Stage timings", expanded=True):
+        rows = [s.to_dict() for s in run.spans]
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        st.caption(f"Total traced: {sum(s.seconds for s in run.spans) * 1e3:.1f} ms")
+
+
+def summarize(path):
+    """Count / p50 / p95 / max ms per (entry point, span) from a JSON-lines trace."""
+    import numpy as np
+
+    by_stage = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                r = json.loads(line)
+                by_stage.setdefault((r["entry_point"], r["span"]), []).append(r["ms"])
+    out = []
+    for (entry, name), ms in by_stage.items():
+        ms = np.array(ms)
+        out.append({"entry_point": entry, "span": name, "count": len(ms),
+                    "p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+                    "max_ms": float(ms.max())})
+    return sorted(out, key=lambda r: -r["p95_ms"])
+
+
+if __name__ == "__main__":
+    import sys
+
+    print(f"{'entry point':<26} {'span':<28} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for r in summarize(sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE):
+        print(f"{str(r['entry_point']):<26} {r['span']:<28} {r['count']:>7} "
+              f"{r['p50_ms']:>10.2f} {r['p95_ms']:>10.2f} {r['max_ms']:>10.2f}")
@@ -0,0 +1,246 @@
+"""
+Out-of-core aggregation of intraday (1m/5m) bars into pivot periods.
+
+Minute bars are read in chunks (Parquet row groups, CSV chunks or slices of
+memory-mapped .npy arrays) and folded into daily, weekly, monthly, quarterly
+and annual OHLC. Only the period still open at the end of a chunk is carried
+into the next one, so peak memory is one chunk plus one row per completed
+period, however many years of minute bars are streamed:
+
+    agg = StreamingAggregator()
+    for chunk in iter_chunks("QQQ_1m.parquet"):
+        agg.add(*chunk)
+    periods = agg.finish()                      # {freq: Periods}
+    monthly = periods['ME']
+    levels = compute_levels(monthly.high, monthly.low, monthly.close)
+
+Chunks are one ticker each: (timestamps, open, high, low, close) 1-D arrays
+in time order. Timestamps are exchange-local wall time.
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from aggregate import FREQS, _reduce, daily_bars, day_numbers, period_codes, period_label
+
+CHUNK_ROWS = 1_000_000
+TIME_COLUMNS = ('timestamp', 'datetime', 'date', 'time')
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+MEMMAP_COLUMNS = ('timestamp',) + PRICE_COLUMNS
+
+Periods = namedtuple('Periods', ['freq', 'label', 'start', 'open', 'high', 'low', 'close'])
+Periods.__doc__ = """
+Completed OHLC periods for one timeframe.
+
+label  period end date (datetime64[D]), matching the pandas resample label
+start  date of the first bar actually seen in the period
+"""
+
+
+def _empty(freq):
+    no_days, no_prices = np.empty(0, 'datetime64[D]'), np.empty(0)
+    return Periods(freq, no_days, no_days, no_prices, no_prices, no_prices, no_prices)
+
+
+def _concat(freq, parts):
+    if not parts:
+        return _empty(freq)
+    return Periods(freq, *(np.concatenate(cols) for cols in zip(*(p[1:] for p in parts))))
+
+
+class StreamingAggregator:
+    """
+    Fold time-ordered chunks of intraday bars into OHLC periods for several timeframes.
+
+    add() returns the periods each chunk completed; with keep=True they are
+    also collected for finish(). Per timeframe the only state carried between
+    chunks is the one open period: (code, first day, O, H, L, C).
+    """
+
+    def __init__(self, freqs=FREQS, keep=True):
+        self.freqs = tuple(freqs)
+        self.keep = keep
+        self.rows = 0
+        self._last = None
+        self._open = {}
+        self._done = {f: [] for f in self.freqs}
+
+    def add(self, stamps, o, h, l, c):
+        """Fold one chunk. Returns {freq: Periods} for the periods it completed."""
+        if len(stamps) == 0:
+            return {f: _empty(f) for f in self.freqs}
+        stamps = np.asarray(stamps)
+        if np.any(stamps[1:] < stamps[:-1]) or (self._last is not None and stamps[0] < self._last):
+            raise ValueError("rows are not in time order")
+        self._last = stamps[-1]
+        self.rows += len(stamps)
+
+        # 1. Minutes -> days once; every timeframe is then reduced from the (few) days
+        days, do, dh, dl, dc = daily_bars(stamps, o, h, l, c)
+        days = days.astype(np.int64)
+
+        completed = {}
+        for f in self.freqs:
+            # 2. Periods inside this chunk (the last one may still be open)
+            keys, po, ph, pl, pc, _, starts = _reduce(period_codes(days, f), do, dh, dl, dc)
+            cols = [keys, days[starts], po, ph, pl, pc]
+
+            # 3. Merge with the period carried over from the previous chunk
+            carry = self._open.get(f)
+            if carry is not None:
+                code, first, co, ch, cl, _ = carry
+                if keys[0] == code:
+                    cols[1][0], po[0] = first, co
+                    ph[0], pl[0] = np.fmax(ch, ph[0]), np.fmin(cl, pl[0])
+                else:
+                    cols = [np.concatenate(([v], a)) for v, a in zip(carry, cols)]
+
+            # 4. Emit everything but the last period, which carries on
+            self._open[f] = tuple(a[-1] for a in cols)
+            keys, first, po, ph, pl, pc = (a[:-1] for a in cols)
+            done = Periods(f, period_label(keys, f), first.astype('datetime64[D]'), po, ph, pl, pc)
+            completed[f] = done
+            if self.keep:
+                self._done[f].append(done)
+        return completed
+
+    def flush(self):
+        """Close the open periods (end of data). Returns {freq: Periods} like add()."""
+        closed = {}
+        for f in self.freqs:
+            carry = self._open.pop(f, None)
+            if carry is None:
+                closed[f] = _empty(f)
+                continue
+            code, first, o, h, l, c = carry
+            closed[f] = Periods(f, period_label([code], f), np.array([first], 'datetime64[D]'),
+                                np.array([o]), np.array([h]), np.array([l]), np.array([c]))
+            if self.keep:
+                self._done[f].append(closed[f])
+        return closed
+
+    def finish(self):
+        """Flush and return every collected period as {freq: Periods}."""
+        self.flush()
+        out = {f: _concat(f, parts) for f, parts in self._done.items()}
+        self._done = {f: [] for f in self.freqs}
+        return out
+
+
+def stamp_levels(stamps, periods, levels):
+    """
+    Levels of the previous completed period for every intraday timestamp.
+
+    `levels` is a dict of per-period arrays (e.g. compute_levels output) for
+    `periods`. Timestamps before the second period get NaN. This is the
+    intraday counterpart of aggregate.align_to_bars, for daily/weekly levels
+    on a minute chart.
+    """
+    codes = period_codes(day_numbers(stamps), periods.freq)
+    keys = period_codes(day_numbers(periods.label), periods.freq)
+    prev = np.searchsorted(keys, codes) - 1
+    out = {}
+    for k, v in levels.items():
+        values = np.asarray(v, dtype=np.float64)[np.maximum(prev, 0)]
+        values[prev < 0] = np.nan
+        out[k] = values
+    return out
+
+
+# --- chunk readers --------------------------------------------------------
+
+def _column_map(names):
+    """Map our canonical names to the file's own (case-insensitive) column names."""
+    lower = {n.lower(): n for n in names}
+    time_col = next((lower[c] for c in TIME_COLUMNS if c in lower), None)
+    missing = [c for c in PRICE_COLUMNS if c not in lower]
+    if time_col is None or missing:
+        raise ValueError(f"need a time column and {', '.join(PRICE_COLUMNS)}; missing {missing or 'time'}")
+    return time_col, [lower[c] for c in PRICE_COLUMNS]
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS, tz=None):
+    """
+    Yield (timestamps as datetime64[ns], open, high, low, close) chunks of at most `chunk_rows` rows.
+
+    Reads Parquet batch by batch (row groups are never loaded whole), CSV in
+    pandas chunks, and a directory of .npy files through memory maps.
+    tz-aware timestamps are converted to `tz` (exchange time) before dropping the zone.
+    """
+    if os.path.isdir(path):
+        yield from iter_memmap(path, chunk_rows)
+        return
+
+    import pandas as pd
+
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        time_col, price_cols = _column_map(pf.schema_arrow.names)
+        batches = (b.to_pandas() for b in pf.iter_batches(batch_size=chunk_rows, columns=[time_col, *price_cols]))
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        time_col, price_cols = _column_map(header)
+        batches = pd.read_csv(path, usecols=[time_col, *price_cols], chunksize=chunk_rows)
+
+    for chunk in batches:
+        ts = pd.to_datetime(chunk[time_col], utc=tz is not None)
+        if tz is not None:
+            ts = ts.dt.tz_convert(tz).dt.tz_localize(None)
+        yield (ts.to_numpy(dtype='datetime64[ns]'),
+               *(chunk[c].to_numpy(dtype=np.float64) for c in price_cols))
+
+
+def write_memmap(directory, stamps, o, h, l, c):
+    """Save one ticker's bars as timestamp/open/high/low/close .npy files for iter_memmap."""
+    os.makedirs(directory, exist_ok=True)
+    for name, values in zip(MEMMAP_COLUMNS, (stamps, o, h, l, c)):
+        np.save(os.path.join(directory, f"{name}.npy"), values)
+
+
+def iter_memmap(directory, chunk_rows=CHUNK_ROWS):
+    """Yield chunks as slices of memory-mapped .npy arrays (only touched pages are read)."""
+    arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in MEMMAP_COLUMNS]
+    for i in range(0, len(arrays[0]), chunk_rows):
+        yield tuple(a[i:i + chunk_rows] for a in arrays)
+
+
+def aggregate_file(path, freqs=FREQS, chunk_rows=CHUNK_ROWS, tz=None):
+    """Stream one file (or .npy directory) into {freq: Periods}."""
+    agg = StreamingAggregator(freqs)
+    for chunk in iter_chunks(path, chunk_rows, tz):
+        agg.add(*chunk)
+    return agg.finish()
+
+
+def load_daily(path, start=None, end=None, chunk_rows=CHUNK_ROWS, tz=None):
+    """Daily OHLC DataFrame built from an intraday file, shaped like data_store.load_history."""
+    import pandas as pd
+
+    daily = aggregate_file(path, ('B',), chunk_rows, tz)['B']
+    df = pd.DataFrame({'Open': daily.open, 'High': daily.high, 'Low': daily.low, 'Close': daily.close},
+                      index=pd.DatetimeIndex(daily.label, name='Date'))
+    return df.loc[start:end]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from pivot_engine import level_table
+
+    parser = argparse.ArgumentParser(description="Pivot levels for the next period of every timeframe, "
+                                                 "streamed from an intraday bar file.")
+    parser.add_argument("path", help="Parquet/CSV file or directory of .npy arrays")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--tz", default=None, help="exchange time zone for tz-aware timestamps")
+    args = parser.parse_args()
+
+    periods = aggregate_file(args.path, chunk_rows=args.chunk_rows, tz=args.tz)
+    for freq, p in periods.items():
+        if not len(p.label):
+            continue
+        print(f"{freq} (from the period ending {p.label[-1]})")
+        for key, price, _ in level_table(p.high[-1], p.low[-1], p.close[-1], p.close[-1]):
+            print(f"  {key:<3} {price:10.2f}")
@@ -0,0 +1,217 @@
+"""
+Materialized pivot-level table, precomputed nightly and queried by the apps.
+
+Every completed period of every ticker and timeframe gets one row keyed by
+(ticker, timeframe, period_start), the period's first calendar day, with the source H/L/C and P, R1-R3, S1-S3.
+The levels on a row apply to the FOLLOWING period, so a page render is a
+single indexed lookup of the newest row. A row is only served while it is
+the period that just ended (its period_end is the end of the period before
+today's); after a boundary, until the next nightly run, readers get a miss
+and compute from the store:
+
+    python level_db.py --watchlist watchlist.txt           # nightly, after the store refresh
+    python level_db.py --history QQQ --timeframe ME        # levels over time, for analysis
+
+The table lives in SQLite (PIVOT_LEVELS_DB, default ./pivot_levels.db) in WAL
+mode, so apps keep reading while the nightly job upserts.
+"""
+import os
+import sqlite3
+import threading
+
+from timeframes import previous_end
+
+# Readers need sqlite3 and the period calendar; pandas and the price store are
+# imported by the writer only
+
+DB_PATH = os.environ.get("PIVOT_LEVELS_DB", "pivot_levels.db")
+# Timeframes the apps offer; add 'B' with --freqs for daily levels
+DEFAULT_FREQS = ('W-MON', 'ME', 'QE', 'YE')
+
+
+def _schema():
+    from pivot_engine import LEVELS
+
+    return f"""
+CREATE TABLE IF NOT EXISTS levels (
+    ticker TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    period_start TEXT NOT NULL,
+    period_end TEXT NOT NULL,
+    high REAL, low REAL, close REAL,
+    {", ".join(f"{k} REAL" for k in LEVELS)},
+    PRIMARY KEY (ticker, timeframe, period_start)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS last_price (
+    ticker TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    close REAL
+);
+"""
+
+_local = threading.local()
+
+
+def connect(db_path=None, readonly=True):
+    """
+    SQLite connection; read-only ones are reused per thread (None if the table hasn't been built).
+    """
+    db_path = db_path or DB_PATH
+    if readonly:
+        cons = getattr(_local, "cons", None)
+        if cons is None:
+            cons = _local.cons = {}
+        if db_path not in cons:
+            if not os.path.exists(db_path):
+                return None
+            cons[db_path] = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        return cons[db_path]
+    con = sqlite3.connect(db_path)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.executescript(_schema())
+    return con
+
+
+def lookup(ticker, freq, db_path=None, today=None):
+    """
+    (H, L, C) of the `freq` period that ended just before `today`'s period
+    (default today) for `ticker`, or None on a miss.
+
+    Levels only: the table's last_price is as of the nightly run, so the
+    apps take the current price from the store or the live feed. Same shape
+    as shared_cache.previous_hlc, so the apps can try either.
+    """
+    row = latest(ticker, freq, db_path, today)
+    return None if row is None else (row["high"], row["low"], row["close"])
+
+
+def latest(ticker, freq, db_path=None, today=None):
+    """
+    Current row for `ticker` and `freq` as a dict (period_start, period_end,
+    high/low/close and every level) plus last_date and last_close as of the
+    nightly run, or None on a miss. Like lookup(), a newest row that isn't
+    the period just before `today`'s is a miss.
+    """
+    con = connect(db_path)
+    if con is None:
+        return None
+    ticker = ticker.upper()
+    try:
+        cur = con.execute("SELECT * FROM levels WHERE ticker = ? AND timeframe = ? "
+                          "ORDER BY period_start DESC LIMIT 1", (ticker, freq))
+        row = cur.fetchone()
+        price = con.execute("SELECT date, close FROM last_price WHERE ticker = ?", (ticker,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if row is None or price is None:
+        return None
+    out = dict(zip((d[0] for d in cur.description), row))
+    if out["period_end"] != previous_end(freq, today).isoformat():
+        return None
+    out["last_date"], out["last_close"] = price
+    return out
+
+
+def history(ticker, freq, start=None, db_path=None):
+    """Every stored period (and its levels) for one ticker and timeframe as a DataFrame."""
+    import pandas as pd
+
+    con = connect(db_path)
+    if con is None:
+        return pd.DataFrame()
+    query = "SELECT * FROM levels WHERE ticker = ? AND timeframe = ?"
+    params = [ticker.upper(), freq]
+    if start is not None:
+        query += " AND period_start >= ?"
+        params.append(str(start))
+    df = pd.read_sql_query(query + " ORDER BY period_start", con, params=params,
+                           parse_dates=["period_start", "period_end"])
+    return df.set_index("period_start")
+
+
+def _period_rows(block, freq, today=None):
+    """
+    (ticker, freq, start, end, H, L, C, *levels) for every period in the
+    block that ended before `today`'s period (default today).
+    """
+    import numpy as np
+
+    from aggregate import day_numbers, period_codes, period_label
+    from pivot_engine import LEVELS, compute_levels
+
+    bars = block.aggregate(freq)
+    levels = compute_levels(bars.high, bars.low, bars.close)
+    # Calendar start of each period (day after the previous period's end), so the
+    # key doesn't move when the universe's trading calendar does
+    codes = period_codes(day_numbers(bars.label), freq)
+    starts = (period_label(codes - 1, freq) + np.timedelta64(1, 'D')).astype(str)
+    ends = bars.label.astype(str)
+    # The job runs before the session closes, so the store ends at the previous
+    # session: a period is complete when today is past it, not when a later bar exists
+    complete = bars.label <= np.datetime64(previous_end(freq, today), 'D')
+    for t in block.tickers:
+        row, _, _ = block.spans[t]
+        done = np.flatnonzero(complete & ~np.isnan(bars.close[row]))
+        cols = [bars.high[row, done], bars.low[row, done], bars.close[row, done],
+                *(levels[k][row, done] for k in LEVELS)]
+        yield from ((t, freq, s, e, *vals) for s, e, *vals in
+                    zip(starts[done], ends[done], *(c.tolist() for c in cols)))
+
+
+def materialize(tickers, db_path=None, freqs=DEFAULT_FREQS, today=None):
+    """
+    Upsert every completed period for `tickers` from the local store. Returns rows written.
+
+    The whole refresh is one transaction, so readers see either the old or
+    the new table.
+    """
+    import numpy as np
+
+    from pivot_engine import LEVELS
+    from price_block import PriceBlock
+
+    block = PriceBlock.from_store(tickers, dtype=np.float64)
+    close = block.column('Close')
+    prices = [(t, str(block.dates[stop - 1]), float(close[row, stop - 1]))
+              for t, (row, _, stop) in block.spans.items()]
+
+    con = connect(db_path, readonly=False)
+    written = 0
+    placeholders = ", ".join("?" * (7 + len(LEVELS)))
+    try:
+        with con:
+            for freq in freqs:
+                cur = con.executemany(f"INSERT OR REPLACE INTO levels VALUES ({placeholders})",
+                                      _period_rows(block, freq, today))
+                written += cur.rowcount
+            con.executemany("INSERT OR REPLACE INTO last_price VALUES (?, ?, ?)", prices)
+    finally:
+        con.close()
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import pandas as pd
+
+    from screener import load_universe
+
+    parser = argparse.ArgumentParser(description="Build or query the materialized pivot-level table.")
+    parser.add_argument("tickers", nargs="*")
+    parser.add_argument("--watchlist", help="file with one symbol per line")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--freqs", default=",".join(DEFAULT_FREQS))
+    parser.add_argument("--history", metavar="TICKER", help="print the stored levels for one ticker")
+    parser.add_argument("--timeframe", default="ME", help="timeframe for --history")
+    args = parser.parse_args()
+
+    if args.history:
+        with pd.option_context('display.max_rows', None, 'display.width', 200, 'display.precision', 2):
+            print(history(args.history, args.timeframe, db_path=args.db).to_string())
+    else:
+        tickers = list(args.tickers) + (load_universe(args.watchlist) if args.watchlist else [])
+        if not tickers:
+            parser.error("give tickers or --watchlist")
+        written = materialize(tickers, args.db, tuple(args.freqs.split(",")))
+        print(f"Wrote {written} period rows for {len(tickers)} tickers to {args.db}")
@@ -0,0 +1,376 @@
+"""
+Streaming live prices with pivot-crossing events over asyncio.
+
+A feed (replay file, TCP socket, or anything yielding batches of Ticks)
+updates the latest price per ticker. Each ticker's levels are kept as a
+sorted list, so an update is two bisects: if the price moved into a new
+slot, every level in between was crossed. The nearest-level distance is
+updated in the same step, so nothing is recomputed for the other tickers.
+
+    python live_feed.py --make-replay ticks.csv --watchlist watchlist.txt --ticks 1000000
+    python live_feed.py --replay ticks.csv --watchlist watchlist.txt --timeframe ME
+    python live_feed.py --serve ticks.csv --port 9009 --rate 50000       # socket stand-in
+    python live_feed.py --connect localhost:9009 --watchlist watchlist.txt --snapshot live_prices.json
+
+With --snapshot the latest prices are written (atomically, about once a
+second) to a JSON file that pivots_app.py and pivot.py read through
+live_price() instead of the last daily close.
+
+Wire format: one "TICKER,PRICE[,UNIX_TS]" line per tick. Latency is measured
+from the tick's timestamp (stamped by the sender, or on read for a replay
+file) to the end of its processing.
+"""
+import asyncio
+import bisect
+import datetime
+import itertools
+import json
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+SNAPSHOT_FILE = os.environ.get("PIVOT_LIVE_FILE", "live_prices.json")
+SNAPSHOT_SECONDS = 1.0
+MAX_AGE_SECONDS = 120
+BATCH_LINES = 4096
+
+Tick = namedtuple('Tick', ['ticker', 'price', 'ts'])
+Crossing = namedtuple('Crossing', ['ticker', 'level', 'level_price', 'direction', 'price', 'ts'])
+
+
+class LiveBook:
+    """
+    Latest price per ticker against that ticker's precomputed levels.
+
+    `levels` is {ticker: {level name: price}}.
+    """
+
+    def __init__(self, levels=None):
+        self.prices = {}
+        self.stamps = {}
+        self.nearest = {}    # ticker -> (level name, % distance from the latest price)
+        self.updates = 0
+        self._levels = {}
+        for ticker, lv in (levels or {}).items():
+            self.set_levels(ticker, lv)
+
+    def set_levels(self, ticker, levels):
+        """Install (or replace, e.g. at a period rollover) one ticker's levels."""
+        items = sorted((float(v), k) for k, v in levels.items() if v == v)
+        self._levels[ticker] = ([p for p, _ in items], [k for _, k in items])
+
+    def levels(self, ticker):
+        edges, names = self._levels.get(ticker, ((), ()))
+        return dict(zip(names, edges))
+
+    def update(self, ticker, price, ts=None):
+        """
+        Record a price. Returns the Crossings it caused, in the order price passed them.
+        """
+        self.updates += 1
+        old = self.prices.get(ticker)
+        self.prices[ticker] = price
+        self.stamps[ticker] = ts
+        book = self._levels.get(ticker)
+        if book is None:
+            return ()
+        edges, names = book
+        slot = bisect.bisect_right(edges, price)
+
+        # Nearest level is one of the two edges around the new slot
+        below = price - edges[slot - 1] if slot else float("inf")
+        above = edges[slot] - price if slot < len(edges) else float("inf")
+        i = slot - 1 if below <= above else slot
+        if edges:
+            self.nearest[ticker] = (names[i], (edges[i] / price - 1) * 100)
+
+        if old is None:
+            return ()
+        prev = bisect.bisect_right(edges, old)
+        if prev == slot:
+            return ()
+        if slot > prev:
+            return [Crossing(ticker, names[k], edges[k], 'up', price, ts) for k in range(prev, slot)]
+        return [Crossing(ticker, names[k], edges[k], 'down', price, ts) for k in range(prev - 1, slot - 1, -1)]
+
+    def distances(self, ticker):
+        """{level: % distance} from the latest price for one ticker."""
+        price = self.prices[ticker]
+        return {k: (v / price - 1) * 100 for k, v in self.levels(ticker).items()}
+
+
+class LatencyStats:
+    """Fixed-size ring of per-tick latencies (seconds)."""
+
+    def __init__(self, size=1 << 18):
+        self.samples = np.zeros(size)
+        self.count = 0
+
+    def record(self, seconds):
+        self.samples[self.count % self.samples.size] = seconds
+        self.count += 1
+
+    def summary(self):
+        s = self.samples[:min(self.count, self.samples.size)] * 1e6
+        if not s.size:
+            return {"ticks": 0}
+        return {"ticks": self.count, "p50_us": float(np.percentile(s, 50)),
+                "p99_us": float(np.percentile(s, 99)), "max_us": float(s.max())}
+
+
+# --- feeds ----------------------------------------------------------------
+# A feed is an async iterator of lists of Ticks (batches keep per-tick overhead low).
+
+def parse_lines(lines, stamp=None):
+    ticks = []
+    for line in lines:
+        parts = line.split(",")
+        if len(parts) < 2:
+            continue
+        ts = float(parts[2]) if len(parts) > 2 else stamp
+        ticks.append(Tick(parts[0].strip(), float(parts[1]), ts))
+    return ticks
+
+
+def _batch_size(rate, batch):
+    # Throttled feeds send about a millisecond's worth of ticks at a time
+    return max(1, min(batch, int(rate / 1000))) if rate else batch
+
+
+async def replay_file(path, rate=None, batch=BATCH_LINES):
+    """
+    Ticks from a replay file, as fast as possible or throttled to `rate` ticks per second.
+    Ticks are stamped when read, so latency covers parsing and processing.
+    """
+    start = time.monotonic()
+    sent = 0
+    batch = _batch_size(rate, batch)
+    with open(path) as f:
+        while True:
+            lines = list(itertools.islice(f, batch))
+            if not lines:
+                return
+            yield parse_lines(lines, time.time())
+            sent += len(lines)
+            if rate:
+                ahead = sent / rate - (time.monotonic() - start)
+                await asyncio.sleep(max(ahead, 0))
+            else:
+                await asyncio.sleep(0)
+
+
+async def socket_feed(host, port):
+    """Ticks from a newline-delimited TCP stream (e.g. serve_replay or a vendor bridge)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    rest = b""
+    try:
+        while True:
+            chunk = await reader.read(1 << 16)
+            if not chunk:
+                break
+            lines = (rest + chunk).split(b"\n")
+            rest = lines.pop()
+            yield parse_lines([line.decode() for line in lines], time.time())
+    finally:
+        writer.close()
+
+
+async def serve_replay(path, host="127.0.0.1", port=9009, rate=None, batch=BATCH_LINES):
+    """
+    Local stand-in for a quote server: streams a replay file to every client,
+    stamping each tick with its send time.
+    """
+    async def handle(reader, writer):
+        start, sent = time.monotonic(), 0
+        size = _batch_size(rate, batch)
+        with open(path) as f:
+            while True:
+                lines = list(itertools.islice(f, size))
+                if not lines:
+                    break
+                now = time.time()
+                writer.write("".join(f"{line.rstrip()},{now:.6f}\n" for line in lines).encode())
+                await writer.drain()
+                sent += len(lines)
+                if rate:
+                    await asyncio.sleep(max(sent / rate - (time.monotonic() - start), 0))
+        writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+# --- run loop -------------------------------------------------------------
+
+async def run(feed, book, on_crossing=None, on_tick=None, snapshot=None, stats=None):
+    """
+    Drive `book` from `feed` until it ends. `on_tick(tick, old_price)` and
+    `on_crossing(event)` are called inline. Returns the LatencyStats.
+    """
+    stats = stats or LatencyStats()
+    update, record, prices = book.update, stats.record, book.prices
+    next_snapshot = time.monotonic() + SNAPSHOT_SECONDS
+    async for ticks in feed:
+        for tick in ticks:
+            old = prices.get(tick.ticker)
+            events = update(tick.ticker, tick.price, tick.ts)
+            if on_tick is not None:
+                on_tick(tick, old)
+            if events and on_crossing is not None:
+                for e in events:
+                    on_crossing(e)
+            if tick.ts is not None:
+                record(time.time() - tick.ts)
+        if snapshot and time.monotonic() >= next_snapshot:
+            write_snapshot(book, snapshot)
+            next_snapshot = time.monotonic() + SNAPSHOT_SECONDS
+    if snapshot:
+        write_snapshot(book, snapshot)
+    return stats
+
+
+def write_snapshot(book, path=None):
+    """Latest price and timestamp per ticker, swapped in atomically."""
+    path = path or SNAPSHOT_FILE
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({t: [p, book.stamps.get(t)] for t, p in book.prices.items()}, f)
+    os.replace(tmp, path)
+
+
+_snapshot_cache = {}
+
+
+def live_price(ticker, path=None, max_age=MAX_AGE_SECONDS):
+    """
+    Latest streamed price for `ticker` from the snapshot file, or None when
+    there is no snapshot, no price, or it is older than `max_age` seconds.
+    """
+    path = path or SNAPSHOT_FILE
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    if time.time() - mtime > max_age:
+        return None
+    cached = _snapshot_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        try:
+            with open(path) as f:
+                cached = _snapshot_cache[path] = (mtime, json.load(f))
+        except (OSError, ValueError):
+            return None
+    entry = cached[1].get(ticker.upper())
+    if entry is None or (entry[1] is not None and time.time() - entry[1] > max_age):
+        return None
+    return entry[0]
+
+
+# --- levels and test data -------------------------------------------------
+
+def load_levels(tickers, freq='ME', today=None):
+    """
+    {ticker: {level: price}} for the `freq` period containing `today`
+    (default today): level table, then shared cache, each only while it
+    holds the period that just ended, then computed from the local store.
+    """
+    import data_store
+    import level_db
+    import shared_cache
+    from pivot_engine import compute_levels, previous_period
+
+    today = today or datetime.date.today()
+    out = {}
+    for t in tickers:
+        t = t.upper()
+        hlc = level_db.lookup(t, freq, today=today) or shared_cache.previous_hlc(t, freq, today=today) or \
+            previous_period(data_store.load_history(t, start=data_store.years_ago(2)), freq, today)
+        if hlc is not None:
+            out[t] = {k: float(v) for k, v in compute_levels(*hlc).items()}
+    return out
+
+
+def make_replay(path, levels, ticks=1_000_000, seed=0):
+    """
+    Synthetic replay file: a random walk per ticker starting at its pivot,
+    wide enough to cross R1/S1 now and then. Returns the ticker count.
+    """
+    rng = np.random.default_rng(seed)
+    tickers = list(levels)
+    pivots = np.array([levels[t]['P'] for t in tickers])
+    steps = np.abs(np.array([levels[t]['R1'] - levels[t]['S1'] for t in tickers])) / 40
+    which = rng.integers(0, len(tickers), ticks)
+    walk = np.zeros(len(tickers))
+    with open(path, "w") as f:
+        for lo in range(0, ticks, 100_000):
+            w = which[lo:lo + 100_000]
+            prices = np.empty(w.size)
+            moves = rng.normal(0, 1, w.size) * steps[w]
+            for k, (i, m) in enumerate(zip(w, moves)):
+                walk[i] = walk[i] * 0.999 + m
+                prices[k] = pivots[i] + walk[i]
+            f.write("".join(f"{tickers[i]},{p:.4f}\n" for i, p in zip(w, np.maximum(prices, 0.01))))
+    return len(tickers)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from screener import load_universe
+
+    parser = argparse.ArgumentParser(description="Stream prices and report pivot crossings.")
+    parser.add_argument("tickers", nargs="*")
+    parser.add_argument("--watchlist", help="file with one symbol per line")
+    parser.add_argument("--timeframe", default="ME", help="pivot timeframe (W-MON, ME, QE, YE)")
+    parser.add_argument("--replay", help="replay file of TICKER,PRICE[,TS] lines")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="read ticks from a TCP feed")
+    parser.add_argument("--serve", metavar="FILE", help="serve a replay file as a TCP feed")
+    parser.add_argument("--port", type=int, default=9009)
+    parser.add_argument("--rate", type=float, default=None, help="ticks per second (default: unthrottled)")
+    parser.add_argument("--make-replay", metavar="FILE", help="write a synthetic replay file")
+    parser.add_argument("--ticks", type=int, default=1_000_000)
+    parser.add_argument("--snapshot", help="write latest prices here for the apps")
+    parser.add_argument("--quiet", action="store_true", help="count crossings instead of printing them")
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(serve_replay(args.serve, port=args.port, rate=args.rate))
+        raise SystemExit
+
+    tickers = list(args.tickers) + (load_universe(args.watchlist) if args.watchlist else [])
+    if not tickers:
+        parser.error("give tickers or --watchlist")
+    levels = load_levels(tickers, args.timeframe)
+
+    if args.make_replay:
+        n = make_replay(args.make_replay, levels, args.ticks)
+        print(f"Wrote {args.ticks} ticks for {n} tickers to {args.make_replay}")
+        raise SystemExit
+
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        feed = socket_feed(host, int(port))
+    elif args.replay:
+        feed = replay_file(args.replay, args.rate)
+    else:
+        parser.error("give --replay or --connect")
+
+    crossings = [0]
+
+    def on_crossing(e):
+        crossings[0] += 1
+        if not args.quiet:
+            print(f"{e.ticker:<6} crossed {e.level:<2} {e.direction:<4} {e.level_price:10.2f}  (last {e.price:.2f})")
+
+    book = LiveBook(levels)
+    t = time.perf_counter()
+    stats = asyncio.run(run(feed, book, on_crossing, snapshot=args.snapshot))
+    elapsed = time.perf_counter() - t
+    s = stats.summary()
+    print(f"{book.updates} ticks for {len(book.prices)} tickers in {elapsed:.2f}s "
+          f"({book.updates / elapsed:,.0f}/s), {crossings[0]} crossings")
+    if s["ticks"]:
+        print(f"latency p50 {s['p50_us']:.0f} us, p99 {s['p99_us']:.0f} us, max {s['max_us']:.0f} us")
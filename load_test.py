@@ -0,0 +1,536 @@
+"""
+Concurrent-session load test for the Streamlit apps.
+
+Drives N simulated sessions at once through realistic widget sequences
+(change ticker, switch period, toggle chart type, move the visible range)
+and reports rerun latency percentiles, memory per session and throughput
+for each concurrency level:
+
+    python load_test.py                                   # all three apps, 1..16 sessions
+    python load_test.py --app app.py --sessions 1,4,8,16 --steps 20
+    python load_test.py --capacity 8 --slo-ms 250         # fail if 8 sessions miss the p95 target
+    python load_test.py --compare bench_results/load_<previous run>.jsonl
+
+Each app is served by a real `streamlit run` subprocess, i.e. one replica,
+and every session is its own websocket to it, driven from a thread the
+way a browser tab drives the frontend: a rerun message with the widgets
+the user changed (scoped to the fragment they live in, so a chart toggle
+only reruns the fragment), then every delta up to script_finished. The
+deltas are parsed into an AppTest element tree, so the widget actions
+below are plain AppTest calls. Sessions run their scripts concurrently on
+the server's threads, so latency is what a user waits for under that
+load (service time plus contention for the GIL and the cores), and memory
+is the server's RSS. The client shares the machine with the server; on a
+single core its parsing is part of the measured contention.
+
+Prices come from a synthetic store (synthetic.py) in a temporary
+PIVOT_DATA_DIR with PIVOT_OFFLINE=1, inherited by the server; Yahoo is
+never called. --warm also publishes the shared cache and the level table
+there, to measure the production read path instead of the store fallback.
+"""
+import atexit
+import collections
+import contextlib
+import datetime
+import functools
+import math
+import os
+import random
+import resource
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+APPS = ("app.py", "pivots_app.py", "pivotTableAllPeriods.py")
+DEFAULT_SESSIONS = (1, 2, 4, 8, 16)
+RESULTS_DIR = "bench_results"
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# --- stub data ---------------------------------------------------------------
+
+def stub_environment(n_tickers=20, years=4, warm=False, data_dir=None):
+    """
+    Point every data path at a temporary directory seeded with synthetic
+    history and return the ticker list. Must run before the apps' modules
+    are imported, since they read the environment at import.
+    """
+    root = tempfile.mkdtemp(prefix="pivot_load_")
+    atexit.register(shutil.rmtree, root, True)
+    os.environ["PIVOT_DATA_DIR"] = data_dir or os.path.join(root, "data")
+    os.environ["PIVOT_OFFLINE"] = "1"
+    os.environ["PIVOT_CACHE_DIR"] = os.path.join(root, "cache")
+    os.environ["PIVOT_LEVELS_DB"] = os.path.join(root, "pivot_levels.db")
+    os.environ["PIVOT_LIVE_FILE"] = os.path.join(root, "live_prices.json")
+    os.environ.pop("PIVOT_TRACE_FILE", None)
+    sys.path.insert(0, HERE)
+
+    import data_store
+    from synthetic import seed_store
+
+    if data_dir:
+        tickers = sorted(f[:-len(".parquet")] for f in os.listdir(data_dir)
+                         if f.endswith(".parquet") and not f.endswith(".actions.parquet"))[:n_tickers]
+    else:
+        tickers = [f"SYN{i:03d}" for i in range(n_tickers)]
+        os.makedirs(data_store.DATA_DIR, exist_ok=True)
+        seed_store(tickers, years=years)
+    if warm:
+        import level_db
+        import shared_cache
+
+        shared_cache.publish(tickers)
+        level_db.materialize(tickers)
+    return tickers
+
+
+# --- server and sessions -----------------------------------------------------
+
+def start_server(app, timeout=60):
+    """`streamlit run app` headless on a free localhost port; returns (process, port) once healthy."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen([sys.executable, "-m", "streamlit", "run", os.path.join(HERE, app),
+                             "--server.headless", "true", "--server.port", str(port),
+                             "--server.address", "127.0.0.1", "--server.fileWatcherType", "none",
+                             "--browser.gatherUsageStats", "false"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return proc, port
+        except OSError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill()
+                raise RuntimeError(f"streamlit did not start for {app}")
+            time.sleep(0.2)
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# --- Streamlit protocol shim --------------------------------------------------
+# The only code here that touches Streamlit internals: the BackMsg/ForwardMsg
+# protos the browser and server exchange, and AppTest's element tree helpers
+# (private ones included). None of it is public API, so it is checked against
+# the releases it was verified with. After checking a newer release (the
+# protos, element_tree._has_pending_value, TESTING_KEY), raise STREAMLIT_MAX.
+
+STREAMLIT_MIN = (1, 37)   # first release with fragment-scoped reruns
+STREAMLIT_MAX = (1, 65)   # newest release verified
+
+
+class StreamlitWire:
+    """Encodes rerun requests and decodes server messages into element trees."""
+
+    def __init__(self):
+        import streamlit
+
+        version = tuple(int(p) for p in streamlit.__version__.split(".")[:2])
+        if not STREAMLIT_MIN <= version <= STREAMLIT_MAX:
+            supported = "..".join(".".join(map(str, v)) for v in (STREAMLIT_MIN, STREAMLIT_MAX))
+            raise RuntimeError(f"load_test.py speaks the frontend protocol of Streamlit {supported}, "
+                               f"found {streamlit.__version__}; check StreamlitWire against it")
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        from streamlit.runtime.state.common import TESTING_KEY
+        from streamlit.testing.v1 import element_tree
+
+        self._back, self._forward, self._tree = BackMsg, ForwardMsg, element_tree
+        self.testing_key = TESTING_KEY
+
+    def changed(self, tree):
+        """Widgets on `tree` given a new value since it was parsed."""
+        et = self._tree
+        return [n for n in tree or () if isinstance(n, et.Widget) and et._has_pending_value(n)]
+
+    def is_button(self, widget):
+        return isinstance(widget, self._tree.Button)
+
+    def rerun(self, widgets, fragment_id):
+        """Serialized rerun request carrying `widgets`' states, scoped to a fragment ('' for the page)."""
+        msg = self._back()
+        msg.rerun_script.widget_states.widgets.extend(self._tree.get_widget_state(n) for n in widgets)
+        msg.rerun_script.fragment_id = fragment_id
+        return msg.SerializeToString()
+
+    def forward(self, data):
+        msg = self._forward()
+        msg.ParseFromString(data)
+        return msg
+
+    def tree(self, messages):
+        return self._tree.parse_tree_from_messages(messages)
+
+
+@functools.lru_cache(maxsize=None)
+def streamlit_wire():
+    return StreamlitWire()
+
+
+class _Values(dict):
+    """
+    Widget values a session has set; None for the ones it never touched.
+    Option widgets look up their format_func here too: the frontend sends
+    the option labels as they are, so str stands in.
+    """
+
+    def __init__(self, testing_key):
+        super().__init__()
+        self.testing_key = testing_key
+
+    def __missing__(self, key):
+        return collections.defaultdict(lambda: str) if key == self.testing_key else None
+
+    def __bool__(self):  # element_tree asserts the session state is truthy
+        return True
+
+
+class RemoteSession:
+    """
+    One browser tab on a running server. run() plays the frontend's part of
+    a rerun and returns an AppTest element tree whose widget .run() comes
+    back here, so AppTest widget calls drive the real session.
+
+    Only the widgets changed on the tree are sent, like the frontend's
+    change events; the server keeps the others' values in its session state.
+    """
+
+    def __init__(self, port, timeout=120):
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.timeout = timeout
+        self.wire = streamlit_wire()
+        self.deltas = {}      # delta path -> latest delta message
+        self.fragments = {}   # widget id -> fragment it was rendered in ('' outside fragments)
+        self._session_state = _Values(self.wire.testing_key)
+
+    def __enter__(self):
+        from websockets.sync.client import connect
+
+        self.ws = connect(self.url, subprotocols=["streamlit"], max_size=None,
+                          open_timeout=self.timeout).__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.ws.__exit__(*exc)
+
+    def run(self, tree=None):
+        """Rerun with the widgets changed on `tree` (the first run without one); returns the new tree."""
+        wire = self.wire
+        changed = wire.changed(tree)
+        scopes = {self.fragments.get(n.id, "") for n in changed}
+        fragment = scopes.pop() if len(scopes) == 1 else ""
+        for n in changed:
+            if not wire.is_button(n):
+                self._session_state[n.id] = n.value
+        self.ws.send(wire.rerun(changed, fragment))
+
+        # A fragment run only resends that fragment's elements
+        self.deltas = {p: m for p, m in self.deltas.items() if fragment and m.delta.fragment_id != fragment}
+        while True:
+            fwd = wire.forward(self.ws.recv(timeout=self.timeout))
+            kind = fwd.WhichOneof("type")
+            if kind == "script_finished":
+                break
+            if kind != "delta" or fwd.delta.WhichOneof("type") == "new_transient":
+                continue
+            self.deltas[tuple(fwd.metadata.delta_path)] = fwd
+            if fwd.delta.HasField("new_element"):
+                el = fwd.delta.new_element
+                wid = getattr(getattr(el, el.WhichOneof("type")), "id", "")
+                if wid:
+                    self.fragments[wid] = fwd.delta.fragment_id
+
+        tree = wire.tree([self.deltas[p] for p in sorted(self.deltas)])
+        tree._runner = self
+        tree.run = lambda timeout=None: self.run(tree)
+        return tree
+
+
+# --- widget sequences --------------------------------------------------------
+# Each action changes one widget on a session's element tree and reruns it.
+
+def _widget(at, kind, label):
+    for w in getattr(at, kind):
+        if w.label == label:
+            return w
+    return None
+
+
+def _choose(rng, options, current):
+    return rng.choice([o for o in options if o != current] or list(options))
+
+
+def app_ticker(at, rng, tickers):
+    w = _widget(at, "text_input", "Ticker (e.g., QQQ, TSLA, AAPL)")
+    return w.input(_choose(rng, tickers, w.value)).run()
+
+
+def app_period(at, rng, tickers):
+    w = _widget(at, "selectbox", "Pivot Period")
+    return w.select(_choose(rng, w.options, w.value)).run()
+
+
+def app_chart_type(at, rng, tickers):
+    w = _widget(at, "radio", "Chart Type")
+    if w is None:
+        return at.run()
+    return w.set_value(_choose(rng, w.options, w.value)).run()
+
+
+def app_range(at, rng, tickers):
+    w = _widget(at, "slider", "Visible Range")
+    if w is None:
+        return at.run()
+    # Date slider bounds come back as epoch microseconds
+    lo, hi = (datetime.datetime.fromtimestamp(x / 1e6, datetime.timezone.utc).date() for x in (w.min, w.max))
+    days = (hi - lo).days
+    start = lo + datetime.timedelta(days=rng.randrange(days // 2 + 1))
+    return w.set_value((start, hi)).run()
+
+
+def table_ticker(label):
+    def action(at, rng, tickers):
+        w = _widget(at, "text_input", label)
+        return w.input(_choose(rng, tickers, w.value)).run()
+    return action
+
+
+def table_timeframe(label):
+    def action(at, rng, tickers):
+        w = _widget(at, "selectbox", label)
+        return w.select(_choose(rng, w.options, w.value)).run()
+    return action
+
+
+def calculate(at, rng, tickers):
+    return _widget(at, "button", "Calculate Pivots").click().run()
+
+
+def with_calculate(action):
+    # pivotTableAllPeriods only shows results for the run the button was clicked in
+    def step(at, rng, tickers):
+        return calculate(action(at, rng, tickers), rng, tickers)
+    return step
+
+
+# (action name, function, weight): chart toggles are more common than new tickers
+SCENARIOS = {
+    "app.py": [
+        ("ticker", app_ticker, 1),
+        ("period", app_period, 2),
+        ("chart_type", app_chart_type, 3),
+        ("range", app_range, 3),
+    ],
+    "pivots_app.py": [
+        ("ticker", table_ticker("Enter Ticker"), 1),
+        ("timeframe", table_timeframe("Select Timeframe"), 2),
+    ],
+    "pivotTableAllPeriods.py": [
+        ("ticker", with_calculate(table_ticker("Ticker Symbol")), 1),
+        ("timeframe", with_calculate(table_timeframe("Timeframe")), 2),
+    ],
+}
+
+
+# --- measurement -------------------------------------------------------------
+
+def rss_mb(pid="self"):
+    """Resident set size of a process (this one's peak RSS where /proc is unavailable)."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        scale = 1e6 if sys.platform == "darwin" else 1e3
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    values = sorted(values)
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def session(port, app, tickers, steps, seed, think, timeout, opened, samples, lock):
+    """One simulated user: open the app, then `steps` weighted random widget changes."""
+    rng = random.Random(seed)
+    names, actions, weights = zip(*SCENARIOS[app])
+    with contextlib.ExitStack() as stack:
+        t = time.perf_counter()
+        try:
+            remote = stack.enter_context(RemoteSession(port, timeout))
+            at = remote.run()
+            with lock:
+                samples.append(("open", time.perf_counter() - t, len(at.exception)))
+        finally:
+            opened.wait()  # memory is sampled once every session is open
+        for _ in range(steps):
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+            i = rng.choices(range(len(actions)), weights)[0]
+            t = time.perf_counter()
+            try:
+                at = actions[i](at, rng, tickers)
+                errors = len(at.exception)
+            except Exception:  # a widget vanished or a run timed out: count it, keep going
+                errors = 1
+            with lock:
+                samples.append((names[i], time.perf_counter() - t, errors))
+    return at
+
+
+def run_level(port, pid, app, sessions, tickers, steps, seed=0, think=0.0, timeout=120):
+    """Run `sessions` concurrent sessions of `app` against the server; returns one result record."""
+    samples, lock = [], threading.Lock()
+    opened = threading.Barrier(sessions + 1)
+    before = rss_mb(pid)
+    t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(session, port, app, tickers, steps, seed * 1000 + i, think, timeout,
+                               opened, samples, lock) for i in range(sessions)]
+        opened.wait()
+        memory = rss_mb(pid)
+        for f in futures:
+            f.result()
+    seconds = time.perf_counter() - t
+
+    reruns = [s for name, s, _ in samples if name != "open"]
+    ms = [s * 1e3 for s in reruns] or [0.0]
+    by_action = {}
+    for name, s, _ in samples:
+        by_action.setdefault(name, []).append(s * 1e3)
+    return {
+        "app": app, "sessions": sessions, "steps": steps, "think_ms": think * 1e3,
+        "reruns": len(reruns), "errors": sum(e for _, _, e in samples),
+        "p50_ms": percentile(ms, 50), "p95_ms": percentile(ms, 95), "p99_ms": percentile(ms, 99),
+        "max_ms": max(ms), "throughput": len(reruns) / seconds, "seconds": seconds,
+        "rss_mb": memory, "mb_per_session": (memory - before) / sessions,
+        "actions_p50_ms": {k: statistics.median(v) for k, v in by_action.items()},
+    }
+
+
+def warm_up(port, app, tickers, timeout=120):
+    """One untimed pass through every action, so the first level isn't measuring cold caches."""
+    rng = random.Random(-1)
+    with RemoteSession(port, timeout) as remote:
+        at = remote.run()
+        for t in tickers:
+            for _, action, _ in SCENARIOS[app]:
+                at = action(at, rng, [t])
+
+
+def capacity(records, slo_ms):
+    """
+    Per app: the most concurrent sessions before the first level that missed
+    `slo_ms` at p95 or had errors (0 if the smallest level already failed).
+    """
+    out, failed = {}, set()
+    for r in sorted(records, key=lambda r: r["sessions"]):
+        app = r["app"]
+        out.setdefault(app, 0)
+        if app in failed:
+            continue
+        if r["p95_ms"] <= slo_ms and not r["errors"]:
+            out[app] = r["sessions"]
+        else:
+            failed.add(app)
+    return out
+
+
+def compare(baseline, current, threshold=1.2):
+    """Print current/baseline p95 ratios per (app, sessions); returns the regressions."""
+    key = lambda r: (r["app"], r["sessions"], r["steps"], r.get("think_ms"))
+    base = {key(r): r for r in baseline}
+    regressions = []
+    for r in current:
+        b = base.get(key(r))
+        if b is None or not b["p95_ms"]:
+            continue
+        ratio = r["p95_ms"] / b["p95_ms"]
+        flag = "REGRESSION" if ratio > threshold else ""
+        print(f"{r['app']:<26} {r['sessions']:>4} sessions  p95 {ratio:>6.2f}x  {flag}")
+        if flag:
+            regressions.append((r, b, ratio))
+    return regressions
+
+
+def print_record(r):
+    print(f"{r['app']:<26} {r['sessions']:>4} sessions  p50 {r['p50_ms']:>7.1f}  p95 {r['p95_ms']:>7.1f}  "
+          f"p99 {r['p99_ms']:>7.1f} ms  {r['throughput']:>6.1f} reruns/s  "
+          f"{r['mb_per_session']:>6.1f} MB/session  {r['errors']} errors")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load test the Streamlit apps with concurrent sessions.")
+    parser.add_argument("--app", action="append", choices=APPS, help="app to test (repeatable; default all)")
+    parser.add_argument("--sessions", default=",".join(map(str, DEFAULT_SESSIONS)),
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--steps", type=int, default=10, help="widget changes per session")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a user's changes")
+    parser.add_argument("--tickers", type=int, default=20, help="synthetic tickers to seed")
+    parser.add_argument("--years", type=int, default=4, help="years of synthetic history")
+    parser.add_argument("--data-dir", help="use this existing store instead of synthetic data")
+    parser.add_argument("--warm", action="store_true", help="publish the shared cache and level table first")
+    parser.add_argument("--cold", action="store_true", help="skip the warm-up pass")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--slo-ms", type=float, default=500, help="p95 rerun latency target")
+    parser.add_argument("--capacity", type=int, help="fail unless every app meets the target at this many sessions")
+    parser.add_argument("--out", help="results file (default bench_results/load_<run>.jsonl)")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="p95 ratio that counts as a regression")
+    args = parser.parse_args()
+
+    try:
+        streamlit_wire()  # unsupported Streamlit: stop before seeding data and starting servers
+    except RuntimeError as e:
+        parser.exit(2, f"{e}\n")
+    tickers = stub_environment(args.tickers, args.years, args.warm, args.data_dir)
+
+    from benchmark import _git_commit, load, save
+
+    run_id = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    common = {"run": run_id, "commit": _git_commit(), "python": sys.version.split()[0],
+              "tickers": len(tickers), "warm": args.warm, "slo_ms": args.slo_ms}
+    levels = {int(x) for x in args.sessions.split(",")} | ({args.capacity} if args.capacity else set())
+    records = []
+    for app in args.app or APPS:
+        server, port = start_server(app)
+        try:
+            if not args.cold:
+                warm_up(port, app, tickers[:3])
+            for n in sorted(levels):
+                rec = dict(common, **run_level(port, server.pid, app, n, tickers, args.steps, args.seed,
+                                               args.think_ms / 1e3))
+                print_record(rec)
+                records.append(rec)
+        finally:
+            stop_server(server)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    print(f"Saved {save(records, args.out or os.path.join(RESULTS_DIR, f'load_{run_id}.jsonl'))}")
+
+    failed = False
+    for app, n in capacity(records, args.slo_ms).items():
+        print(f"{app:<26} capacity {n} sessions at p95 <= {args.slo_ms:g} ms")
+        if args.capacity and n < args.capacity:
+            print(f"{app:<26} BELOW the required {args.capacity} sessions")
+            failed = True
+    if args.compare and compare(load(args.compare), records, args.threshold):
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -1,80 +1,52 @@
-import yfinance as yf
-import plotly.graph_objects as go
-import pandas as pd
+from aggregate import PERIOD_LETTERS
+from data_store import load_history
+from downsample import compress_levels, downsample_frame
+from figures import pivot_figure
+from instrument import span, start_run
+from intraday import load_daily
+from pivot_engine import aligned_levels
 
-def plot_candlestick_pivots(ticker, year, p_input):
-    # Map letters to yfinance/pandas frequencies
-    period_map = {
-        'd': 'B',  # Business Day
-        'w': 'W-MON', # Weekly (starting Monday)
-        'm': 'ME', # Month End
-        'q': 'QE', # Quarter End
-        'a': 'YE'  # Year End
-    }
-    
-    freq = period_map.get(p_input.lower(), 'YE')
+def plot_candlestick_pivots(ticker, year, p_input, intraday_path=None, out="pivot_chart.html"):
+    # Map letters to pandas frequencies
+    freq = PERIOD_LETTERS.get(p_input.lower(), 'YE')
+    start_run("pivot-periods.plot_candlestick_pivots")
     
     # 1. Fetch data (including previous year for calculation buffer)
     start_date = f"{year-1}-01-01"
     end_date = f"{year}-12-31"
     print(f"Fetching data for {ticker}...")
     
-    df = yf.download(ticker, start=start_date, end=end_date, auto_adjust=True)
+    with span("load_history") as s:
+        if intraday_path:
+            # Stream the minute bars into daily bars (constant memory)
+            df = load_daily(intraday_path, start=start_date, end=end_date)
+        else:
+            df = load_history(ticker, start=start_date, end=end_date)
+        s.rows = len(df)
     
     if df.empty:
         print("No data found.")
         return
 
-    if isinstance(df.columns, pd.MultiIndex):
-        df = df.xs(ticker.upper(), axis=1, level=1)
-
-    # 2. Resample to find H, L, C for the chosen period
-    logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
-    resampled = df.resample(freq).apply(logic)
-
-    # 3. Calculate Pivot Points
-    resampled['P'] = (resampled['High'] + resampled['Low'] + resampled['Close']) / 3
-    resampled['R1'] = (resampled['P'] * 2) - resampled['Low']
-    resampled['S1'] = (resampled['P'] * 2) - resampled['High']
-    
-    # Shift so the calculated levels apply to the FOLLOWING period
-    pivot_levels = resampled[['P', 'R1', 'S1']].shift(1)
-
-    # 4. Align levels to the daily chart (forward fill the gaps)
-    # This creates the "Step" effect on a daily chart
-    plot_data = pd.DataFrame(index=df.index).join(pivot_levels).ffill()
+    # 2-4. Aggregate to find H, L, C for the chosen period, calculate the
+    # pivot points and align them to the daily chart: each period's levels
+    # apply to the FOLLOWING period, which creates the "Step" effect
+    with span("align_levels", rows=len(df)):
+        plot_data = aligned_levels(df, freq)
     
     # Filter for target year only
     current_year_df = df.loc[str(year)]
     plot_levels = plot_data.loc[str(year)]
 
-    # 5. Build the Chart
-    fig = go.Figure(data=[go.Candlestick(
-        x=current_year_df.index,
-        open=current_year_df['Open'],
-        high=current_year_df['High'],
-        low=current_year_df['Low'],
-        close=current_year_df['Close'],
-        name='Price'
-    )])
-
-    # Levels Configuration
-    levels_config = [
-        {'col': 'R1', 'name': 'R1 Resistance', 'color': '#FF4B4B'},
-        {'col': 'P',  'name': 'Pivot Point',  'color': '#FFA500'},
-        {'col': 'S1', 'name': 'S1 Support',    'color': '#00CC96'}
-    ]
+    # Keep the figure under a fixed point budget: bucket the candles and
+    # reduce the step-shaped levels to their change points
+    with span("downsample", rows=len(current_year_df)):
+        chart_df = downsample_frame(current_year_df)
+        steps = compress_levels(plot_levels, ('P', 'R1', 'S1'))
 
-    for lvl in levels_config:
-        fig.add_trace(go.Scatter(
-            x=plot_levels.index,
-            y=plot_levels[lvl['col']],
-            name=lvl['name'],
-            line=dict(color=lvl['color'], width=2, shape='hv'), # 'hv' = horizontal-then-vertical steps
-            opacity=0.8
-        ))
-
-    fig.update_layout(
+    # 5. Build the Chart
+    fig = pivot_figure(
+        chart_df, steps,
         title=f"{ticker.upper()} - {year} Price Action with {p_input.upper()} Pivots",
         yaxis_title="Price (USD)",
         xaxis_title="Date",
@@ -84,12 +56,14 @@ def plot_candlestick_pivots(ticker, year, p_input):
         hovermode="x unified"
     )
 
-    fig.write_html("pivot_chart.html")
-    print(f"\nSUCCESS! Created chart using {freq} frequency. Open 'pivot_chart.html' in Preview.")
+    with span("write_html"):
+        fig.write_html(out)
+    print(f"\nSUCCESS! Created chart using {freq} frequency. Open '{out}' in Preview.")
 
 if __name__ == "__main__":
     t = input("Ticker (e.g., TSLA): ").strip() or "TSLA"
     y = input("Year: ").strip() or "2024"
     p = input("Period - (d)aily, (w)eekly, (m)onthly, (q)uarterly, (a)nnually: ").strip().lower() or "a"
+    i = input("Intraday bars file (Parquet/CSV/.npy dir, blank for daily data): ").strip() or None
     
-    plot_candlestick_pivots(t, int(y), p)
+    plot_candlestick_pivots(t, int(y), p, i)
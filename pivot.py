@@ -1,5 +1,8 @@
-import yfinance as yf
-import pandas as pd
+import datetime
+
+from data_store import load_history, years_ago
+from live_feed import live_price
+from pivot_engine import LEVEL_NAMES, level_table, previous_period
 
 def calculate_pivots_with_distance():
     # 1. User Inputs
@@ -8,14 +11,14 @@ def calculate_pivots_with_distance():
     timeframe = input("Enter timeframe: ").strip().lower()
 
     # 2. Fetch Data
-    ticker = yf.Ticker(symbol)
-    df = ticker.history(period="2y")
+    df = load_history(symbol, start=years_ago(2))
     
     if df.empty:
         print("Error: Could not retrieve data.")
         return
 
-    current_price = df['Close'].iloc[-1]
+    # Streamed price if live_feed.py is writing snapshots, else the last close
+    current_price = live_price(symbol) or df['Close'].iloc[-1]
 
     # 3. Resample for the chosen period
     resample_map = {
@@ -28,37 +31,14 @@ def calculate_pivots_with_distance():
         print("Invalid timeframe.")
         return
 
-    resampled = df.resample(resample_map[timeframe]).agg({
-        'High': 'max',
-        'Low': 'min',
-        'Close': 'last'
-    })
+    prev_period = previous_period(df, resample_map[timeframe], datetime.date.today())
 
-    if len(resampled) < 2:
+    if prev_period is None:
         print("Error: Not enough historical data.")
         return
-        
-    prev_period = resampled.iloc[-2]
-    H, L, C = prev_period['High'], prev_period['Low'], prev_period['Close']
 
     # 4. Standard Pivot Formulas
-    P = (H + L + C) / 3
-    R1 = (P * 2) - L
-    S1 = (P * 2) - H
-    R2 = P + (R1 - S1)
-    S2 = P - (R1 - S1)
-    R3 = H + 2 * (P - L)
-    S3 = L - 2 * (H - P)
-
-    levels = [
-        ("Resistance 3 (R3)", R3),
-        ("Resistance 2 (R2)", R2),
-        ("Resistance 1 (R1)", R1),
-        ("PIVOT POINT (P)", P),
-        ("Support 1 (S1)", S1),
-        ("Support 2 (S2)", S2),
-        ("Support 3 (S3)", S3)
-    ]
+    levels = level_table(*prev_period, current_price)
 
     # 5. Print Results Table
     header = f"\n{symbol} {timeframe.upper()} PIVOTS | Current Price: ${current_price:.2f}"
@@ -67,10 +47,9 @@ def calculate_pivots_with_distance():
     print(f"{'Level':<20} | {'Price':<10} | {'% Distance':<12} | {'Status'}")
     print("-" * 65)
 
-    for name, val in levels:
-        # Calculate raw percentage distance
-        pct_dist = ((val / current_price) - 1) * 100
-        
+    for key, val, pct_dist in levels:
+        name = LEVEL_NAMES[key]
+
         # Round to nearest whole number and convert to string with %
         # Use :+d to include the + or - sign for the integer
         rounded_pct = f"{round(pct_dist):+d}%"
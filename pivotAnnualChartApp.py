@@ -1,10 +1,16 @@
 import streamlit as st
-import yfinance as yf
 import plotly.graph_objects as go
-import pandas as pd
+
+from data_store import load_history
+from downsample import downsample_frame
+from instrument import note_miss, sidebar_panel, span, start_run
+from pivot_engine import compute_levels
+from single_flight import coalesce
+import shared_cache
 
 # Page Setup
 st.set_page_config(page_title="Pivot Candlestick Chart", layout="wide")
+start_run("pivotAnnualChartApp.py")
 
 st.title("🕯️ Annual Pivot Candlestick Analyzer")
 st.markdown("Visualize stock price action against key annual support and resistance levels.")
@@ -16,42 +22,46 @@ year = st.sidebar.number_input("Analysis Year", min_value=2000, max_value=2026,
 
 # --- Data Fetching & Logic ---
 @st.cache_data(ttl=3600)
+@coalesce("pivotAnnualChartApp.get_candlestick_data", ttl=60)
 def get_candlestick_data(ticker, year):
+    note_miss()
     start_date = f"{year-1}-01-01"
     end_date = f"{year}-12-31"
     
-    df = yf.download(ticker, start=start_date, end=end_date, auto_adjust=True)
+    df = load_history(ticker, start=start_date, end=end_date)
     return df
 
 if ticker:
-    df = get_candlestick_data(ticker, year)
+    with span("get_candlestick_data", cached=True) as s:
+        # Shared memory-mapped cache first, so replicas don't each hold a copy
+        df = shared_cache.current_history(ticker, start=f"{year-1}-01-01", end=f"{year}-12-31")
+        if df is None:
+            df = get_candlestick_data(ticker, year)
+        s.rows = len(df)
     
     if not df.empty:
         try:
-            # Handle MultiIndex and extract the requested year vs previous year
-            if isinstance(df.columns, pd.MultiIndex):
-                prev_year_data = df.xs(ticker, axis=1, level=1).loc[str(year-1)]
-                current_year_data = df.xs(ticker, axis=1, level=1).loc[str(year)]
-            else:
-                prev_year_data = df.loc[str(year-1)]
-                current_year_data = df.loc[str(year)]
+            # Extract the requested year vs previous year
+            prev_year_data = df.loc[str(year-1)]
+            current_year_data = df.loc[str(year)]
                 
             # Pivot Calculations
             high_p = float(prev_year_data['High'].max())
             low_p = float(prev_year_data['Low'].min())
             close_p = float(prev_year_data['Close'].iloc[-1])
             
-            pivot = (high_p + low_p + close_p) / 3
-            r1 = (pivot * 2) - low_p
-            s1 = (pivot * 2) - high_p
+            lv = compute_levels(high_p, low_p, close_p)
+            pivot, r1, s1 = float(lv['P']), float(lv['R1']), float(lv['S1'])
 
             # --- Create Chart ---
+            # Bucket the candles so the figure stays under a fixed point budget
+            chart_data = downsample_frame(current_year_data)
             fig = go.Figure(data=[go.Candlestick(
-                x=current_year_data.index,
-                open=current_year_data['Open'],
-                high=current_year_data['High'],
-                low=current_year_data['Low'],
-                close=current_year_data['Close'],
+                x=chart_data.index,
+                open=chart_data['Open'],
+                high=chart_data['High'],
+                low=chart_data['Low'],
+                close=chart_data['Close'],
                 name='Price Action'
             )])
 
@@ -97,3 +107,5 @@ if ticker:
             st.info("Check if the stock has history for the previous year.")
     else:
         st.error("No data found for this ticker.")
+
+sidebar_panel(st)
@@ -1,7 +1,17 @@
+import datetime
+
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 
+from data_store import load_history, years_ago
+from instrument import sidebar_panel, span, start_run
+from pivot_engine import LEVEL_NAMES, level_table, previous_period
+from single_flight import coalesce
+import level_db
+import shared_cache
+
+start_run("pivotTableAllPeriods.py")
+
 # Page Configuration
 st.set_page_config(page_title="Stock Pivot Calculator", page_icon="📈")
 
@@ -21,19 +31,11 @@ timeframe_option = st.sidebar.selectbox(
 )
 
 # --- Helper Function ---
+@st.cache_data(ttl=3600)
+@coalesce("pivotTableAllPeriods.calculate_pivots", ttl=60)
 def calculate_pivots(symbol, timeframe_str):
     try:
-        # 1. Fetch Data
-        ticker = yf.Ticker(symbol)
-        # Fetch 2 years to ensure we have enough history for resampling
-        df = ticker.history(period="2y")
-
-        if df.empty:
-            return None, "Error: Could not retrieve data. Check ticker symbol."
-
-        current_price = df["Close"].iloc[-1]
-
-        # 2. Resample Mapping
+        # 1. Resample Mapping
         resample_map = {
             "Annual": "YE",
             "Quarterly": "QE",
@@ -41,45 +43,33 @@ def calculate_pivots(symbol, timeframe_str):
         }
         resample_code = resample_map.get(timeframe_str)
 
-        # 3. Resample Data
-        resampled = df.resample(resample_code).agg(
-            {"High": "max", "Low": "min", "Close": "last"}
-        )
-        
-        # Drop rows with NaN values (incomplete periods)
-        resampled = resampled.dropna()
+        # 2. Load 2 years to ensure we have enough history for resampling
+        df = load_history(symbol, start=years_ago(2))
+
+        if df.empty:
+            return None, "Error: Could not retrieve data. Check ticker symbol."
+
+        current_price = df["Close"].iloc[-1]
+
+        # 3. Previous period from the nightly level table or the shared memory-mapped
+        # cache (levels only); resampled here when neither has the period that just ended
+        prev_period = level_db.lookup(symbol, resample_code) or shared_cache.previous_hlc(symbol, resample_code)
+        if prev_period is None:
+            with span("aggregate", rows=len(df)):
+                prev_period = previous_period(df, resample_code, datetime.date.today())
 
-        if len(resampled) < 2:
+        if prev_period is None:
             return None, "Error: Not enough historical data to calculate previous period pivots."
 
-        # 4. Get Previous Period Data
-        # We use iloc[-2] because iloc[-1] is the current (incomplete) period
-        prev_period = resampled.iloc[-2]
-        H, L, C = prev_period["High"], prev_period["Low"], prev_period["Close"]
-
-        # 5. Calculate Pivots
-        P = (H + L + C) / 3
-        R1 = (P * 2) - L
-        S1 = (P * 2) - H
-        R2 = P + (R1 - S1)
-        S2 = P - (R1 - S1)
-        R3 = H + 2 * (P - L)
-        S3 = L - 2 * (H - P)
-
-        levels = [
-            ("Resistance 3 (R3)", R3),
-            ("Resistance 2 (R2)", R2),
-            ("Resistance 1 (R1)", R1),
-            ("PIVOT POINT (P)", P),
-            ("Support 1 (S1)", S1),
-            ("Support 2 (S2)", S2),
-            ("Support 3 (S3)", S3),
-        ]
-
-        # 6. Build Results List
+        H, L, C = prev_period
+
+        # 4. Calculate Pivots
+        levels = level_table(H, L, C, current_price)
+
+        # 5. Build Results List
         results = []
-        for name, val in levels:
-            pct_dist = ((val / current_price) - 1) * 100
+        for key, val, pct_dist in levels:
+            name = LEVEL_NAMES[key]
             status = "Resistance" if val > current_price else "Support"
             
             results.append({
@@ -106,8 +96,9 @@ def calculate_pivots(symbol, timeframe_str):
 
 # --- Main Execution ---
 if st.sidebar.button("Calculate Pivots", type="primary"):
-    with st.spinner('Fetching data from Yahoo Finance...'):
-        result, error = calculate_pivots(symbol, timeframe_option)
+    with st.spinner('Loading price data...'):
+        with span("calculate_pivots"):
+            result, error = calculate_pivots(symbol, timeframe_option)
 
     if error:
         st.error(error)
@@ -134,7 +125,7 @@ if st.sidebar.button("Calculate Pivots", type="primary"):
         display_df = df_results[['Level', 'Price', 'Distance (%)', 'Status']].copy()
         
         st.dataframe(
-            display_df.style.applymap(color_status, subset=['Status']),
+            display_df.style.map(color_status, subset=['Status']),
             use_container_width=True,
             hide_index=True
         )
@@ -150,3 +141,5 @@ if st.sidebar.button("Calculate Pivots", type="primary"):
             })
 else:
     st.info("👈 Enter a ticker and click **Calculate Pivots** to begin.")
+
+sidebar_panel(st)
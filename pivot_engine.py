@@ -0,0 +1,143 @@
+"""
+Vectorized standard pivot point engine shared by every script.
+
+All formulas operate on NumPy arrays of any shape, so a (tickers x periods)
+block of High/Low/Close values produces every level for every period in one pass.
+"""
+import numpy as np
+
+from aggregate import align_to_bars, period_bars, previous_end
+from range_index import RangeMaxIndex
+
+LEVELS = ('P', 'R1', 'S1', 'R2', 'S2', 'R3', 'S3')
+
+# Display order used by the tables (highest resistance first)
+TABLE_ORDER = ('R3', 'R2', 'R1', 'P', 'S1', 'S2', 'S3')
+
+LEVEL_NAMES = {
+    'R3': "Resistance 3 (R3)",
+    'R2': "Resistance 2 (R2)",
+    'R1': "Resistance 1 (R1)",
+    'P': "PIVOT POINT (P)",
+    'S1': "Support 1 (S1)",
+    'S2': "Support 2 (S2)",
+    'S3': "Support 3 (S3)",
+}
+
+
+def compute_levels(high, low, close):
+    """
+    Standard pivot levels for arrays of period High/Low/Close.
+
+    Inputs broadcast against each other; every returned array has their
+    common shape. Returns a dict keyed by LEVELS.
+    """
+    h = np.asarray(high, dtype=np.float64)
+    l = np.asarray(low, dtype=np.float64)
+    c = np.asarray(close, dtype=np.float64)
+
+    p = (h + l + c) / 3
+    rng = h - l
+    return {
+        'P': p,
+        'R1': (p * 2) - l,
+        'S1': (p * 2) - h,
+        'R2': p + rng,
+        'S2': p - rng,
+        'R3': h + 2 * (p - l),
+        'S3': l - 2 * (h - p),
+    }
+
+
+def stack_levels(high, low, close):
+    """Same as compute_levels but as one array with a leading axis in LEVELS order."""
+    levels = compute_levels(high, low, close)
+    return np.stack([levels[k] for k in LEVELS])
+
+
+def pct_distance(levels, price):
+    """Percentage distance from `price` to each level (positive = level above price)."""
+    price = np.asarray(price, dtype=np.float64)
+    return {k: ((v / price) - 1) * 100 for k, v in levels.items()}
+
+
+def aligned_levels(df, freq, columns=('P', 'R1', 'S1'), bars=None):
+    """
+    Levels of each `freq` period mapped onto the daily bars of the FOLLOWING
+    period, as a frame on df's index (the "step" series drawn on the charts).
+
+    Pass precomputed `bars` to skip the aggregation.
+    """
+    import pandas as pd
+
+    bars = bars if bars is not None else period_bars(df, freq)
+    levels = compute_levels(bars.high, bars.low, bars.close)
+    return pd.DataFrame(align_to_bars(bars, {k: levels[k] for k in columns}), index=df.index)
+
+
+def window_levels(df, start=None, end=None, index=None):
+    """
+    Levels from the High/Low/Close of the bars dated start..end inclusive.
+
+    O(1) per query once a RangeMaxIndex is built; pass `index` to reuse one.
+    """
+    index = index if index is not None else RangeMaxIndex.from_frame(df)
+    return compute_levels(*index.window(start, end))
+
+
+def rolling_levels(df, sessions, columns=('P', 'R1', 'S1'), index=None):
+    """
+    Rolling pivots: on every bar, the levels of the previous `sessions` bars,
+    as a frame on df's index (NaN until a full window has passed). O(N).
+    """
+    import pandas as pd
+
+    index = index if index is not None else RangeMaxIndex.from_frame(df)
+    levels = compute_levels(*index.rolling(sessions))
+    # The window ending at bar t sets the levels for bar t+1
+    shifted = {k: np.concatenate(([np.nan], levels[k][:-1])) for k in columns}
+    return pd.DataFrame(shifted, index=df.index)
+
+
+def last_completed(df, freq, today=None):
+    """
+    (period end date, High, Low, Close) of the last completed `freq` period
+    in a daily OHLC frame, or None.
+
+    Without `today` the period holding the last bar counts as in progress.
+    With it, every period that ended before `today`'s period is complete, so
+    a store that stops at the previous session (before the first bar of a
+    new period) still yields the period that just ended.
+    """
+    if df.empty:
+        return None
+    bars = period_bars(df, freq)
+    if today is None:
+        # [-2] because [-1] is the current (incomplete) period
+        i = len(bars.close) - 2
+    else:
+        done = np.flatnonzero(bars.label <= np.datetime64(previous_end(freq, today), 'D'))
+        i = done[-1] if done.size else -1
+    if i < 0:
+        return None
+    return bars.label[i].astype(object), float(bars.high[i]), float(bars.low[i]), float(bars.close[i])
+
+
+def previous_period(df, freq, today=None):
+    """
+    High/Low/Close of the last completed `freq` period in a daily OHLC frame
+    (see last_completed for `today`).
+
+    Returns None when there is no completed period in the history.
+    """
+    found = last_completed(df, freq, today)
+    return None if found is None else found[1:]
+
+
+def level_table(high, low, close, current_price):
+    """
+    Rows of (key, price, % distance) in TABLE_ORDER for a single period.
+    """
+    levels = compute_levels(high, low, close)
+    dist = pct_distance(levels, current_price)
+    return [(k, float(levels[k]), float(dist[k])) for k in TABLE_ORDER]
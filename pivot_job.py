@@ -1,17 +1,149 @@
+"""
+Batch pivot job over a directory of vendor OHLCV files (CSV or Parquet).
+
+Each file is streamed in bounded-memory chunks through
+intraday.StreamingAggregator, which folds the bars into every timeframe
+carrying only the unfinished periods between chunks, and the periods are
+run through the pivot engine. Files are spread across a process pool and the
+results are written to one consolidated Parquet file of levels per ticker
+and period:
+
+    python pivot_job.py vendor_dumps/ --out pivot_levels.parquet --workers 8
+
+Memory per worker is one chunk plus one row per completed period, no matter
+how large the file is. The ticker is taken from the file name.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from aggregate import FREQS
+from intraday import CHUNK_ROWS, aggregate_file
+from pivot_engine import LEVELS, compute_levels
+
+EXTENSIONS = ('.csv', '.csv.gz', '.parquet')
+
+
 def calculate_pivot(data):
     """
     Function to calculate the pivot point based on the provided data.
     """
-    high = max(data['high'])
-    low = min(data['low'])
-    close = data['close'][-1]
+    high = np.max(data['high'])
+    low = np.min(data['low'])
+    close = np.asarray(data['close'])[-1]
 
-    pivot = (high + low + close) / 3
-    return pivot
+    pivot = compute_levels(high, low, close)['P']
+    return float(pivot)
 
-if __name__ == '__main__':
+
+def find_files(root):
+    """Every CSV/Parquet file under `root`, largest first so the pool finishes evenly."""
+    found = []
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            if name.lower().endswith(EXTENSIONS):
+                path = os.path.join(dirpath, name)
+                found.append((os.path.getsize(path), path))
+    return [p for _, p in sorted(found, reverse=True)]
+
+
+def ticker_for(path):
+    name = os.path.basename(path)
+    for ext in EXTENSIONS:
+        if name.lower().endswith(ext):
+            name = name[:-len(ext)]
+            break
+    return name.upper()
+
+
+def process_file(path, freqs=FREQS, chunk_rows=CHUNK_ROWS, tz=None):
+    """
+    Levels for every period of every timeframe in one file, as a DataFrame (None if empty).
+
+    Levels on a row are computed from that period's H/L/C, so they apply to
+    the FOLLOWING period.
+    """
     import pandas as pd
-    # Load data
-    # data = pd.read_csv('path_to_data.csv')
-    # pivot_value = calculate_pivot(data)
-    # print(f'Calculated Pivot: {pivot_value}')
+
+    periods = aggregate_file(path, freqs, chunk_rows, tz)
+    if not len(periods[freqs[0]].label):
+        return None
+
+    ticker = ticker_for(path)
+    frames = []
+    for freq, bars in periods.items():
+        levels = compute_levels(bars.high, bars.low, bars.close)
+        frame = pd.DataFrame({
+            'ticker': ticker, 'timeframe': freq,
+            'period_start': bars.start, 'period_end': bars.label,
+            'Open': bars.open, 'High': bars.high, 'Low': bars.low, 'Close': bars.close,
+        })
+        for k in LEVELS:
+            frame[k] = levels[k]
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _process_job(args):
+    path, freqs, chunk_rows, tz = args
+    try:
+        return path, process_file(path, freqs, chunk_rows, tz), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def run_job(root, out_path, freqs=FREQS, workers=None, chunk_rows=CHUNK_ROWS, tz=None):
+    """
+    Process every file under `root` in a process pool and write one Parquet output.
+
+    Results are appended to the output as each file finishes, so the parent
+    never holds more than one file's levels. Returns (files written, failures).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    files = find_files(root)
+    writer = None
+    written, failures = 0, []
+    tmp = f"{out_path}.tmp"
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_process_job, (p, freqs, chunk_rows, tz)) for p in files]
+            for fut in as_completed(futures):
+                path, frame, error = fut.result()
+                if error:
+                    failures.append((path, error))
+                    continue
+                if frame is None:
+                    continue
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table.cast(writer.schema))
+                written += 1
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        os.replace(tmp, out_path)
+    return written, failures
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compute pivot levels for a directory of OHLCV files.")
+    parser.add_argument("root", help="directory of CSV/Parquet files (one ticker per file)")
+    parser.add_argument("--out", default="pivot_levels.parquet")
+    parser.add_argument("--freqs", default=",".join(FREQS))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--tz", default=None, help="exchange time zone for tz-aware timestamps, e.g. America/New_York")
+    args = parser.parse_args()
+
+    written, failures = run_job(args.root, args.out, tuple(args.freqs.split(",")), args.workers,
+                                args.chunk_rows, args.tz)
+    print(f"Wrote levels for {written} files to {args.out}")
+    for path, error in failures:
+        print(f"  FAILED {path}: {error}")
@@ -0,0 +1,190 @@
+"""
+Incremental pivot state: O(1) updates per new bar.
+
+A PivotState holds the running High/Low/Close of the open period plus the
+frozen levels of the last completed period for one ticker and timeframe.
+New daily or intraday bars update it in constant time and the levels roll
+over when a bar lands in a new period. States serialize to JSON so the
+nightly job can resume where it left off instead of reprocessing history.
+
+This is a standalone job (the __main__ below): the apps, the live feed and
+the alerts take their levels from the level table and the store, not from
+this state file.
+"""
+import json
+import math
+import os
+
+import pandas as pd
+
+from aggregate import period_bars, period_code
+from pivot_engine import LEVELS, compute_levels
+
+
+class PivotState:
+    """Running pivot state for one (ticker, freq)."""
+
+    def __init__(self, ticker, freq, period=None, open_=math.nan, high=-math.inf, low=math.inf,
+                 close=math.nan, levels=None, prev_hlc=None, as_of=None):
+        self.ticker = ticker.upper()
+        self.freq = freq
+        self.period = period          # period code of the open period
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.levels = levels          # frozen levels of the last completed period
+        self.prev_hlc = prev_hlc      # (H, L, C) the frozen levels came from
+        self.as_of = None if as_of is None else pd.Timestamp(as_of)  # last bar applied
+
+    def update(self, when, close, high=None, low=None, open_=None):
+        """
+        Apply one bar (or a single trade/quote if only `close` is given).
+
+        Returns True when the bar opened a new period and the levels rolled over.
+        Bars at or before `as_of` (re-fed or late) are ignored, so feeding the
+        same history twice leaves the state unchanged.
+        """
+        when = pd.Timestamp(when)
+        if self.as_of is not None and when <= self.as_of:
+            return False
+        high = close if high is None else high
+        low = close if low is None else low
+        code = period_code(when, self.freq)
+
+        rolled = False
+        if self.period is None or code > self.period:
+            if self.period is not None and not math.isnan(self.close):
+                self._freeze()
+                rolled = True
+            self.period = code
+            self.open = close if open_ is None else open_
+            self.high, self.low = high, low
+        elif code < self.period:
+            return False
+        else:
+            if high > self.high:
+                self.high = high
+            if low < self.low:
+                self.low = low
+
+        self.close = close
+        self.as_of = when
+        return rolled
+
+    def _freeze(self):
+        levels = compute_levels(self.high, self.low, self.close)
+        self.levels = {k: float(levels[k]) for k in LEVELS}
+        self.prev_hlc = (self.high, self.low, self.close)
+
+    def to_dict(self):
+        return {
+            "ticker": self.ticker, "freq": self.freq, "period": self.period,
+            "open": self.open, "high": self.high, "low": self.low, "close": self.close,
+            "levels": self.levels, "prev_hlc": self.prev_hlc,
+            "as_of": None if self.as_of is None else str(self.as_of),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        prev_hlc = tuple(d["prev_hlc"]) if d.get("prev_hlc") else None
+        return cls(d["ticker"], d["freq"], d["period"], d["open"], d["high"], d["low"], d["close"],
+                   d.get("levels"), prev_hlc, d.get("as_of"))
+
+    @classmethod
+    def from_history(cls, ticker, freq, df):
+        """
+        Seed a state from a daily OHLC frame (the last bar belongs to the open period).
+        """
+        state = cls(ticker, freq)
+        if df.empty:
+            return state
+        bars = period_bars(df, freq)
+        if len(bars.close) >= 2:
+            state.high, state.low, state.close = (float(bars.high[-2]), float(bars.low[-2]),
+                                                  float(bars.close[-2]))
+            state._freeze()
+        state.period = period_code(df.index[-1], freq)
+        state.open, state.high = float(bars.open[-1]), float(bars.high[-1])
+        state.low, state.close = float(bars.low[-1]), float(bars.close[-1])
+        state.as_of = df.index[-1]
+        return state
+
+
+def _key(ticker, freq):
+    return f"{ticker.upper()}|{freq}"
+
+
+def save_states(path, states):
+    """Write a {(ticker, freq): PivotState} dict to JSON atomically."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        # JSON has no inf; an empty open period is stored as null and restored on load
+        json.dump({_key(*k): _finite(s.to_dict()) for k, s in states.items()}, f)
+    os.replace(tmp, path)
+
+
+def load_states(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        raw = json.load(f)
+    states = {}
+    for d in raw.values():
+        d["high"] = -math.inf if d["high"] is None else d["high"]
+        d["low"] = math.inf if d["low"] is None else d["low"]
+        d["open"] = math.nan if d["open"] is None else d["open"]
+        d["close"] = math.nan if d["close"] is None else d["close"]
+        s = PivotState.from_dict(d)
+        states[(s.ticker, s.freq)] = s
+    return states
+
+
+def _finite(d):
+    return {k: (None if isinstance(v, float) and not math.isfinite(v) else v) for k, v in d.items()}
+
+
+def refresh_states(states, tickers, freqs, load):
+    """
+    Bring states up to date with bars from `load(ticker, start)`.
+
+    Existing states only consume bars after their `as_of`; missing ones are
+    seeded from the full history returned by `load(ticker, None)`.
+    """
+    for ticker in tickers:
+        ticker = ticker.upper()
+        missing = [f for f in freqs if (ticker, f) not in states]
+        known = [states[(ticker, f)] for f in freqs if (ticker, f) in states]
+        if missing:
+            df = load(ticker, None)
+            for f in missing:
+                states[(ticker, f)] = PivotState.from_history(ticker, f, df)
+        if known:
+            stamps = [s.as_of for s in known if s.as_of is not None]
+            df = load(ticker, min(stamps) if stamps else None)
+            for row in df.itertuples():
+                for s in known:
+                    s.update(row.Index, row.Close, row.High, row.Low, row.Open)
+    return states
+
+
+if __name__ == "__main__":
+    # Resume the nightly state file: python pivot_state.py QQQ SPY --state pivot_state.json
+    import argparse
+
+    from data_store import load_history, years_ago
+
+    parser = argparse.ArgumentParser(description="Update persisted pivot states with new bars.")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--state", default="pivot_state.json")
+    parser.add_argument("--freqs", default="W-MON,ME,QE,YE")
+    args = parser.parse_args()
+
+    states = load_states(args.state)
+    refresh_states(states, args.tickers, args.freqs.split(","),
+                   lambda t, since: load_history(t, start=since if since is not None else years_ago(2)))
+    save_states(args.state, states)
+
+    for (t, f), s in sorted(states.items()):
+        if s.levels:
+            print(f"{t:<6} {f:<6} P={s.levels['P']:.2f} R1={s.levels['R1']:.2f} S1={s.levels['S1']:.2f}")
@@ -1,13 +1,14 @@
-import yfinance as yf
 import matplotlib.pyplot as plt
-import pandas as pd
 
-def plot_stock_pivots(ticker, year):
+from data_store import load_history
+from pivot_engine import compute_levels
+
+def plot_stock_pivots(ticker, year, out="my_pivot_chart.png"):
     # 1. Download data
     start_date = f"{year-1}-01-01"
     end_date = f"{year}-12-31"
     print(f"Fetching data for {ticker}...")
-    df = yf.download(ticker, start=start_date, end=end_date)
+    df = load_history(ticker, start=start_date, end=end_date)
     
     if df.empty:
         print("No data found. Please check the ticker and year.")
@@ -21,9 +22,8 @@ def plot_stock_pivots(ticker, year):
     close_p = prev_year['Close'].iloc[-1].item()
     
     # Formulas (as requested)
-    pivot = (high_p + low_p + close_p) / 3
-    r1 = (pivot * 2) - low_p
-    s1 = (pivot * 2) - high_p
+    lv = compute_levels(high_p, low_p, close_p)
+    pivot, r1, s1 = float(lv['P']), float(lv['R1']), float(lv['S1'])
 
     # 3. Filter data for the CURRENT year only
     current_year_df = df.loc[str(year)]
@@ -48,10 +48,13 @@ def plot_stock_pivots(ticker, year):
     # In Codespaces, this will try to pop up a window. 
     # If it doesn't show, use plt.savefig('chart.png') instead.
     #plt.show()
-plt.savefig('my_pivot_chart.png')
-print("Chart saved as my_pivot_chart.png")
+    plt.savefig(out)
+    plt.close()
+    print(f"Chart saved as {out}")
+
 # Execution
-user_ticker = input("Enter Stock Ticker (e.g., QQQ): ") or "QQQ"
-user_year = int(input("Enter Year (e.g., 2024): ") or 2024)
+if __name__ == "__main__":
+    user_ticker = input("Enter Stock Ticker (e.g., QQQ): ") or "QQQ"
+    user_year = int(input("Enter Year (e.g., 2024): ") or 2024)
 
-plot_stock_pivots(user_ticker, user_year)
\ No newline at end of file
+    plot_stock_pivots(user_ticker, user_year)
@@ -1,7 +1,18 @@
+import datetime
+
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 
+from data_store import load_history, years_ago
+from instrument import note_miss, sidebar_panel, span, start_run
+from pivot_engine import level_table, previous_period
+from single_flight import FLIGHT, coalesce
+import level_db
+import live_feed
+import shared_cache
+
+start_run("pivots_app.py")
+
 # Page setup
 st.set_page_config(page_title="Pivot Distance Tracker", page_icon="🎯")
 
@@ -13,57 +24,57 @@ st.sidebar.header("Parameters")
 symbol = st.sidebar.text_input("Enter Ticker", value="QQQ").upper()
 timeframe = st.sidebar.selectbox("Select Timeframe", ["Annual", "Quarterly", "Monthly"])
 
+with st.sidebar.expander("Data request stats"):
+    st.json(FLIGHT.stats())
+
 # --- Calculation Logic ---
 @st.cache_data(ttl=3600)
+@coalesce("pivots_app.get_pivot_data", ttl=60) # Sessions asking at the same moment share one load
 def get_pivot_data(symbol, timeframe):
+    note_miss()
     resample_map = {'Annual': 'YE', 'Quarterly': 'QE', 'Monthly': 'ME'}
     
-    ticker = yf.Ticker(symbol)
-    df = ticker.history(period="2y")
+    freq = resample_map[timeframe]
+    df = load_history(symbol, start=years_ago(2))
     
     if df.empty:
         return None, None
         
+    # The price always comes from the store; the tables only hold levels
     current_price = df['Close'].iloc[-1]
     
-    # Resample
-    resampled = df.resample(resample_map[timeframe]).agg({
-        'High': 'max', 'Low': 'min', 'Close': 'last'
-    })
+    # Key lookup in the nightly level table, then the shared memory-mapped cache;
+    # computed here when neither has the period that just ended
+    prev_period = level_db.lookup(symbol, freq) or shared_cache.previous_hlc(symbol, freq)
+    if prev_period is None:
+        with span("aggregate", rows=len(df)):
+            prev_period = previous_period(df, freq, datetime.date.today())
     
-    if len(resampled) < 2:
+    if prev_period is None:
         return None, current_price
-        
-    prev_period = resampled.iloc[-2]
-    H, L, C = prev_period['High'], prev_period['Low'], prev_period['Close']
     
     # Standard Pivot Formulas
-    P = (H + L + C) / 3
-    R1 = (P * 2) - L
-    S1 = (P * 2) - H
-    R2 = P + (R1 - S1)
-    S2 = P - (R1 - S1)
-    R3 = H + 2 * (P - L)
-    S3 = L - 2 * (H - P)
-    
-    levels = [
-        ("R3", R3), ("R2", R2), ("R1", R1),
-        ("PIVOT (P)", P),
-        ("S1", S1), ("S2", S2), ("S3", S3)
-    ]
+    levels = level_table(*prev_period, current_price)
     
     return levels, current_price
 
 # --- Main Interface ---
 if symbol:
-    levels, current_price = get_pivot_data(symbol, timeframe)
+    with span("get_pivot_data", cached=True):
+        levels, current_price = get_pivot_data(symbol, timeframe)
+
+    # A running live_feed.py --snapshot overrides the last daily close
+    live = live_feed.live_price(symbol)
+    if levels and live:
+        current_price = live
+        levels = [(k, v, (v / live - 1) * 100) for k, v, _ in levels]
     
     if levels:
         st.metric(label=f"Current {symbol} Price", value=f"${current_price:.2f}")
         
         data_list = []
-        for name, val in levels:
-            pct_dist = ((val / current_price) - 1) * 100
+        for key, val, pct_dist in levels:
+            name = "PIVOT (P)" if key == 'P' else key
             status = "Resistance (Above)" if val > current_price else "Support (Below)"
             
             # Formatting the distance: Round to nearest whole number and add %
@@ -85,9 +96,11 @@ if symbol:
 
         st.subheader(f"{timeframe} Pivot Table")
         # Displaying with a clean table
-        st.table(pivot_df.style.applymap(color_status, subset=['Status']))
+        st.table(pivot_df.style.map(color_status, subset=['Status']))
         
         st.info("💡 **Positive %:** Price must rise to hit this level. **Negative %:** Price must fall to hit this level.")
         
     else:
         st.error("Could not retrieve enough data. Try a more common ticker (e.g., SPY).")
+
+sidebar_panel(st)
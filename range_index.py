@@ -0,0 +1,109 @@
+"""
+Range-max/min index for pivots over arbitrary windows.
+
+A sparse table over a ticker's daily High/Low answers "highest high and
+lowest low between bar i and bar j" in O(1) after an O(N log N) build, and
+the window's Close is a plain array lookup. So any custom window (last 20
+sessions, Jan 15 to Mar 3, ...) costs the same as a calendar period, and a
+rolling series over N bars is O(N):
+
+    idx = RangeMaxIndex.from_frame(df)
+    H, L, C = idx.window("2024-01-15", "2024-03-03")
+    H, L, C = idx.rolling(10)          # every 10-session window, one per bar
+
+NaN bars are ignored by the max/min (fmax/fmin).
+"""
+import numpy as np
+
+
+class RangeMaxIndex:
+    def __init__(self, dates, high, low, close):
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.close = np.asarray(close, dtype=np.float64)
+        self._max = self._build(np.asarray(high, dtype=np.float64), np.fmax)
+        self._min = self._build(np.asarray(low, dtype=np.float64), np.fmin)
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(df.index.values, df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy())
+
+    @staticmethod
+    def _build(values, op):
+        # table[k][i] = op over values[i : i + 2**k]
+        table = [values]
+        k = 1
+        while (1 << k) <= values.size:
+            prev, half = table[-1], 1 << (k - 1)
+            table.append(op(prev[:-half], prev[half:]))
+            k += 1
+        return table
+
+    def __len__(self):
+        return self.close.size
+
+    def query(self, i, j):
+        """
+        (H, L, C) over bars i..j inclusive, in O(1). Accepts scalars or equal-shape index arrays.
+        """
+        if np.ndim(i) == 0 and np.ndim(j) == 0:
+            i, j = int(i), int(j)
+            if not 0 <= i <= j < len(self):
+                raise IndexError("window out of range")
+            # Two overlapping power-of-two blocks cover [i, j]
+            k = (j - i + 1).bit_length() - 1
+            second = j - (1 << k) + 1
+            h1, h2 = float(self._max[k][i]), float(self._max[k][second])
+            l1, l2 = float(self._min[k][i]), float(self._min[k][second])
+            # Scalar fmax/fmin (x != x only for NaN) without NumPy call overhead
+            return (h2 if h1 != h1 or h2 > h1 else h1, l2 if l1 != l1 or l2 < l1 else l1,
+                    float(self.close[j]))
+
+        i, j = np.asarray(i), np.asarray(j)
+        if np.any(i > j) or np.any(i < 0) or np.any(j >= len(self)):
+            raise IndexError("window out of range")
+        k = np.floor(np.log2(j - i + 1)).astype(np.intp)
+        second = j - (1 << k) + 1
+        high, low = np.empty(i.shape), np.empty(i.shape)
+        for level in np.unique(k):
+            m = k == level
+            high[m] = np.fmax(self._max[level][i[m]], self._max[level][second[m]])
+            low[m] = np.fmin(self._min[level][i[m]], self._min[level][second[m]])
+        return high, low, self.close[j]
+
+    def positions(self, start=None, end=None):
+        """Bar indices (i, j) covering the dates start..end inclusive."""
+        i = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, 'D'), side='left'))
+        j = len(self) - 1 if end is None else \
+            int(np.searchsorted(self.dates, np.datetime64(end, 'D'), side='right')) - 1
+        if i > j:
+            raise ValueError(f"no bars between {start} and {end}")
+        return i, j
+
+    def window(self, start=None, end=None):
+        """(H, L, C) for the bars dated start..end inclusive."""
+        return self.query(*self.positions(start, end))
+
+    def last(self, sessions, end=None):
+        """(H, L, C) for the last `sessions` bars up to and including `end` (default: the last bar)."""
+        _, j = self.positions(None, end)
+        return self.query(max(j - sessions + 1, 0), j)
+
+    def rolling(self, sessions):
+        """
+        (H, L, C) arrays with one entry per bar: the window of `sessions` bars
+        ending at that bar (NaN until the first full window). O(N).
+        """
+        sessions = int(sessions)
+        n = len(self)
+        high, low, close = (np.full(n, np.nan) for _ in range(3))
+        if sessions < 1 or sessions > n:
+            return high, low, close
+        # A fixed window length always uses the same table level
+        k = sessions.bit_length() - 1
+        span = 1 << k
+        i = np.arange(n - sessions + 1)
+        j = i + sessions - 1
+        high[sessions - 1:] = np.fmax(self._max[k][i], self._max[k][j - span + 1])
+        low[sessions - 1:] = np.fmin(self._min[k][i], self._min[k][j - span + 1])
+        close[sessions - 1:] = self.close[sessions - 1:]
+        return high, low, close
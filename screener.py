@@ -0,0 +1,136 @@
+"""
+Universe screener: rank tickers by % distance to their nearest pivot level.
+
+Reads daily bars from the local store (seed it with data_store.py first),
+computes the previous-period levels for every ticker in a process pool and
+returns the tickers trading closest to (or just crossing) the chosen levels.
+
+    python screener.py sp500.txt --timeframe Monthly --levels R1,S1,P --top 25
+"""
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import data_store
+from aggregate import aggregate, previous_end
+from pivot_engine import LEVELS, TABLE_ORDER, compute_levels, pct_distance
+
+TIMEFRAMES = {'Annual': 'YE', 'Quarterly': 'QE', 'Monthly': 'ME', 'Weekly': 'W-MON', 'Daily': 'B'}
+CHUNK_SIZE = 64
+
+
+def load_universe(path):
+    """
+    Symbols from a text file (one per line, '#' comments) or a CSV with a Symbol column.
+    """
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path)
+        col = next((c for c in df.columns if c.lower() in ("symbol", "ticker")), df.columns[0])
+        symbols = df[col].astype(str).tolist()
+    else:
+        with open(path) as f:
+            symbols = [line.split("#")[0] for line in f]
+    symbols = [s.strip().upper() for s in symbols]
+    return list(dict.fromkeys(s for s in symbols if s))
+
+
+def _scan_chunk(args):
+    """
+    H/L/C of the period that ended before `today`'s plus the last two closes
+    for a chunk of symbols.
+    """
+    symbols, freq, data_dir, today = args
+    data_store.DATA_DIR = data_dir
+    last_end = np.datetime64(previous_end(freq, today), 'D')
+    rows = []
+    for symbol in symbols:
+        arrays = data_store.read_arrays(symbol)
+        if arrays is None or len(arrays[0]) < 2:
+            continue
+        bars = aggregate(*arrays, freq)
+        # The store may end before or after a period boundary; go by the calendar, not the last bar
+        done = np.flatnonzero(bars.label <= last_end)
+        if not done.size:
+            continue
+        i, close = done[-1], arrays[4]
+        rows.append((symbol, bars.high[i], bars.low[i], bars.close[i], close[-1], close[-2]))
+    return rows
+
+
+def _block_rows(block, symbols, freq, today):
+    """Same columns as _scan_chunk, straight from a PriceBlock in single array ops."""
+    H, L, C = block.previous_period(freq, today)
+    price, prev_price = block.last('Close'), block.last('Close', back=1)
+    keep = np.isin(block.tickers, [s.upper() for s in symbols]) & ~np.isnan(C)
+    return (np.array(block.tickers)[keep], H[keep], L[keep], C[keep], price[keep], prev_price[keep])
+
+
+def scan(symbols, timeframe="Monthly", levels=('R1', 'S1', 'P'), top=25, workers=None, block=None, today=None):
+    """
+    Levels and distances for every symbol, sorted by distance to the nearest of `levels`.
+
+    `Crossed` marks tickers whose last bar moved through that nearest level.
+    With a price_block.PriceBlock the scan runs in-process over the block
+    instead of reading the store in a process pool. Levels come from the
+    period that ended before `today`'s (default today).
+    """
+    freq = TIMEFRAMES[timeframe]
+    today = today or datetime.date.today()
+    if block is not None:
+        sym, H, L, C, price, prev_price = _block_rows(block, symbols, freq, today)
+        if not len(sym):
+            return pd.DataFrame()
+    else:
+        chunks = [symbols[i:i + CHUNK_SIZE] for i in range(0, len(symbols), CHUNK_SIZE)]
+        jobs = [(chunk, freq, data_store.DATA_DIR, today) for chunk in chunks]
+
+        rows = []
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            for part in pool.map(_scan_chunk, jobs):
+                rows.extend(part)
+        if not rows:
+            return pd.DataFrame()
+        sym, H, L, C, price, prev_price = (np.array(col) for col in zip(*rows))
+
+    # One batched pass over the whole universe
+    lv = compute_levels(H.astype(float), L.astype(float), C.astype(float))
+    dist = pct_distance(lv, price.astype(float))
+
+    chosen = np.stack([dist[k] for k in levels])
+    nearest = np.argmin(np.abs(chosen), axis=0)
+    idx = np.arange(len(sym))
+    nearest_level = np.stack([lv[k] for k in levels])[nearest, idx]
+    price, prev_price = price.astype(float), prev_price.astype(float)
+    crossed = (prev_price - nearest_level) * (price - nearest_level) <= 0
+
+    out = pd.DataFrame({'Symbol': sym, 'Price': price})
+    for k in TABLE_ORDER:
+        out[k] = lv[k]
+    out['Nearest'] = np.array(levels)[nearest]
+    out['Distance (%)'] = chosen[nearest, idx]
+    out['Crossed'] = crossed
+    out = out.assign(_abs=np.abs(out['Distance (%)'])).sort_values('_abs').drop(columns='_abs')
+    return out.head(top).reset_index(drop=True) if top else out.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rank a universe by distance to pivot levels.")
+    parser.add_argument("universe", help="text file with one symbol per line, or CSV with a Symbol column")
+    parser.add_argument("--timeframe", default="Monthly", choices=list(TIMEFRAMES))
+    parser.add_argument("--levels", default="R1,S1,P", help=f"comma-separated subset of {','.join(LEVELS)}")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--crossing", action="store_true", help="only show tickers crossing a level")
+    args = parser.parse_args()
+
+    result = scan(load_universe(args.universe), args.timeframe, tuple(args.levels.split(",")),
+                  top=0 if args.crossing else args.top, workers=args.workers)
+    if args.crossing and not result.empty:
+        result = result[result['Crossed']].head(args.top)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(result.round(2).to_string(index=False))
@@ -0,0 +1,60 @@
+import streamlit as st
+
+from pivot_engine import LEVELS
+from price_block import PriceBlock
+from screener import TIMEFRAMES, load_universe, scan
+
+# Page setup
+st.set_page_config(page_title="Pivot Screener", page_icon="🔎", layout="wide")
+
+st.title("🔎 Pivot Level Screener")
+st.markdown("Rank a whole universe by how close each ticker trades to its pivot levels.")
+
+# --- Sidebar Inputs ---
+st.sidebar.header("Universe")
+universe_path = st.sidebar.text_input("Universe file", value="universe.txt")
+pasted = st.sidebar.text_area("...or paste symbols", value="", help="One symbol per line or comma-separated")
+timeframe = st.sidebar.selectbox("Timeframe", list(TIMEFRAMES), index=2)
+levels = st.sidebar.multiselect("Levels", list(LEVELS), default=['R1', 'S1', 'P'])
+top = st.sidebar.slider("Show top N", min_value=5, max_value=200, value=25, step=5)
+crossing_only = st.sidebar.checkbox("Only tickers crossing a level")
+
+
+@st.cache_resource(ttl=3600, max_entries=2)
+def load_block(symbols):
+    # One compact float32 block per universe, shared by every session
+    return PriceBlock.from_store(symbols)
+
+
+@st.cache_data(ttl=3600)
+def run_scan(symbols, timeframe, levels):
+    return scan(list(symbols), timeframe, levels, top=0, block=load_block(symbols))
+
+
+# --- Main Interface ---
+if st.sidebar.button("Run Screener", type="primary"):
+    if pasted.strip():
+        symbols = [s.strip().upper() for s in pasted.replace(",", "\n").splitlines() if s.strip()]
+    else:
+        try:
+            symbols = load_universe(universe_path)
+        except OSError as e:
+            st.error(f"Could not read universe file: {e}")
+            st.stop()
+
+    if not levels:
+        st.error("Pick at least one level.")
+        st.stop()
+
+    with st.spinner(f"Scanning {len(symbols)} tickers..."):
+        result = run_scan(tuple(symbols), timeframe, tuple(levels))
+
+    if result.empty:
+        st.error("No local data for these tickers. Seed the store with `python data_store.py ...`.")
+    else:
+        if crossing_only:
+            result = result[result['Crossed']]
+        st.subheader(f"{timeframe} pivots: {min(top, len(result))} closest of {len(symbols)} tickers")
+        st.dataframe(result.head(top).round(2), use_container_width=True, hide_index=True)
+else:
+    st.info("👈 Choose a universe and click **Run Screener** to begin.")
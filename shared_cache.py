@@ -0,0 +1,242 @@
+"""
+Read-only, memory-mapped price and level cache shared by every app process.
+
+One writer publishes the whole universe as a new generation directory of
+.npy files (a price_block.PriceBlock plus the previous-period H/L/C and
+levels for every timeframe), then atomically swaps the CURRENT pointer:
+
+    python shared_cache.py --watchlist watchlist.txt     # cron / after the store refresh
+
+App processes map the current generation with np.load(mmap_mode='r')
+instead of deserializing their own copy, so all replicas share the same
+page-cache pages and memory stays flat as replicas are added. Readers pick
+up a new generation on their next call; a generation that is already mapped
+stays valid until its last reader drops it, so nobody sees torn data.
+
+Tickers missing from the cache return None and the apps fall back to
+data_store. Prices are stored as float32 (about 7 significant digits) and
+handed to readers as float64 frames, like data_store.load_history. A
+snapshot is as of publish time: current_history() appends the store's newer
+bars, and previous_hlc() only answers while the published period is still
+the one that just ended.
+"""
+import datetime
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from aggregate import FREQS, day_numbers, previous_end
+from pivot_engine import LEVELS, compute_levels
+from price_block import PriceBlock
+
+CACHE_DIR = os.environ.get("PIVOT_CACHE_DIR", "cache")
+POINTER = "CURRENT"
+KEEP_GENERATIONS = 3
+
+_lock = threading.Lock()
+_mapped = None  # the Generation this process currently has mapped
+
+
+class Generation:
+    """One published, memory-mapped snapshot."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "index.json")) as f:
+            index = json.load(f)
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        spans = {t: tuple(s) for t, s in index["spans"].items()}
+        self.block = PriceBlock(index["tickers"], load("days"), load("prices"), spans, index["columns"])
+        self.freqs = index["freqs"]
+        self.created = index["created"]
+        self.hlc = load("hlc")          # (freqs, 3, tickers) previous-period High/Low/Close
+        self.levels = load("levels")    # (freqs, LEVELS, tickers)
+        try:
+            self.ends = load("ends")    # (freqs, tickers) day number of that period's end, -1 if none
+        except FileNotFoundError:
+            self.ends = None            # published before period ends were recorded
+
+
+def _read_pointer(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, POINTER)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def current(cache_dir=None):
+    """The current Generation (re-mapped when the writer has swapped the pointer), or None."""
+    global _mapped
+    cache_dir = cache_dir or CACHE_DIR
+    name = _read_pointer(cache_dir)
+    if name is None:
+        return None
+    path = os.path.join(cache_dir, name)
+    mapped = _mapped
+    if mapped is not None and mapped.path == path:
+        return mapped
+    with _lock:
+        if _mapped is None or _mapped.path != path:
+            try:
+                _mapped = Generation(path)
+            except FileNotFoundError:
+                # Pruned between reading the pointer and mapping it; keep what we had
+                return _mapped
+        return _mapped
+
+
+def history(ticker, start=None, end=None, cache_dir=None):
+    """
+    Daily bars for `ticker` from the published snapshot as a float64
+    DataFrame (None if not cached). Only the start..end slice is copied out
+    of the mapping.
+    """
+    gen = current(cache_dir)
+    if gen is None or ticker.upper() not in gen.block:
+        return None
+    return gen.block.frame(ticker).loc[start:end].astype(np.float64)
+
+
+def current_history(ticker, start=None, end=None, cache_dir=None):
+    """
+    history() plus the bars the store has after the snapshot, so the last
+    close is current rather than as of publish time. Only those bars are read
+    from the store (no top-up, no pass over the whole history), which keeps
+    this cheap enough to call on every rerun. None if not cached.
+    """
+    import pandas as pd
+
+    from data_store import read_arrays
+
+    gen = current(cache_dir)
+    if gen is None or ticker.upper() not in gen.block:
+        return None
+    df = history(ticker, start, end, cache_dir)
+    _, _, stop = gen.block.spans[ticker.upper()]
+    last = pd.Timestamp(gen.block.dates[stop - 1])
+    if end is not None and pd.Timestamp(end) <= last:
+        return df
+    arrays = read_arrays(ticker, gen.block.columns, start=last + pd.Timedelta(days=1))
+    if arrays is None or not len(arrays[0]):
+        return df
+    tail = pd.DataFrame(dict(zip(gen.block.columns, arrays[1:])),
+                        index=pd.DatetimeIndex(arrays[0], name="Date")).loc[:end]
+    return pd.concat([df, tail.astype(np.float64)])
+
+
+def previous_hlc(ticker, freq, cache_dir=None, today=None):
+    """
+    (H, L, C) of the `freq` period that ended just before `today`'s period
+    (default today) for `ticker`, or None.
+
+    Levels only, like level_db.lookup: a generation published before the
+    period boundary holds an older period and reads as a miss, and the
+    current price comes from the store or the live feed.
+    """
+    gen = current(cache_dir)
+    if gen is None or gen.ends is None or ticker.upper() not in gen.block or freq not in gen.freqs:
+        return None
+    row, _, _ = gen.block.spans[ticker.upper()]
+    f = gen.freqs.index(freq)
+    if gen.ends[f, row] != day_numbers(previous_end(freq, today)):
+        return None
+    H, L, C = (float(v) for v in gen.hlc[f, :, row])
+    if np.isnan(C):
+        return None
+    return H, L, C
+
+
+# --- writer ---------------------------------------------------------------
+
+def _save(path, name, array):
+    with open(os.path.join(path, f"{name}.npy"), "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _completed(block, freq, today):
+    """
+    (H, L, C, end day number) per ticker of the last period that ended before
+    `today`'s period, like level_db's rows (NaN / -1 where there is none).
+    """
+    bars = block.aggregate(freq)
+    ok = ~np.isnan(bars.close) & (bars.label <= np.datetime64(previous_end(freq, today), 'D'))
+    if not ok.any():
+        nan = np.full(len(block), np.nan)
+        return nan, nan, nan, np.full(len(block), -1)
+    last = ok.shape[1] - 1 - np.argmax(ok[:, ::-1], axis=1)
+    has, rows = ok.any(axis=1), np.arange(len(block))
+    pick = lambda a: np.where(has, a[rows, last], np.nan)
+    return pick(bars.high), pick(bars.low), pick(bars.close), np.where(has, day_numbers(bars.label)[last], -1)
+
+
+def publish(tickers, cache_dir=None, keep=KEEP_GENERATIONS, today=None):
+    """
+    Build a new generation from the local store and make it current.
+
+    Everything is written and fsynced into a fresh directory before the
+    pointer file is replaced, so a reader sees either the old or the new
+    generation, never a mix. Returns the generation path.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    block = PriceBlock.from_store(tickers)
+    today = today or datetime.date.today()
+    completed = [_completed(block, f, today) for f in FREQS]
+    hlc = np.stack([np.stack(c[:3]) for c in completed]).astype(np.float64)
+    levels = compute_levels(hlc[:, 0], hlc[:, 1], hlc[:, 2])
+
+    name = f"gen-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    path = os.path.join(cache_dir, name)
+    os.makedirs(path)
+    _save(path, "days", block.days)
+    _save(path, "prices", block.data)
+    _save(path, "hlc", hlc)
+    _save(path, "ends", np.stack([c[3] for c in completed]).astype(np.int64))
+    _save(path, "levels", np.stack([levels[k] for k in LEVELS], axis=1))
+    with open(os.path.join(path, "index.json"), "w") as f:
+        json.dump({"tickers": block.tickers, "spans": block.spans, "columns": list(block.columns),
+                   "freqs": list(FREQS), "created": time.time()}, f)
+
+    tmp = os.path.join(cache_dir, f"{POINTER}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(cache_dir, POINTER))
+
+    _prune(cache_dir, keep)
+    return path
+
+
+def _prune(cache_dir, keep):
+    """Remove all but the newest `keep` generations (mapped files stay readable until unmapped)."""
+    gens = sorted(d for d in os.listdir(cache_dir) if d.startswith("gen-"))
+    live = _read_pointer(cache_dir)
+    for d in gens[:-keep]:
+        if d != live:
+            shutil.rmtree(os.path.join(cache_dir, d), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from screener import load_universe
+
+    parser = argparse.ArgumentParser(description="Publish the shared memory-mapped price cache.")
+    parser.add_argument("tickers", nargs="*")
+    parser.add_argument("--watchlist", help="file with one symbol per line")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    tickers = list(args.tickers) + (load_universe(args.watchlist) if args.watchlist else [])
+    if not tickers:
+        parser.error("give tickers or --watchlist")
+    path = publish(tickers, args.cache_dir)
+    gen = Generation(path)
+    print(f"Published {len(gen.block)} tickers ({gen.block.nbytes / 1e6:.1f} MB) to {path}")
@@ -0,0 +1,97 @@
+"""
+Process-wide request coalescing (single-flight).
+
+Streamlit runs every session as a thread in one process. When many sessions
+ask for the same key at once, only the first caller runs the function; the
+rest wait on that in-flight call and share its result (or its exception).
+Results can optionally be kept for a short TTL so callers arriving just after
+the call finishes are served too.
+"""
+import functools
+import threading
+import time
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._results = {}
+        self.hits = 0        # served from a recent result
+        self.misses = 0      # actually ran the function
+        self.coalesced = 0   # waited on someone else's in-flight call
+
+    def do(self, key, fn, *args, ttl=0, **kwargs):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[0] > now:
+                self.hits += 1
+                return cached[1]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if ttl and call.error is None:
+                    self._prune(now)
+                    self._results[key] = (time.monotonic() + ttl, call.value)
+            call.event.set()
+        return call.value
+
+    def _prune(self, now):
+        expired = [k for k, (expires, _) in self._results.items() if expires <= now]
+        for k in expired:
+            del self._results[k]
+
+    def forget(self, key):
+        with self._lock:
+            self._results.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced,
+                    "in_flight": len(self._inflight)}
+
+
+# Shared by every Streamlit session (and thread) in this process
+FLIGHT = SingleFlight()
+
+
+def coalesce(name, ttl=0):
+    """
+    Decorator routing calls through FLIGHT, keyed by `name` and the call arguments.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            return FLIGHT.do(key, fn, *args, ttl=ttl, **kwargs)
+        return wrapper
+    return decorator
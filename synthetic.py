@@ -0,0 +1,83 @@
+"""
+Deterministic synthetic OHLCV generator.
+
+Produces random-walk price data on a business-day calendar with holidays
+removed, optional per-ticker gaps (missing bars), and optional intraday bars.
+The same arguments always produce the same data, so benchmark runs and
+offline demos are comparable.
+"""
+import numpy as np
+import pandas as pd
+
+# Bars per 6.5 hour session for the intraday frequencies we support
+SESSION_BARS = {'1d': 1, '5m': 78, '1m': 390}
+SESSION_OPEN_MINUTES = 9 * 60 + 30
+
+
+def trading_calendar(years, start="2000-01-03", holidays_per_year=9, seed=0):
+    """Business days for `years` years starting at `start`, minus random holidays."""
+    days = pd.bdate_range(start, periods=int(round(years * 252 * 1.04))).values.astype('datetime64[D]')
+    days = days[days < np.datetime64(pd.Timestamp(start) + pd.DateOffset(years=years), 'D')]
+    if holidays_per_year:
+        rng = np.random.default_rng(seed)
+        n_holidays = int(holidays_per_year * years)
+        holidays = rng.choice(days.size, size=min(n_holidays, days.size // 10), replace=False)
+        days = np.delete(days, holidays)
+    return days
+
+
+def synthetic_ohlcv(n_tickers=1, years=2, freq='1d', gap_prob=0.0, holidays_per_year=9, seed=0,
+                    start="2000-01-03", dtype=np.float64):
+    """
+    Returns (timestamps, open, high, low, close, volume).
+
+    Price arrays are shaped (n_tickers, n_bars) on a shared calendar.
+    `gap_prob` is the chance each bar is missing for a ticker (NaN).
+    Daily timestamps are datetime64[D]; intraday ones are datetime64[m].
+    """
+    days = trading_calendar(years, start, holidays_per_year, seed)
+    per_day = SESSION_BARS[freq]
+    if per_day == 1:
+        stamps = days
+    else:
+        step = 390 // per_day
+        minutes = SESSION_OPEN_MINUTES + np.arange(per_day) * step
+        stamps = (days.astype('datetime64[m]')[:, None] + minutes.astype('timedelta64[m]')).ravel()
+
+    rng = np.random.default_rng(seed + 1)
+    n = stamps.size
+    vol = 0.02 / np.sqrt(per_day)
+    start_px = rng.uniform(20, 400, size=(n_tickers, 1))
+    log_ret = rng.normal(0.0003 / per_day, vol, size=(n_tickers, n))
+    close = start_px * np.exp(np.cumsum(log_ret, axis=1))
+    open_ = np.empty_like(close)
+    open_[:, 0] = start_px[:, 0]
+    open_[:, 1:] = close[:, :-1] * np.exp(rng.normal(0, vol / 4, size=(n_tickers, n - 1)))
+    span = np.abs(rng.normal(0, vol, size=(n_tickers, n))) * close
+    high = np.maximum(open_, close) + span * rng.random((n_tickers, n))
+    low = np.minimum(open_, close) - span * rng.random((n_tickers, n))
+    volume = rng.lognormal(13, 0.5, size=(n_tickers, n)).round()
+
+    if gap_prob:
+        missing = rng.random((n_tickers, n)) < gap_prob
+        for a in (open_, high, low, close, volume):
+            a[missing] = np.nan
+
+    return (stamps, *(a.astype(dtype, copy=False) for a in (open_, high, low, close, volume)))
+
+
+def synthetic_frame(years=2, seed=0, **kwargs):
+    """One ticker as a store-shaped DataFrame (gaps dropped)."""
+    stamps, o, h, l, c, v = synthetic_ohlcv(1, years, seed=seed, **kwargs)
+    df = pd.DataFrame({'Open': o[0], 'High': h[0], 'Low': l[0], 'Close': c[0], 'Volume': v[0]},
+                      index=pd.DatetimeIndex(stamps, name="Date"))
+    return df.dropna()
+
+
+def seed_store(tickers, years=2, start=None, **kwargs):
+    """Write synthetic history for `tickers` into the local data store (for offline demos/tests)."""
+    import data_store
+
+    start = start or str((pd.Timestamp.today() - pd.DateOffset(years=years)).date())
+    for i, t in enumerate(tickers):
+        data_store.write_store(t.upper(), synthetic_frame(years, seed=i, start=start, **kwargs))
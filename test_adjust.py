@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+from adjust import adjust_frame, unsplit
+from synthetic import synthetic_frame
+
+PRICES = ['Open', 'High', 'Low', 'Close']
+
+
+@pytest.fixture
+def yahoo():
+    """Split/dividend-adjusted bars as Yahoo quotes them today."""
+    return synthetic_frame(years=3, seed=2)
+
+
+def _raw(yahoo, split_dates, ratios):
+    # What data_store.download stores: the splits divided back out
+    mult = unsplit(yahoo.index.values, np.array(split_dates, dtype='datetime64[D]'), ratios)
+    raw = yahoo.copy()
+    raw[PRICES] = raw[PRICES].mul(mult, axis=0)
+    raw['Volume'] = raw['Volume'] / mult
+    return raw
+
+
+def test_split_round_trip(yahoo):
+    split_dates = [yahoo.index[200], yahoo.index[500]]
+    raw = _raw(yahoo, split_dates, [2.0, 3.0])
+    # Raw prices jump at each ex-date; the stored bars are no longer Yahoo's
+    assert raw['Close'].iloc[199] == pytest.approx(6 * yahoo['Close'].iloc[199])
+    actions = data_store.merge_actions(None, data_store.actions_frame(split_dates, [2, 3], [0, 0]), raw)
+    pd.testing.assert_frame_equal(adjust_frame(raw, actions), yahoo, rtol=1e-12)
+
+
+def test_dividend_factor(yahoo):
+    ex = yahoo.index[300]
+    actions = data_store.merge_actions(None, data_store.actions_frame([ex], [0], [1.5]), yahoo)
+    adjusted = adjust_frame(yahoo, actions)
+    before = yahoo['Close'].iloc[299]
+    np.testing.assert_allclose(adjusted[PRICES].iloc[:300], yahoo[PRICES].iloc[:300] * (1 - 1.5 / before))
+    pd.testing.assert_frame_equal(adjusted.iloc[300:], yahoo.iloc[300:])
+    pd.testing.assert_series_equal(adjusted['Volume'], yahoo['Volume'])
+
+
+def test_store_adjusts_on_read(yahoo, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_store, "DATA_DIR", str(tmp_path))
+    split_dates = [yahoo.index[400]]
+    raw = _raw(yahoo, split_dates, [4.0])
+    actions = data_store.merge_actions(None, data_store.actions_frame(split_dates, [4], [0]), raw)
+    data_store.write_store("SYN", raw)
+    data_store.write_actions("SYN", actions)
+
+    start, end = str(yahoo.index[100].date()), str(yahoo.index[600].date())
+    adjusted = data_store.load_history("SYN", start, end, offline=True)
+    pd.testing.assert_frame_equal(adjusted, yahoo.loc[start:end], rtol=1e-12,
+                                  check_freq=False, check_index_type=False)
+    pd.testing.assert_frame_equal(data_store.load_history("SYN", start, end, offline=True, adjusted=False),
+                                  raw.loc[start:end], check_freq=False, check_index_type=False)
+
+    dates, *cols = data_store.read_arrays("SYN")
+    for name, values in zip(PRICES, cols):
+        np.testing.assert_allclose(values, yahoo[name].to_numpy(), rtol=1e-12)
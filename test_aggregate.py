@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregate import FREQS, aggregate, aggregate_all, aggregate_frame, align_to_bars, period_bars, to_frame
+from synthetic import synthetic_frame, synthetic_ohlcv
+
+LOGIC = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
+
+
+@pytest.fixture(scope="module")
+def daily():
+    return synthetic_frame(years=6, seed=3)
+
+
+@pytest.mark.parametrize("freq", FREQS)
+def test_matches_resample(daily, freq):
+    expected = daily.resample(freq).agg(LOGIC).dropna()
+    got = to_frame(aggregate_frame(daily)[freq])
+    pd.testing.assert_frame_equal(got, expected, check_freq=False, check_index_type=False)
+
+
+@pytest.mark.parametrize("freq", ['QE', 'YE'])
+def test_coarsened_matches_direct(daily, freq):
+    # Quarters come from months and years from quarters; the result must not depend on it
+    coarse = aggregate_frame(daily)[freq]
+    direct = period_bars(daily, freq)
+    for name in ('label', 'open', 'high', 'low', 'close', 'bar_period', 'start'):
+        np.testing.assert_array_equal(getattr(coarse, name), getattr(direct, name))
+
+
+def test_shared_calendar_skips_gaps():
+    # 2-D input on a shared calendar: a ticker's NaN days are ignored, like resampling its own bars
+    stamps, o, h, l, c, _ = synthetic_ohlcv(3, years=3, gap_prob=0.05, seed=7)
+    bars = aggregate_all(stamps, o, h, l, c)['ME']
+    for i in range(3):
+        df = pd.DataFrame({'Open': o[i], 'High': h[i], 'Low': l[i], 'Close': c[i]},
+                          index=pd.DatetimeIndex(stamps)).dropna()
+        own = aggregate(df.index.values, *(df[k].to_numpy() for k in LOGIC), 'ME')
+        assert np.array_equal(own.label, bars.label)
+        np.testing.assert_array_equal(bars.high[i], own.high)
+        np.testing.assert_array_equal(bars.low[i], own.low)
+
+
+def test_align_to_bars_uses_previous_period(daily):
+    bars = period_bars(daily, 'ME')
+    aligned = align_to_bars(bars, bars.high)
+    month = daily.index.to_period('M')
+    previous_high = daily['High'].groupby(month).max().shift(1)
+    np.testing.assert_array_equal(aligned, previous_high.loc[month].to_numpy())
+    assert np.isnan(aligned[bars.bar_period == 0]).all()
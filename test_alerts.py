@@ -0,0 +1,103 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from alerts import AlertEngine, load_rules, make_rule, next_session_close
+
+NY = ZoneInfo("America/New_York")
+LEVELS = {"SYN": {"P": 100.0, "R1": 110.0, "S1": 90.0}}
+
+
+def at(day, hour, minute=0):
+    return datetime.datetime.combine(day, datetime.time(hour, minute), NY).timestamp()
+
+
+def engine(*rules, levels=None, **kwargs):
+    source = levels or (lambda tickers, freq, today: LEVELS)
+    return AlertEngine([make_rule(i, *r) for i, r in enumerate(rules)], level_source=source, **kwargs)
+
+
+def feed(e, prices, ts=None):
+    return [a.rule.id for p in prices for a in e.update("SYN", p, ts)]
+
+
+def test_above_fires_on_the_crossing_only():
+    e = engine(("SYN", "ME", "R1", "above"))
+    assert feed(e, [105, 109.9, 110, 111, 112]) == [0]
+    # One-shot: crossing again does not fire
+    assert feed(e, [100, 115]) == []
+
+
+def test_repeating_rule_refires_after_leaving():
+    e = AlertEngine([make_rule(0, "SYN", "ME", "S1", "below", once=False)],
+                    level_source=lambda tickers, freq, today: LEVELS)
+    assert feed(e, [95, 89, 88, 91, 89.5]) == [0, 0]
+
+
+def test_near_band_needs_price_to_stop_inside():
+    e = engine(("SYN", "ME", "P", "near", 1), ("SYN", "ME", "R1", "near", 1))
+    # 98 -> 102 jumps through P's 99..101 band; 108 -> 109.5 stops inside R1's
+    assert feed(e, [98, 102, 108, 109.5]) == [1]
+    # From above, into P's band
+    assert feed(e, [103, 100.5]) == [0]
+
+
+@pytest.mark.parametrize("pct", [0, -1])
+def test_near_without_a_band_is_rejected(pct):
+    with pytest.raises(ValueError):
+        make_rule(0, "SYN", "ME", "P", "near", pct)
+
+
+def test_load_rules(tmp_path):
+    path = tmp_path / "rules.csv"
+    path.write_text("ticker,timeframe,level,condition,pct,trigger\n"
+                    "# comment\n"
+                    "tsla,ME,S1,near,1\n"
+                    "QQQ,QE,R2,above,0,close\n")
+    rules = load_rules(path)
+    assert [(r.ticker, r.condition, r.pct, r.trigger) for r in rules] == [
+        ("TSLA", "near", 1.0, "tick"), ("QQQ", "above", 0.0, "close")]
+    path.write_text("SPY,ME,P,near\n")
+    with pytest.raises(ValueError):
+        load_rules(path)
+
+
+def test_next_session_close_skips_weekends():
+    friday = datetime.date(2026, 10, 16)
+    assert next_session_close(at(friday, 10)) == at(friday, 16)
+    assert next_session_close(at(friday, 16)) == at(datetime.date(2026, 10, 19), 16)
+
+
+def test_close_rule_fires_at_the_session_close():
+    day = datetime.date(2026, 10, 14)
+    e = engine(("SYN", "ME", "R1", "above", 0, "close"), closes={"SYN": 105.0})
+    # Intraday moves above R1 are not a close above it
+    assert feed(e, [108, 112, 109.5], at(day, 10)) == []
+    assert feed(e, [111], at(day, 15, 59)) == []
+    # The first tick after 16:00 closes the session at the last price before it
+    alerts = e.update("SYN", 104, at(day, 16, 5))
+    assert [(a.rule.id, a.price, a.ts) for a in alerts] == [(0, 111, at(day, 16))]
+
+
+def test_first_close_needs_a_prior_close():
+    day = datetime.date(2026, 10, 14)
+    e = engine(("SYN", "ME", "R1", "above", 0, "close"))
+    assert feed(e, [111], at(day, 15)) == []
+    assert feed(e, [111], at(day, 17)) == []
+    # Unseeded, the first close only becomes the reference for the next one
+    e = engine(("SYN", "ME", "R1", "above", 0, "close"))
+    feed(e, [105], at(day, 15))
+    feed(e, [111], at(day + datetime.timedelta(days=1), 15))
+    assert feed(e, [111], at(day + datetime.timedelta(days=1), 16, 1)) == [0]
+
+
+def test_levels_roll_with_the_period():
+    def source(tickers, freq, today):
+        return {"SYN": {"R1": 110.0 if today.month == 10 else 120.0}}
+
+    e = engine(("SYN", "ME", "R1", "above"), levels=source)
+    assert feed(e, [105, 108], at(datetime.date(2026, 10, 30), 10)) == []
+    # November's R1 is 120: 115 no longer crosses it, 121 does
+    assert feed(e, [115], at(datetime.date(2026, 11, 2), 10)) == []
+    assert feed(e, [121], at(datetime.date(2026, 11, 2), 11)) == [0]
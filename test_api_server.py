@@ -0,0 +1,164 @@
+import asyncio
+import datetime
+import json
+
+import pytest
+
+import api_server
+import data_store
+import level_db
+import shared_cache
+from api_server import ApiError, LevelService, route
+from pivot_engine import LEVELS, compute_levels, last_completed
+from synthetic import seed_store
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # Store only: no level table, no shared cache
+    monkeypatch.setattr(data_store, "DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setattr(level_db, "DB_PATH", str(tmp_path / "none.db"))
+    monkeypatch.setattr(shared_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    seed_store(["SYN", "ALT"], years=2)
+    return LevelService()
+
+
+def get(service, target, method="GET", body=b""):
+    status, payload, headers = asyncio.run(route(service, method, target, body))
+    return status, json.loads(payload), headers
+
+
+def exchange(service, *requests):
+    """Send raw requests over one connection; [(status, headers, body)] for each answered one."""
+    async def run():
+        server = await asyncio.start_server(lambda r, w: api_server.handle(service, r, w), "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+        out = []
+        for request in requests:
+            writer.write(request)
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                break
+            headers = {}
+            while (h := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = h.decode().partition(":")
+                headers[name.lower()] = value.strip()
+            out.append((int(line.split()[1]), headers, await reader.readexactly(int(headers["content-length"]))))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return out
+    return asyncio.run(run())
+
+
+def test_levels_match_the_engine(service):
+    status, body, headers = get(service, "/levels?symbol=syn&timeframe=monthly")
+    assert status == 200 and (body["symbol"], body["timeframe"]) == ("SYN", "ME")
+    df = data_store.load_history("SYN", offline=True)
+    end, high, low, close = last_completed(df, "ME", datetime.date.today())
+    assert body["period_end"] == str(end) and body["price"] == pytest.approx(df["Close"].iloc[-1])
+    expected = compute_levels(high, low, close)
+    assert sorted(lv["level"] for lv in body["levels"]) == sorted(LEVELS)
+    for lv in body["levels"]:
+        assert lv["price"] == pytest.approx(expected[lv["level"]])
+        assert lv["distance_pct"] == pytest.approx((lv["price"] / body["price"] - 1) * 100)
+    # Distances move with the close: clients must revalidate
+    assert headers["Cache-Control"] == "no-cache" and headers["ETag"].startswith('"')
+
+
+def test_levels_without_distance_cache_until_the_period_ends(service):
+    status, body, headers = get(service, "/levels?symbol=SYN&timeframe=QE&distance=0")
+    assert "price" not in body and all("distance_pct" not in lv for lv in body["levels"])
+    _, _, until = api_server.period_window("QE")
+    max_age = int(headers["Cache-Control"].split("max-age=")[1])
+    assert headers["Cache-Control"].startswith("public") and 0 < max_age <= until
+
+
+def test_responses_are_cached(service):
+    first = get(service, "/levels?symbol=SYN&timeframe=ME")
+    assert get(service, "/levels?symbol=SYN&timeframe=ME") == first
+    assert (service.hits, service.misses) == (1, 1)
+
+
+@pytest.mark.parametrize("target, status", [
+    ("/levels?symbol=../../etc/passwd", 400),
+    ("/levels?timeframe=ME", 400),
+    ("/levels?symbol=SYN&timeframe=hourly", 400),
+    ("/levels?symbol=NOPE", 404),
+    ("/nowhere", 404),
+])
+def test_bad_requests(service, target, status):
+    with pytest.raises(ApiError) as e:
+        get(service, target)
+    assert e.value.status == status
+
+
+def test_method_not_allowed(service):
+    with pytest.raises(ApiError) as e:
+        get(service, "/levels?symbol=SYN", method="POST")
+    assert e.value.status == 405
+
+
+def test_batch_get(service):
+    status, body, headers = get(service, "/levels/batch?symbols=SYN,NOPE,ALT&timeframe=ME,QE")
+    assert [(r["symbol"], r["timeframe"]) for r in body["results"]] == [
+        ("SYN", "ME"), ("SYN", "QE"), ("ALT", "ME"), ("ALT", "QE")]
+    assert body["missing"] == [{"symbol": "NOPE", "timeframe": "ME"}, {"symbol": "NOPE", "timeframe": "QE"}]
+    assert body["results"][0] == get(service, "/levels?symbol=SYN&timeframe=ME")[1]
+    assert headers["Cache-Control"] == "no-cache"
+
+
+def test_batch_post_reads_distance_from_the_body(service):
+    request = json.dumps({"symbols": ["SYN"], "timeframes": ["ME"], "distance": False}).encode()
+    status, body, headers = get(service, "/levels/batch", method="POST", body=request)
+    assert "price" not in body["results"][0] and headers["Cache-Control"].startswith("public")
+    # A query-string distance does not apply to a POST
+    request = json.dumps({"symbols": ["SYN"], "timeframes": ["ME"]}).encode()
+    status, body, _ = get(service, "/levels/batch?distance=0", method="POST", body=request)
+    assert "price" in body["results"][0]
+
+
+@pytest.mark.parametrize("request_body", [b"not json", b"[]", b'{"symbols": "SYN"}', b'{"symbols": []}',
+                                          b'{"symbols": ["SYN"], "timeframes": [3]}'])
+def test_batch_post_rejects_bad_bodies(service, request_body):
+    with pytest.raises(ApiError) as e:
+        get(service, "/levels/batch", method="POST", body=request_body)
+    assert e.value.status == 400
+
+
+def test_history_has_only_completed_periods(service):
+    status, body, _ = get(service, "/history?symbol=SYN&timeframe=QE&start=2025-01-01")
+    periods = body["periods"]
+    assert periods[0]["period_start"] >= "2025-01-01"
+    assert periods[-1]["period_end"] < str(datetime.date.today())
+    assert periods[-1]["P"] == pytest.approx(compute_levels(
+        periods[-1]["high"], periods[-1]["low"], periods[-1]["close"])["P"])
+
+
+def test_etag_revalidation_over_http(service):
+    target = b"GET /levels?symbol=SYN&timeframe=ME HTTP/1.1\r\nHost: x\r\n"
+    (status, headers, body), = exchange(service, target + b"\r\n")
+    assert status == 200 and json.loads(body)["symbol"] == "SYN"
+    etag = headers["etag"].encode()
+    revalidated, changed = exchange(service, target + b"If-None-Match: " + etag + b"\r\n\r\n",
+                                    target + b'If-None-Match: "other"\r\n\r\n')
+    assert revalidated[0] == 304 and revalidated[2] == b"" and revalidated[1]["etag"] == headers["etag"]
+    assert changed[0] == 200 and changed[2] == body
+
+
+@pytest.mark.parametrize("length, status", [(b"abc", 400), (b"-1", 400), (b"1e3", 400),
+                                            (str(api_server.MAX_BODY + 1).encode(), 413)])
+def test_bad_content_length_closes_the_connection(service, length, status):
+    post = b"POST /levels/batch HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n"
+    answers = exchange(service, post, b"GET /health HTTP/1.1\r\n\r\n")
+    assert [a[0] for a in answers] == [status]
+    assert answers[0][1]["connection"] == "close"
+
+
+def test_post_over_http(service):
+    body = json.dumps({"symbols": ["SYN"], "distance": False}).encode()
+    post = b"POST /levels/batch HTTP/1.1\r\nContent-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+    answers = exchange(service, post, b"GET /health HTTP/1.1\r\n\r\n")
+    assert [a[0] for a in answers] == [200, 200]
+    assert "price" not in json.loads(answers[0][2])["results"][0]
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import STAT_COLUMNS, block_stats, frame_stats
+from pivot_engine import LEVELS, aligned_levels
+from price_block import PriceBlock
+from synthetic import synthetic_frame
+
+PERIODS = {'W-MON': 'W-MON', 'ME': 'M', 'QE': 'Q'}
+
+
+@pytest.fixture(scope="module")
+def daily():
+    return synthetic_frame(years=4, seed=11)
+
+
+def reference(df, levels, period):
+    """The same statistics with a plain loop over periods and bars."""
+    rows = []
+    groups = [bars for _, bars in df.groupby(df.index.to_period(period))]
+    for name in levels.columns:
+        periods = touched = broke = bounced = 0
+        firsts, excursions = [], []
+        for bars in groups:
+            lv = levels.loc[bars.index[0], name]
+            if np.isnan(lv):
+                continue
+            periods += 1
+            resist = lv > bars['Open'].iloc[0]
+            reach = (bars['High'] >= lv) if resist else (bars['Low'] <= lv)
+            beyond = (bars['Close'] > lv) if resist else (bars['Close'] < lv)
+            broke += beyond.any()
+            if reach.any():
+                touched += 1
+                bounced += not beyond.any()
+                firsts.append(int(np.argmax(reach.to_numpy())))
+                moves = (bars['High'] - lv) if resist else (lv - bars['Low'])
+                excursions.append((moves[reach] / lv * 100).max())
+        rows.append({'Level': name, 'periods': periods, 'touch_rate': touched / periods,
+                     'break_rate': broke / periods, 'bounce_rate': bounced / periods,
+                     'median_bars_to_touch': np.median(firsts) if firsts else np.nan,
+                     'mean_excursion_pct': np.mean(excursions) if excursions else np.nan})
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("freq", list(PERIODS))
+def test_frame_stats_match_a_loop(daily, freq):
+    levels = aligned_levels(daily, freq)
+    got = frame_stats(daily, levels)
+    assert list(got.columns) == ['Level', *STAT_COLUMNS]
+    pd.testing.assert_frame_equal(got, reference(daily, levels, PERIODS[freq]), check_dtype=False)
+
+
+def test_hand_built_period():
+    # Two periods; the second has R1 = 12 above its open of 10
+    idx = pd.bdate_range("2026-01-05", periods=6)
+    df = pd.DataFrame({'Open': [10, 10, 10, 10, 11, 12], 'High': [11, 11, 11, 11, 12.6, 13],
+                       'Low': [9, 9, 9, 9, 10, 11.5], 'Close': [10, 10, 10, 10, 11.8, 11.9]}, index=idx,
+                      dtype=float)
+    levels = pd.DataFrame({'R1': [np.nan] * 3 + [12.0] * 3, 'S1': [np.nan] * 3 + [8.0] * 3}, index=idx)
+    stats = frame_stats(df, levels).set_index('Level')
+    # R1: first touched on the second bar of the period, never closed above, high of 13 at most
+    assert stats.loc['R1', 'periods'] == 1 and stats.loc['R1', 'touch_rate'] == 1
+    assert stats.loc['R1', 'break_rate'] == 0 and stats.loc['R1', 'bounce_rate'] == 1
+    assert stats.loc['R1', 'median_bars_to_touch'] == 1
+    assert stats.loc['R1', 'mean_excursion_pct'] == pytest.approx((13 - 12) / 12 * 100)
+    # S1 at 8 was never reached
+    assert stats.loc['S1', 'touch_rate'] == 0 and np.isnan(stats.loc['S1', 'median_bars_to_touch'])
+
+
+@pytest.mark.parametrize("freq", ['ME', 'QE'])
+def test_block_stats_match_frame_stats(daily, freq):
+    frames = {"A": daily, "B": synthetic_frame(years=4, seed=12)}
+    block = PriceBlock.from_frames(frames, dtype=np.float64)
+    rows = pd.DataFrame(block_stats(block, freq))
+    for ticker, df in frames.items():
+        got = rows[rows['ticker'] == ticker].set_index('level')[STAT_COLUMNS]
+        expected = frame_stats(df, aligned_levels(df, freq)).set_index('Level')[STAT_COLUMNS]
+        # The chart frame carries P, R1 and S1; the block covers every level
+        pd.testing.assert_frame_equal(got.loc[expected.index], expected, check_dtype=False, check_names=False)
+    assert set(rows['level']) == set(LEVELS)
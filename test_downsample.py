@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from downsample import compress_levels, compress_steps, downsample_frame, downsample_ohlc, point_budget
+from pivot_engine import aligned_levels
+from synthetic import synthetic_frame
+
+
+@pytest.fixture(scope="module")
+def daily():
+    return synthetic_frame(years=4, seed=3)
+
+
+def expand(x, y, at):
+    """The step series that compressed (x, y) draws, sampled at `at` (what an 'hv' line shows)."""
+    return y[np.searchsorted(x, at, side="right") - 1]
+
+
+@pytest.mark.parametrize("max_points", [1, 7, 100, 466, 1007])
+def test_buckets_match_pandas(daily, max_points):
+    out = downsample_frame(daily, max_points)
+    assert len(out) <= max_points and list(out.columns) == ['Open', 'High', 'Low', 'Close']
+    size = -(-len(daily) // max_points)
+    groups = daily.groupby(np.arange(len(daily)) // size)
+    np.testing.assert_array_equal(out.index.values, groups.apply(lambda g: g.index[0]).to_numpy())
+    np.testing.assert_array_equal(out['Open'], groups['Open'].first())
+    np.testing.assert_array_equal(out['High'], groups['High'].max())
+    np.testing.assert_array_equal(out['Low'], groups['Low'].min())
+    np.testing.assert_array_equal(out['Close'], groups['Close'].last())
+
+
+def test_small_inputs_are_untouched(daily):
+    assert downsample_frame(daily, len(daily)) is daily
+    args = (daily.index.values, *(daily[c].to_numpy() for c in ('Open', 'High', 'Low', 'Close')))
+    assert all(a is b for a, b in zip(downsample_ohlc(*args, len(daily) + 1), args))
+    assert len(downsample_frame(daily)) <= point_budget()
+
+
+def test_missing_highs_and_lows_are_skipped():
+    dates = np.arange(6).astype('datetime64[D]')
+    high = np.array([5.0, np.nan, 7.0, np.nan, np.nan, 2.0])
+    low = np.array([1.0, np.nan, 0.5, np.nan, np.nan, 3.0])
+    _, _, h, l, _ = downsample_ohlc(dates, high, high, low, high, 2)
+    np.testing.assert_array_equal(h, [7.0, 2.0])
+    np.testing.assert_array_equal(l, [0.5, 3.0])
+
+
+def test_compress_steps_draws_the_same_line():
+    x = np.arange(12)
+    y = np.array([np.nan, np.nan, 1, 1, 1, 2, 2, np.nan, np.nan, 3, 3, 3])
+    cx, cy = compress_steps(x, y)
+    np.testing.assert_array_equal(cx, [0, 2, 5, 7, 9, 11])
+    np.testing.assert_array_equal(expand(cx, cy, x), y)
+    # Too short to compress
+    assert len(compress_steps(x[:2], y[:2])[0]) == 2
+
+
+@pytest.mark.parametrize("freq, period", [('W-MON', 'W-MON'), ('ME', 'M'), ('QE', 'Q')])
+def test_compress_levels_round_trip(daily, freq, period):
+    levels = aligned_levels(daily, freq)
+    steps = compress_levels(levels, ('P', 'R1', 'S1'))
+    x = levels.index.values
+    periods = levels.index.to_period(period).nunique()
+    for col, (cx, cy) in steps.items():
+        # At most one point per period, plus the last bar
+        assert len(cx) <= periods + 1
+        np.testing.assert_array_equal(expand(cx, cy, x), levels[col].to_numpy())
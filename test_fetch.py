@@ -0,0 +1,155 @@
+import json
+import threading
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+import fetch
+from fetch import FetchError, fetch_many, parse_chart, to_frame
+
+DAY = 86400
+START = 1_700_006_400  # 2023-11-15 00:00 UTC
+
+
+def payload(n=5, close=100.0, adjclose=None, split=None):
+    """A v8 chart payload: n daily bars closing at close + i, with an optional (bar index, ratio) split."""
+    stamps = [START + i * DAY for i in range(n)]
+    closes = [close + i for i in range(n)]
+    result = {"timestamp": stamps,
+              "indicators": {"quote": [{"open": closes, "high": [c + 1 for c in closes],
+                                        "low": [c - 1 for c in closes], "close": closes,
+                                        "volume": [1000.0] * n}]}}
+    if adjclose is not None:
+        result["indicators"]["adjclose"] = [{"adjclose": adjclose}]
+    if split is not None:
+        i, ratio = split
+        result["events"] = {"splits": {str(stamps[i]): {"date": stamps[i], "numerator": ratio, "denominator": 1}}}
+    return {"chart": {"result": [result]}}
+
+
+class StandIn:
+    """Local chart server. `script[symbol]` lists the status codes to answer before a 200."""
+
+    def __init__(self, script=None, retry_after=None):
+        self.script = defaultdict(list, script or {})
+        self.requests = Counter()
+        self.clients = set()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                symbol = self.path.split("?")[0].rsplit("/", 1)[-1]
+                stand_in.requests[symbol] += 1
+                stand_in.clients.add(self.client_address)
+                status = stand_in.script[symbol].pop(0) if stand_in.script[symbol] else 200
+                body = json.dumps(payload(close=100.0 + len(symbol)) if status == 200 else {}).encode()
+                if symbol == "NONE":
+                    status = 404
+                self.send_response(status)
+                if retry_after is not None and status != 200:
+                    self.send_header("Retry-After", retry_after)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/chart"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(fetch.time, "sleep", delays.append)
+    return delays
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(**kwargs):
+        servers.append(StandIn(**kwargs))
+        return servers[-1]
+    yield start
+    for s in servers:
+        s.close()
+
+
+def test_parse_adjusted_and_raw():
+    adjusted = parse_chart(payload(adjclose=[50.0, 50.5, 51.0, 51.5, 52.0]))
+    np.testing.assert_allclose(adjusted['Close'], [50.0, 50.5, 51.0, 51.5, 52.0])
+    # The whole bar is scaled by the close's adjustment ratio
+    np.testing.assert_allclose(adjusted['High'], adjusted['Close'] * np.arange(101, 106) / np.arange(100, 105))
+    assert adjusted['dates'][0] == np.datetime64("2023-11-15")
+
+    raw = parse_chart(payload(split=(3, 2.0)), adjusted=False)
+    # Bars before the ex-date are multiplied back out, volume divided
+    np.testing.assert_allclose(raw['Close'], [200.0, 202.0, 204.0, 103.0, 104.0])
+    np.testing.assert_allclose(raw['Volume'], [500.0, 500.0, 500.0, 1000.0, 1000.0])
+    dates, splits, dividends = raw['actions']
+    assert list(dates) == [np.datetime64("2023-11-18")] and list(splits) == [2.0]
+
+
+def test_parse_empty_payloads():
+    assert parse_chart(None) is None
+    assert parse_chart({"chart": {"result": []}}) is None
+    assert parse_chart({"chart": {"result": [{"timestamp": []}]}}) is None
+
+
+def test_fetch_many_batches_share_a_connection(server, sleeps):
+    s = server()
+    symbols = ["AAA", "BB", "C", "DDDD", "EEEEE"]
+    out = fetch_many(symbols, "2023-11-15", "2023-11-20", base_url=s.url, batch_size=2, max_workers=2)
+    assert set(out) == set(symbols)
+    assert [out[t]['Close'][0] for t in symbols] == [100.0 + len(t) for t in symbols]
+    # Three batches of up to two symbols, one keep-alive connection each
+    assert len(s.clients) == 3 and sum(s.requests.values()) == 5 and sleeps == []
+    assert list(to_frame(out["AAA"]).columns) == list(fetch.COLUMNS)
+
+
+def test_throttled_requests_back_off_and_retry(server, sleeps):
+    s = server(script={"QQQ": [429, 503, 502]})
+    out = fetch_many(["QQQ"], "2023-11-15", base_url=s.url, backoff=0.5)
+    assert out["QQQ"] is not None and s.requests["QQQ"] == 4
+    assert sleeps == [0.5, 1.0, 2.0]
+
+
+def test_retry_after_sets_a_floor(server, sleeps):
+    s = server(script={"QQQ": [429, 429]}, retry_after="3")
+    fetch_many(["QQQ"], "2023-11-15", base_url=s.url, backoff=0.5)
+    assert sleeps == [3.0, 3.0]
+
+
+def test_gives_up_after_the_retries(server, sleeps):
+    s = server(script={"QQQ": [503] * 10})
+    with pytest.raises(FetchError, match="503"):
+        fetch_many(["QQQ"], "2023-11-15", base_url=s.url, retries=2, backoff=0.1)
+    assert s.requests["QQQ"] == 3 and sleeps == pytest.approx([0.1, 0.2])
+
+
+def test_client_errors_are_not_retried(server, sleeps):
+    s = server(script={"QQQ": [400]})
+    with pytest.raises(FetchError, match="400"):
+        fetch_many(["QQQ"], "2023-11-15", base_url=s.url)
+    assert s.requests["QQQ"] == 1 and sleeps == []
+    # 404 is "no such symbol", not an error
+    assert fetch_many(["NONE"], "2023-11-15", base_url=s.url) == {"NONE": None}
+
+
+def test_connection_errors_are_retried(sleeps):
+    # Nothing listens on port 9 locally
+    with pytest.raises(FetchError):
+        fetch_many(["QQQ"], "2023-11-15", base_url="http://127.0.0.1:9/chart", retries=2, backoff=0.25)
+    assert sleeps == [0.25, 0.5]
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from aggregate import FREQS, aggregate, daily_bars
+from intraday import StreamingAggregator, iter_memmap, write_memmap
+from synthetic import synthetic_ohlcv
+
+FIELDS = ('label', 'start', 'open', 'high', 'low', 'close')
+
+
+@pytest.fixture(scope="module")
+def minutes():
+    stamps, o, h, l, c, _ = synthetic_ohlcv(1, years=2, freq='5m', seed=11)
+    return stamps, o[0], h[0], l[0], c[0]
+
+
+def _stream(minutes, chunk_rows):
+    agg = StreamingAggregator()
+    stamps = minutes[0]
+    for i in range(0, stamps.size, chunk_rows):
+        agg.add(*(a[i:i + chunk_rows] for a in minutes))
+    return agg.finish()
+
+
+@pytest.fixture(scope="module")
+def one_shot(minutes):
+    return _stream(minutes, minutes[0].size)
+
+
+def test_one_shot_matches_daily_aggregation(minutes, one_shot):
+    days, o, h, l, c = daily_bars(*minutes)
+    for f in FREQS:
+        bars = aggregate(days, o, h, l, c, f)
+        for name in FIELDS:
+            np.testing.assert_array_equal(getattr(one_shot[f], name), getattr(bars, name))
+
+
+# Part of a session, exactly one session (78 bars), a prime, more than a month
+@pytest.mark.parametrize("chunk_rows", [50, 78, 7919, 40_000])
+def test_chunking_does_not_change_periods(minutes, one_shot, chunk_rows):
+    streamed = _stream(minutes, chunk_rows)
+    for f in FREQS:
+        for name in FIELDS:
+            np.testing.assert_array_equal(getattr(streamed[f], name), getattr(one_shot[f], name))
+
+
+def test_bar_at_a_time(minutes):
+    head = tuple(a[:3000] for a in minutes)
+    streamed, whole = _stream(head, 1), _stream(head, 3000)
+    for f in FREQS:
+        for name in FIELDS:
+            np.testing.assert_array_equal(getattr(streamed[f], name), getattr(whole[f], name))
+
+
+def test_memmap_round_trip(minutes, one_shot, tmp_path):
+    write_memmap(tmp_path, *minutes)
+    agg = StreamingAggregator()
+    for chunk in iter_memmap(tmp_path, chunk_rows=10_000):
+        agg.add(*chunk)
+    periods = agg.finish()
+    for name in FIELDS:
+        np.testing.assert_array_equal(getattr(periods['ME'], name), getattr(one_shot['ME'], name))
+
+
+def test_rejects_out_of_order_chunks(minutes):
+    agg = StreamingAggregator()
+    agg.add(*(a[100:200] for a in minutes))
+    with pytest.raises(ValueError):
+        agg.add(*(a[:100] for a in minutes))
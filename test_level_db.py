@@ -0,0 +1,63 @@
+import datetime
+
+import numpy as np
+import pytest
+
+import data_store
+import level_db
+from aggregate import FREQS, period_code, period_label, previous_end
+from synthetic import seed_store
+
+TICKER = "SYN"
+# The nightly job runs before the close: the store ends at the previous session
+RUN_DAY = datetime.date(2026, 10, 16)
+
+
+@pytest.fixture
+def table(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_store, "DATA_DIR", str(tmp_path / "data"))
+    seed_store([TICKER], years=2, start="2024-10-16", holidays_per_year=0)
+    db = str(tmp_path / "levels.db")
+    level_db.materialize([TICKER], db, today=RUN_DAY)
+    return db
+
+
+@pytest.mark.parametrize("freq", [f for f in FREQS if f != 'B'])
+def test_previous_end_is_the_previous_period_label(freq):
+    day = datetime.date(2024, 1, 1)
+    for _ in range(800):
+        expected = period_label([period_code(day, freq) - 1], freq)[0]
+        assert np.datetime64(previous_end(freq, day), 'D') == expected
+        day += datetime.timedelta(days=1)
+
+
+def test_previous_end_daily_is_the_previous_weekday():
+    monday, tuesday = datetime.date(2026, 10, 12), datetime.date(2026, 10, 13)
+    assert previous_end('B', monday) == datetime.date(2026, 10, 9)
+    assert previous_end('B', tuesday) == monday
+    assert previous_end('B', datetime.date(2026, 10, 11)) == datetime.date(2026, 10, 9)
+
+
+def test_lookup_serves_the_period_that_just_ended(table):
+    df = data_store.read_store(TICKER).loc["2026-09"]
+    row = level_db.latest(TICKER, 'ME', table, today=RUN_DAY)
+    assert (row["period_start"], row["period_end"]) == ("2026-09-01", "2026-09-30")
+    assert level_db.lookup(TICKER, 'ME', table, today=RUN_DAY) == pytest.approx(
+        (df['High'].max(), df['Low'].min(), df['Close'].iloc[-1]))
+
+
+def test_open_period_is_not_written(table):
+    # October (and the week ending Oct 19) were still open on the run day
+    assert level_db.history(TICKER, 'ME', db_path=table)['period_end'].max() == np.datetime64("2026-09-30")
+    assert level_db.history(TICKER, 'W-MON', db_path=table)['period_end'].max() == np.datetime64("2026-10-12")
+
+
+def test_stale_row_is_a_miss_after_the_boundary(table):
+    # Before the next nightly run, November readers must not get September's levels
+    assert level_db.lookup(TICKER, 'ME', table, today=datetime.date(2026, 11, 2)) is None
+    assert level_db.lookup(TICKER, 'W-MON', table, today=datetime.date(2026, 10, 20)) is None
+    assert level_db.lookup(TICKER, 'W-MON', table, today=datetime.date(2026, 10, 19)) is not None
+
+
+def test_missing_table_is_a_miss(tmp_path):
+    assert level_db.lookup(TICKER, 'ME', str(tmp_path / "none.db")) is None
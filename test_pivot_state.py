@@ -0,0 +1,89 @@
+import math
+
+import pytest
+
+from aggregate import period_bars
+from pivot_engine import LEVELS, compute_levels
+from pivot_state import PivotState, load_states, refresh_states, save_states
+from synthetic import synthetic_frame
+
+
+@pytest.fixture(scope="module")
+def daily():
+    return synthetic_frame(years=2, seed=7)
+
+
+def stream(state, df):
+    return [state.update(row.Index, row.Close, row.High, row.Low, row.Open) for row in df.itertuples()]
+
+
+@pytest.mark.parametrize("freq", ['W-MON', 'ME', 'QE', 'YE'])
+def test_streaming_matches_aggregation(daily, freq):
+    state = PivotState("syn", freq)
+    rolled = stream(state, daily)
+    bars = period_bars(daily, freq)
+    # One roll per period boundary after the first
+    assert sum(rolled) == len(bars.close) - 1
+    assert (state.open, state.high, state.low, state.close) == (
+        bars.open[-1], bars.high[-1], bars.low[-1], bars.close[-1])
+    assert state.prev_hlc == (bars.high[-2], bars.low[-2], bars.close[-2])
+    expected = compute_levels(bars.high[-2], bars.low[-2], bars.close[-2])
+    assert state.levels == {k: pytest.approx(float(expected[k])) for k in LEVELS}
+    assert state.as_of == daily.index[-1]
+
+
+@pytest.mark.parametrize("freq", ['W-MON', 'ME', 'QE'])
+def test_from_history_matches_streaming(daily, freq):
+    streamed = PivotState("SYN", freq)
+    stream(streamed, daily)
+    assert PivotState.from_history("SYN", freq, daily).to_dict() == streamed.to_dict()
+
+
+def test_old_and_repeated_bars_are_ignored(daily):
+    state = PivotState("SYN", "ME")
+    stream(state, daily)
+    before = state.to_dict()
+    # Re-feeding the last week, or an older bar of the same month, changes nothing
+    assert not any(stream(state, daily.iloc[-5:]))
+    last = daily.index[-1]
+    assert not state.update(last, 1e6, 1e6, 0.0)
+    assert not state.update(daily.index[-2], 1.0)
+    assert state.to_dict() == before
+
+
+def test_single_prices_update_the_range():
+    state = PivotState("SYN", "ME")
+    for day, price in [("2026-01-05", 10.0), ("2026-01-06", 12.0), ("2026-01-07", 9.0), ("2026-01-08", 11.0)]:
+        state.update(day, price)
+    assert (state.open, state.high, state.low, state.close) == (10.0, 12.0, 9.0, 11.0)
+    assert state.update("2026-02-02", 11.5)
+    assert state.prev_hlc == (12.0, 9.0, 11.0) and state.levels["P"] == pytest.approx((12 + 9 + 11) / 3)
+
+
+def test_save_and_load_round_trip(tmp_path, daily):
+    states = {("SYN", "ME"): PivotState.from_history("SYN", "ME", daily),
+              ("NEW", "QE"): PivotState("NEW", "QE")}   # empty: infinite high/low
+    path = str(tmp_path / "state.json")
+    save_states(path, states)
+    loaded = load_states(path)
+    assert loaded[("SYN", "ME")].to_dict() == states[("SYN", "ME")].to_dict()
+    empty = loaded[("NEW", "QE")]
+    assert (empty.high, empty.low) == (-math.inf, math.inf) and math.isnan(empty.close)
+    assert load_states(str(tmp_path / "missing.json")) == {}
+
+
+def test_refresh_resumes_from_as_of(daily):
+    cut = len(daily) - 30
+    calls = []
+
+    def load(ticker, since):
+        calls.append(since)
+        return daily.iloc[:cut] if not calls[1:] else daily.loc[since:]
+
+    states = refresh_states({}, ["syn"], ["ME", "QE"], load)
+    assert calls == [None] and states[("SYN", "ME")].as_of == daily.index[cut - 1]
+    # The next run loads from as_of on and consumes only the new bars
+    refresh_states(states, ["SYN"], ["ME", "QE"], load)
+    assert calls[1] == daily.index[cut - 1]
+    for freq in ("ME", "QE"):
+        assert states[("SYN", freq)].to_dict() == PivotState.from_history("SYN", freq, daily).to_dict()
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from range_index import RangeMaxIndex
+from synthetic import synthetic_frame
+
+
+@pytest.fixture(scope="module")
+def daily():
+    df = synthetic_frame(years=3, seed=5)
+    df.iloc[[10, 11, 300], df.columns.get_indexer(['High', 'Low'])] = np.nan  # fmax/fmin skip these
+    return df
+
+
+@pytest.fixture(scope="module")
+def index(daily):
+    return RangeMaxIndex.from_frame(daily)
+
+
+@pytest.mark.parametrize("sessions", [1, 2, 3, 5, 20, 64, 100, 252])
+def test_rolling_matches_pandas(daily, index, sessions):
+    high, low, close = index.rolling(sessions)
+    expected_high = daily['High'].rolling(sessions, min_periods=1).max().to_numpy()
+    expected_low = daily['Low'].rolling(sessions, min_periods=1).min().to_numpy()
+    np.testing.assert_array_equal(high[sessions - 1:], expected_high[sessions - 1:])
+    np.testing.assert_array_equal(low[sessions - 1:], expected_low[sessions - 1:])
+    np.testing.assert_array_equal(close[sessions - 1:], daily['Close'].to_numpy()[sessions - 1:])
+    assert np.isnan(high[:sessions - 1]).all() and np.isnan(close[:sessions - 1]).all()
+
+
+def test_rolling_longer_than_history(index):
+    high, low, close = index.rolling(len(index) + 1)
+    assert np.isnan(high).all() and np.isnan(low).all() and np.isnan(close).all()
+
+
+def test_query_matches_slices(daily, index):
+    rng = np.random.default_rng(0)
+    i = rng.integers(0, len(index), 500)
+    j = np.minimum(i + rng.integers(0, 400, 500), len(index) - 1)
+    high, low, close = index.query(i, j)
+    for n in range(500):
+        window = daily.iloc[i[n]:j[n] + 1]
+        expected = (np.fmax.reduce(window['High'].to_numpy()), np.fmin.reduce(window['Low'].to_numpy()),
+                    window['Close'].iloc[-1])
+        assert index.query(i[n], j[n]) == pytest.approx(expected, nan_ok=True)
+        assert (high[n], low[n], close[n]) == pytest.approx(expected, nan_ok=True)
+
+
+def test_window_by_dates(daily, index):
+    h, l, c = index.window("2001-02-14", "2001-05-03")
+    window = daily.loc["2001-02-14":"2001-05-03"]
+    assert (h, l, c) == (window['High'].max(), window['Low'].min(), window['Close'].iloc[-1])
+    assert index.last(20) == index.query(len(index) - 20, len(index) - 1)
+    with pytest.raises(ValueError):
+        index.window("2001-02-17", "2001-02-18")  # a weekend
+
+
+def test_out_of_range(index):
+    with pytest.raises(IndexError):
+        index.query(5, 4)
+    with pytest.raises(IndexError):
+        index.query(np.array([0]), np.array([len(index)]))
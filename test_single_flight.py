@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+import single_flight
+from single_flight import SingleFlight, coalesce
+
+
+def slow(calls, gate, value):
+    def fn():
+        calls.append(1)
+        gate.wait(5)
+        return value
+    return fn
+
+
+def run_concurrently(target, n):
+    results = [None] * n
+    errors = [None] * n
+
+    def worker(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def wait_for_waiters(flight, n):
+    deadline = time.monotonic() + 5
+    while flight.coalesced < n and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_share_one_run():
+    flight, calls, gate = SingleFlight(), [], threading.Event()
+    fn = slow(calls, gate, {"rows": 3})
+    threads, results, errors = run_concurrently(lambda: flight.do("k", fn), 8)
+    wait_for_waiters(flight, 7)
+    assert flight.stats()["in_flight"] == 1
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and errors == [None] * 8
+    # Every caller gets the leader's object
+    assert all(r is results[0] for r in results)
+    assert flight.stats() == {"hits": 0, "misses": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_errors_reach_every_waiter():
+    flight, gate = SingleFlight(), threading.Event()
+
+    def fail():
+        gate.wait(5)
+        raise ValueError("no data")
+
+    threads, results, errors = run_concurrently(lambda: flight.do("k", fail, ttl=60), 4)
+    wait_for_waiters(flight, 3)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert all(isinstance(e, ValueError) for e in errors)
+    # Failures are not cached: the next call runs again
+    assert flight.do("k", lambda: 5, ttl=60) == 5
+
+
+def test_without_ttl_sequential_calls_rerun():
+    flight, calls = SingleFlight(), []
+    for _ in range(3):
+        flight.do("k", lambda: calls.append(1))
+    assert len(calls) == 3 and flight.hits == 0
+
+
+def test_ttl_serves_recent_results(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(single_flight.time, "monotonic", lambda: now[0])
+    flight, calls = SingleFlight(), []
+
+    def fn(x):
+        calls.append(x)
+        return x * 2
+
+    assert flight.do(("k", 1), fn, 1, ttl=10) == 2
+    now[0] += 9
+    assert flight.do(("k", 1), fn, 1, ttl=10) == 2
+    assert flight.do(("k", 2), fn, 2, ttl=10) == 4
+    now[0] += 2
+    assert flight.do(("k", 1), fn, 1, ttl=10) == 2
+    assert calls == [1, 2, 1] and (flight.hits, flight.misses) == (1, 3)
+    flight.forget(("k", 1))
+    flight.do(("k", 1), fn, 1, ttl=10)
+    assert calls == [1, 2, 1, 1]
+
+
+def test_expired_results_are_pruned(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(single_flight.time, "monotonic", lambda: now[0])
+    flight = SingleFlight()
+    for key in range(5):
+        flight.do(key, lambda: key, ttl=1)
+    now[0] += 2
+    flight.do("new", lambda: 0, ttl=1)
+    assert list(flight._results) == ["new"]
+
+
+def test_coalesce_keys_on_name_and_arguments(monkeypatch):
+    flight = SingleFlight()
+    monkeypatch.setattr(single_flight, "FLIGHT", flight)
+    calls = []
+
+    @coalesce("load", ttl=60)
+    def load(ticker, year, adjusted=True):
+        calls.append((ticker, year, adjusted))
+        return ticker, year, adjusted
+
+    assert load("QQQ", 2024) == ("QQQ", 2024, True)
+    assert load("QQQ", 2024) == ("QQQ", 2024, True)
+    assert load("QQQ", 2024, adjusted=False) == ("QQQ", 2024, False)
+    assert load("SPY", 2024) == ("SPY", 2024, True)
+    assert calls == [("QQQ", 2024, True), ("QQQ", 2024, False), ("SPY", 2024, True)]
+    assert load.__name__ == "load"
+
+
+@pytest.mark.parametrize("ttl", [0, 60])
+def test_leader_exception_propagates(ttl):
+    flight = SingleFlight()
+    with pytest.raises(KeyError):
+        flight.do("k", lambda: {}["missing"], ttl=ttl)
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,75 @@
+"""
+Timeframe names and the pure-Python period calendar.
+
+Split out of aggregate.py so the command line and the level table lookups
+can use them without importing NumPy; aggregate re-exports everything here.
+"""
+import datetime
+
+# Same frequency strings the scripts already pass to df.resample()
+FREQS = ('B', 'W-MON', 'ME', 'QE', 'YE')
+
+# Timeframe names the older scripts, the CLI and the API accept
+TIMEFRAME_ALIASES = {
+    'd': 'B', 'daily': 'B',
+    'w': 'W-MON', 'weekly': 'W-MON',
+    'm': 'ME', 'monthly': 'ME',
+    'q': 'QE', 'quarterly': 'QE',
+    'a': 'YE', 'y': 'YE', 'annual': 'YE', 'yearly': 'YE',
+}
+
+# Single-letter period codes used on the command line
+PERIOD_LETTERS = {
+    'd': 'B',  # Business Day
+    'w': 'W-MON', # Weekly (ending Monday)
+    'm': 'ME', # Month End
+    'q': 'QE', # Quarter End
+    'a': 'YE'  # Year End
+}
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def period_code(date, freq):
+    """
+    Scalar version of period_codes for a single date/datetime/Timestamp.
+
+    Pure Python so the incremental state can call it per bar without NumPy overhead.
+    """
+    days = date.toordinal() - _EPOCH_ORDINAL
+    if freq == 'B':
+        return days
+    if freq == 'W-MON':
+        return (days - 5) // 7
+    months = (date.year - 1970) * 12 + date.month - 1
+    if freq == 'ME':
+        return months
+    if freq == 'QE':
+        return months // 3
+    if freq == 'YE':
+        return months // 12
+    raise ValueError(f"Unsupported frequency: {freq}")
+
+
+def previous_end(freq, today=None):
+    """
+    End date of the last period completed before `today`'s period (default
+    today): the label a "previous period" row must carry to be current.
+
+    Pure Python like period_code. For 'B' the previous weekday (holidays are
+    not known here, so a row from before a holiday reads as stale).
+    """
+    today = today or datetime.date.today()
+    if freq == 'B':
+        day = today - datetime.timedelta(days=1)
+        while day.weekday() >= 5:
+            day -= datetime.timedelta(days=1)
+        return day
+    if freq == 'W-MON':
+        # Weeks run Tuesday..Monday; the current one ends on the next Monday (or today)
+        return today + datetime.timedelta(days=-today.weekday() % 7 - 7)
+    months_per = {'ME': 1, 'QE': 3, 'YE': 12}.get(freq)
+    if months_per is None:
+        raise ValueError(f"Unsupported frequency: {freq}")
+    first = datetime.date(today.year, (today.month - 1) // months_per * months_per + 1, 1)
+    return first - datetime.timedelta(days=1)